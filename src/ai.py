@@ -0,0 +1,52 @@
+"""
+Выбор хода компьютера - без зависимости от pygame.
+
+Этой логикой пользуется и игра (game.py), и безоконная симуляция (simulate.py),
+поэтому уровни сложности в обоих местах работают одинаково.
+"""
+import random
+
+import search
+import solver
+
+# Вероятность того, что компьютер сделает лучший ход, а не случайный
+DIFFICULTIES = {
+    "easy": 0.2,
+    "medium": 0.5,
+    "hard": 0.8,
+    "impossible": 1.0,
+}
+
+
+def is_classic(rules):
+    """Классическое поле 3x3 - для него есть решённая таблица."""
+    return rules.size == 3 and rules.win_length == 3
+
+
+def best_move_steps(rules, searcher, x_bits, o_bits, side, time_limit_ms):
+    """Генератор лучшего хода стороны side: таблица для 3x3, иначе поиск."""
+    if is_classic(rules):
+        move = solver.best_move(x_bits, o_bits)
+        if move is not None:
+            return move
+    me, opp = (x_bits, o_bits) if side == 1 else (o_bits, x_bits)
+    return (yield from searcher.iter_best_move(me, opp, time_limit_ms))
+
+
+def random_move(rules, x_bits, o_bits, rng=random):
+    empty = rules.empty_cells(x_bits | o_bits)
+    return rng.choice(empty) if empty else None
+
+
+def choose_move_steps(rules, searcher, x_bits, o_bits, side, difficulty,
+                      time_limit_ms=search.AI_MOVE_TIME_MS, rng=random):
+    """С вероятностью difficulty - лучший ход, иначе - случайный."""
+    if rng.random() < difficulty:
+        return (yield from best_move_steps(rules, searcher, x_bits, o_bits, side, time_limit_ms))
+    return random_move(rules, x_bits, o_bits, rng)
+
+
+def choose_move(rules, searcher, x_bits, o_bits, side, difficulty,
+                time_limit_ms=search.AI_MOVE_TIME_MS, rng=random):
+    return search.run_to_completion(
+        choose_move_steps(rules, searcher, x_bits, o_bits, side, difficulty, time_limit_ms, rng))
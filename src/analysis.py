@@ -0,0 +1,197 @@
+"""
+Анализ позиции для режима обучения: оценка каждой свободной клетки.
+
+Для каждого хода стороны, чья очередь, - исход при лучшей игре обеих сторон
+(WIN / DRAW / LOSS) и число полуходов до конца партии. Без pygame: игра
+(game.py) только рисует готовые значения поверх поля.
+
+Наивно это полный перебор на каждую свободную клетку после каждого хода,
+поэтому:
+  * на 3x3 значения берутся из решённой таблицы (solver.py) - по одному
+    обращению к массиву на клетку;
+  * на больших полях клетки оцениваются поиском alpha-beta с итеративным
+    углублением, порциями по времени (step(), как search.SearchTask) - вне
+    отрисовки. Таблица транспозиций общая на всю партию, так что после хода
+    поддеревья прошлой позиции уже посчитаны, и анализ новой идёт с их учётом;
+  * клетки, переходящие друг в друга при симметрии самой позиции, считаются
+    один раз;
+  * готовый анализ позиции кэшируется (LRU), поэтому отмена хода и просмотр
+    партии назад не пересчитывают ничего.
+
+Без решённой таблицы исход доказан, только если поиск дошёл до конца партии;
+пока нет - у клетки исход None и глубина, на которую она уже просмотрена.
+На полях, где поиск смотрит только клетки рядом с камнями (move_radius),
+ничья не доказывается вовсе.
+"""
+import time
+from collections import OrderedDict
+
+import ai
+import book
+import engine
+import search
+import solver
+
+WIN, DRAW, LOSS = 1, 0, -1
+CACHE_POSITIONS = 512   # сколько готовых анализов позиций храним
+TIME_LIMIT_MS = 5000    # сколько максимум анализируем одну позицию на больших полях
+
+
+class Analyzer:
+    """
+    values - {клетка: (исход, полуходов)} для позиции из set_position();
+    исход WIN / DRAW / LOSS - для стороны, чей ход, а полуходов - до конца
+    партии с учётом самого хода (исход None - ещё не доказан, см. выше).
+    version растёт при каждом изменении values - по нему перерисовывают поле.
+    """
+
+    def __init__(self, rules, cache_positions=CACHE_POSITIONS, time_limit_ms=TIME_LIMIT_MS):
+        self.rules = rules
+        self.table = solver.get_table() if ai.is_classic(rules) else None
+        self.searcher = None
+        if self.table is None:
+            self.searcher = search.AlphaBetaSearch(rules, book=book.get_book(rules))
+        self.cache = OrderedDict()
+        self.cache_positions = cache_positions
+        self.time_limit_ms = time_limit_ms
+        self.position = None
+        self.values = {}
+        self.version = 0
+        self._steps = None
+        self._deadline = None
+
+    @property
+    def done(self):
+        """Анализ текущей позиции закончен (или позиции нет)."""
+        return self._steps is None
+
+    def set_position(self, x_bits, o_bits):
+        """Позиция после хода, отмены или рестарта; готовый анализ - из кэша."""
+        key = (x_bits, o_bits)
+        if key == self.position:
+            return
+        self.position = key
+        self.version += 1
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.values = cached
+            self._steps = None
+            return
+        self.values = {}
+        if self.rules.check_winner(x_bits, o_bits)[0] is not None:
+            self._steps = None  # партия окончена - оценивать нечего
+            return
+        if self.table is not None:
+            self._fill_from_table(x_bits, o_bits)
+            self._store()
+            return
+        x_turn = engine.popcount(x_bits) == engine.popcount(o_bits)
+        me, opp = (x_bits, o_bits) if x_turn else (o_bits, x_bits)
+        self._steps = self._search_cells(me, opp)
+        self._deadline = time.perf_counter() + self.time_limit_ms / 1000.0
+
+    def step(self, slice_ms):
+        """Порция анализа не дольше slice_ms; True, когда позиция досчитана."""
+        if self._steps is None:
+            return True
+        end = time.perf_counter() + slice_ms / 1000.0
+        for _ in self._steps:
+            now = time.perf_counter()
+            if now >= self._deadline:
+                break  # лимит на позицию - недоказанные клетки так и остаются
+            if now >= end:
+                return False
+        self._steps = None
+        self._store()
+        return True
+
+    def _store(self):
+        self.cache[self.position] = self.values
+        if len(self.cache) > self.cache_positions:
+            self.cache.popitem(last=False)
+
+    # ----------------------------------------
+    # 3x3: РЕШЁННАЯ ТАБЛИЦА
+    # ----------------------------------------
+    def _fill_from_table(self, x_bits, o_bits):
+        """Значение хода = значение позиции после него с обратным знаком, полуходов - на один больше."""
+        x_turn = solver.x_to_move(x_bits, o_bits)
+        for idx in search.iter_bits(self.rules.full_mask & ~(x_bits | o_bits)):
+            bit = self.rules.cell_bits[idx]
+            if x_turn:
+                value, plies, _ = self.table.lookup(x_bits | bit, o_bits)
+            else:
+                value, plies, _ = self.table.lookup(x_bits, o_bits | bit)
+            self.values[idx] = (-value, plies + 1)
+
+    # ----------------------------------------
+    # БОЛЬШИЕ ПОЛЯ: ПОИСК ПО КЛЕТКАМ
+    # ----------------------------------------
+    def _orbits(self, me, opp, cells):
+        """{клетка: представитель} - клетки, симметричные при симметрии самой позиции."""
+        sym = self.searcher.symmetry
+        mask = me | opp << self.rules.cells
+        perms = [sym.perms[t] for t in range(1, 8) if sym.transform(t, mask) == mask]
+        rep = {}
+        for idx in cells:
+            if idx not in rep:
+                for perm in perms:
+                    rep.setdefault(perm[idx], idx)
+                rep[idx] = idx
+        return rep
+
+    def _search_cells(self, me, opp):
+        """
+        Генератор (как search.AlphaBetaSearch.iter_best_move): глубина растёт для
+        всех недоказанных клеток по очереди, так что грубая картина по всему
+        полю появляется сразу, а доказанные исходы - по мере углубления.
+        """
+        rules = self.rules
+        searcher = self.searcher
+        searcher.deadline = float("inf")  # время ограничивает step(), а не сам поиск
+        cells = list(search.iter_bits(rules.full_mask & ~(me | opp)))
+        rep = self._orbits(me, opp, cells)
+        pending = [idx for idx in cells if rep[idx] == idx]
+        me_lines = rules.line_counts(me)
+        opp_lines = rules.line_counts(opp)
+        exhaustive = searcher.move_radius is None
+        empties = len(cells)
+        window = search.WIN_SCORE + 1
+        for depth in range(1, empties + 1):
+            for idx in list(pending):
+                new_lines = me_lines + rules.cell_line_incs[idx]
+                if new_lines & rules.line_full_bits:
+                    value = (WIN, 1)
+                else:
+                    score = -(yield from searcher.negamax(opp, me | rules.cell_bits[idx], depth - 1,
+                                                          -window, window, 1, opp_lines, new_lines))
+                    if score > search.MATE_BOUND:
+                        value = (WIN, search.WIN_SCORE - score)
+                    elif score < -search.MATE_BOUND:
+                        value = (LOSS, search.WIN_SCORE + score)
+                    elif depth == empties and exhaustive:
+                        value = (DRAW, empties)
+                    else:
+                        value = (None, depth)
+                if value[0] is not None:
+                    pending.remove(idx)
+                for cell in cells:
+                    if rep[cell] == idx:
+                        self.values[cell] = value
+                self.version += 1
+                yield
+            if not pending:
+                break
+
+
+def label(value):
+    """Короткая надпись для клетки: +5 (выигрыш за 5 полуходов), -4, 0 (ничья), ? (не доказано)."""
+    outcome, plies = value
+    if outcome == WIN:
+        return "+%d" % plies
+    if outcome == LOSS:
+        return "-%d" % plies
+    if outcome == DRAW:
+        return "0"
+    return "?"
@@ -0,0 +1,174 @@
+"""
+Загрузка ресурсов игры: картинки, шрифты, звуки.
+
+- пути считаются от папки с кодом, а не от текущего каталога;
+- картинки один раз масштабируются и переводятся в формат экрана
+  (convert / convert_alpha), чтобы blit не конвертировал пиксели каждый кадр;
+- шрифты одного файла и размера создаются один раз и переиспользуются;
+- всё загружается лениво, при первом обращении, и кэшируется;
+- если рядом лежит assets.bundle, картинки нужного размера берутся из него
+  уже масштабированными (без декодирования PNG и масштабирования).
+"""
+import json
+import os
+import struct
+import zlib
+
+import pygame
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_FILE = os.path.join(ASSET_DIR, "assets.bundle")
+BUNDLE_MAGIC = b"TTTA1\n"
+
+_images = {}
+_fonts = {}
+_sounds = {}
+_bundle_index = None
+_bundle_data_start = 0
+
+_to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+_from_bytes = getattr(pygame.image, "frombytes", None) or pygame.image.fromstring
+
+
+def asset_path(name):
+    """Абсолютный путь к файлу рядом с кодом игры."""
+    return os.path.join(ASSET_DIR, name)
+
+
+def _image_key(name, size, alpha):
+    w, h = size if size else (0, 0)
+    return "%s@%dx%d%s" % (name, w, h, "a" if alpha else "")
+
+
+def _display_ready():
+    return pygame.display.get_surface() is not None
+
+
+# ----------------------------------------
+# КАРТИНКИ
+# ----------------------------------------
+def image(name, size=None, alpha=False):
+    """
+    Картинка name, масштабированная до size, в формате экрана; None, если файла нет.
+    alpha=True - с прозрачностью (convert_alpha).
+    """
+    key = _image_key(name, size, alpha)
+    if key in _images:
+        return _images[key]
+
+    surf = _load_from_bundle(key)
+    if surf is None:
+        try:
+            surf = pygame.image.load(asset_path(name))
+        except (pygame.error, OSError):
+            _images[key] = None
+            return None
+        if size and surf.get_size() != tuple(size):
+            surf = pygame.transform.scale(surf, size)
+
+    if _display_ready():
+        surf = surf.convert_alpha() if alpha else surf.convert()
+    _images[key] = surf
+    return surf
+
+
+def _read_bundle_index():
+    """Читаем только заголовок файла; сами картинки - по требованию."""
+    global _bundle_index, _bundle_data_start
+    if _bundle_index is None:
+        _bundle_index = {}
+        try:
+            with open(BUNDLE_FILE, "rb") as f:
+                if f.read(len(BUNDLE_MAGIC)) == BUNDLE_MAGIC:
+                    (header_len,) = struct.unpack("<I", f.read(4))
+                    _bundle_index = json.loads(f.read(header_len).decode("utf-8"))
+                    _bundle_data_start = len(BUNDLE_MAGIC) + 4 + header_len
+        except (OSError, ValueError, struct.error):
+            _bundle_index = {}
+    return _bundle_index
+
+
+def _load_from_bundle(key):
+    entry = _read_bundle_index().get(key)
+    if entry is None:
+        return None
+    offset, length, w, h, fmt = entry
+    try:
+        with open(BUNDLE_FILE, "rb") as f:
+            f.seek(_bundle_data_start + offset)
+            data = zlib.decompress(f.read(length))
+    except (OSError, zlib.error):
+        return None
+    return _from_bytes(data, (w, h), fmt)
+
+
+def save_bundle(path=BUNDLE_FILE):
+    """Упаковать все загруженные картинки (уже в нужном размере) в один файл."""
+    header = {}
+    blobs = []
+    data_offset = 0
+    for key, surf in _images.items():
+        if surf is None:
+            continue
+        fmt = "RGBA" if key.endswith("a") else "RGB"
+        blob = zlib.compress(_to_bytes(surf, fmt), 6)
+        header[key] = [data_offset, len(blob), surf.get_width(), surf.get_height(), fmt]
+        blobs.append(blob)
+        data_offset += len(blob)
+
+    # смещения в заголовке - от начала данных (сразу после заголовка)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+# ----------------------------------------
+# ШРИФТЫ И ЗВУКИ
+# ----------------------------------------
+def font(name, size):
+    """Общий объект шрифта: name - файл рядом с кодом или None для системного."""
+    key = (name, size)
+    f = _fonts.get(key)
+    if f is None:
+        if name is None:
+            f = pygame.font.SysFont(None, size)
+        else:
+            f = pygame.font.Font(asset_path(name), size)
+        _fonts[key] = f
+    return f
+
+
+def sound(name, volume=1.0):
+    """Звук загружается при первом проигрывании; None, если файла нет."""
+    if name not in _sounds:
+        try:
+            snd = pygame.mixer.Sound(asset_path(name))
+            snd.set_volume(volume)
+        except (pygame.error, OSError):
+            snd = None
+        _sounds[name] = snd
+    return _sounds[name]
+
+
+def play_sound(name, volume=1.0):
+    snd = sound(name, volume)
+    if snd:
+        snd.play()
+
+
+def play_music(name, volume):
+    """Фоновая музыка по кругу; False, если файла нет."""
+    try:
+        pygame.mixer.music.load(asset_path(name))
+        pygame.mixer.music.play(-1)  # зациклить
+        pygame.mixer.music.set_volume(volume)
+    except pygame.error:
+        return False
+    return True
@@ -0,0 +1,99 @@
+"""
+Пакетная оценка позиций на NumPy - для аналитики и генерации датасетов.
+
+На вход - массив (N, n, n) из 0 (пусто), 1 (X), 2 (O). За один векторный проход
+по маскам линий для каждой доски определяются победитель, выигрышная линия
+и признак конца партии - без цикла Python по доскам.
+
+Пример:
+    res = batch.evaluate_boards(boards)          # boards.shape == (N, 3, 3)
+    res.winner[i], res.line[i], res.terminal[i]
+    batch.line_info(res.line[i])                 # ("row", r) и т.п., как в check_winner
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+import engine
+
+NONE = 0   # партия продолжается
+DRAW = 3   # ничья (1 и 2 - победа X и O)
+NO_LINE = -1
+
+CHUNK = 1 << 16  # досок за один проход - ограничивает временную память
+
+BatchResult = namedtuple("BatchResult", "winner line terminal")
+
+
+@lru_cache(maxsize=None)
+def _rules(size, win_length):
+    return engine.Rules(size, win_length)
+
+
+@lru_cache(maxsize=None)
+def line_cells(size, win_length=None):
+    """Матрица (число_линий, win_length) номеров клеток в порядке engine.Rules.win_lines."""
+    rules = _rules(size, win_length or size)
+    return np.array([[i for i in range(rules.cells) if m >> i & 1] for m in rules.win_masks],
+                    dtype=np.intp)
+
+
+def line_info(line, size=3, win_length=None):
+    """win_info для номера линии из BatchResult.line (None для NO_LINE)."""
+    if line == NO_LINE:
+        return None
+    return _rules(size, win_length or size).win_lines[int(line)][1]
+
+
+def evaluate_boards(boards, win_length=None):
+    """
+    Оценить пачку досок (N, n, n).
+
+    winner   - int8: NONE, 1, 2 или DRAW (при двух собранных линиях - как check_winner:
+               первая по порядку линия, X раньше O),
+    line     - int16: номер выигрышной линии или NO_LINE,
+    terminal - bool: партия окончена.
+    """
+    boards = np.asarray(boards)
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2]:
+        raise ValueError("ожидается массив формы (N, n, n)")
+    count, size = boards.shape[0], boards.shape[1]
+    cells = line_cells(size, win_length)
+    flat = boards.reshape(count, size * size)
+
+    winner = np.zeros(count, dtype=np.int8)
+    line = np.full(count, NO_LINE, dtype=np.int16)
+    terminal = np.zeros(count, dtype=bool)
+
+    for start in range(0, count, CHUNK):
+        part = flat[start:start + CHUNK]
+        stones = part[:, cells]                     # (n, линии, win_length)
+        x_win = (stones == 1).all(axis=2)           # (n, линии)
+        o_win = (stones == 2).all(axis=2)
+        any_win = x_win | o_win
+        has_win = any_win.any(axis=1)
+        first = any_win.argmax(axis=1)
+        rows = np.arange(part.shape[0])
+
+        w = np.where(x_win[rows, first], 1, 2).astype(np.int8)
+        full = (part != 0).all(axis=1)
+
+        sl = slice(start, start + part.shape[0])
+        winner[sl] = np.where(has_win, w, np.where(full, DRAW, NONE))
+        line[sl] = np.where(has_win, first, NO_LINE)
+        terminal[sl] = has_win | full
+
+    return BatchResult(winner, line, terminal)
+
+
+def scores(result, side):
+    """
+    Оценка как у evaluate_board(): +1 - победа side, -1 - поражение, 0 - ничья
+    или партия не окончена (их различает result.terminal).
+    """
+    winner = result.winner
+    out = np.zeros(winner.shape, dtype=np.int8)
+    out[winner == side] = 1
+    out[winner == 3 - side] = -1
+    return out
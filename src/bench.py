@@ -0,0 +1,319 @@
+"""
+Набор бенчмарков горячих путей: ядро, поиск, ход компьютера, отрисовка, счёт.
+
+Запускается без окна и звука (SDL dummy), результаты - в JSON. С сохранённым
+базовым замером (bench_baseline.json) сравнивается каждая метрика: если она
+хуже базовой больше чем на --threshold (по умолчанию 20%), скрипт завершается
+с кодом 1 - так замедление видно до того, как игра попадёт на автоматы.
+Каждая группа прогоняется --runs раз (по умолчанию 5), и берётся медиана
+по прогонам - и для базы, и для сравнения, так что один шумный прогон
+(соседний процесс, fsync) не проваливает проверку. Метрикам, шумным по
+природе, порог задан отдельно (THRESHOLDS).
+Базовый замер зависит от машины: после смены железа его пересохраняют.
+
+    python bench.py                          # замер + сравнение с базой
+    python bench.py --only engine search     # только часть групп
+    python bench.py --save-baseline          # записать новую базу
+    python bench.py --json bench.json        # сохранить результаты
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import ai
+import book
+import core
+import engine
+import scorejournal
+import search
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "bench_baseline.json")
+THRESHOLD = 0.2
+THRESHOLDS = {"scoreboard_record": 0.5, "scoreboard_compact": 0.5}  # время fsync гуляет сильнее
+RUNS = 5           # прогонов каждой группы, берётся медиана
+MIN_TIME_S = 0.3   # сколько минимум крутим каждый замер
+REPEAT = 3         # замеров, берётся лучший
+
+
+def _per_call(fn, min_time=MIN_TIME_S, repeat=REPEAT):
+    """Секунд на вызов fn(): лучший из repeat замеров по >= min_time каждый."""
+    best = None
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        t = elapsed / calls
+        best = t if best is None else min(best, t)
+    return best
+
+
+def _metric(value, unit, better):
+    """better: "higher" (операций в секунду) или "lower" (задержка)."""
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _random_positions(rules, count, seed=0):
+    """Позиции (x, o) из случайных партий - для замеров проверки победы."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < count:
+        state = engine.GameState(rules)
+        while state.winner is None and len(out) < count:
+            free = [i for i in range(rules.cells) if state.is_free(i)]
+            state.play(rng.choice(free))
+            out.append((state.x, state.o))
+    return out
+
+
+# ----------------------------------------
+# ГРУППЫ ЗАМЕРОВ
+# ----------------------------------------
+def bench_engine():
+    """Проверка победы: полный просмотр линий и ход/отмена со счётчиками линий."""
+    results = {}
+    for size, win in ((3, 3), (15, 5)):
+        rules = engine.Rules(size, win)
+        positions = _random_positions(rules, 1000)
+
+        def scan():
+            for x, o in positions:
+                rules.check_winner(x, o)
+        t = _per_call(scan)
+        results["check_winner_%dx%d_%d" % (size, size, win)] = _metric(len(positions) / t, "calls/s", "higher")
+
+        moves = []
+        rng = random.Random(1)
+        for _ in range(20):
+            state = engine.GameState(rules)
+            game = []
+            while state.winner is None:
+                cell = rng.choice([i for i in range(rules.cells) if state.is_free(i)])
+                state.play(cell)
+                game.append(cell)
+            moves.append(game)
+        state = engine.GameState(rules)
+
+        def play_undo():
+            for game in moves:
+                for cell in game:
+                    state.play(cell)
+                for _ in game:
+                    state.undo()
+        t = _per_call(play_undo)
+        results["play_undo_%dx%d_%d" % (size, size, win)] = _metric(
+            sum(len(g) for g in moves) / t, "moves/s", "higher")
+    return results
+
+
+def bench_search():
+    """Узлов в секунду у alpha-beta (negamax) с новой таблицей транспозиций."""
+    results = {}
+    for size, win, time_ms in ((3, 3, None), (4, 4, 500), (7, 5, 500)):
+        rules = engine.Rules(size, win)
+        nodes = 0
+        elapsed = 0.0
+        while elapsed < MIN_TIME_S * REPEAT:
+            searcher = search.AlphaBetaSearch(rules)
+            start = time.perf_counter()
+            if time_ms is None:
+                searcher.best_move(0, 0, 60000, rules.cells)
+            else:
+                searcher.best_move(0, 0, time_ms)
+            elapsed += time.perf_counter() - start
+            nodes += searcher.nodes
+        results["negamax_%dx%d_%d" % (size, size, win)] = _metric(nodes / elapsed, "nodes/s", "higher")
+    return results
+
+
+def bench_opening():
+    """Ход компьютера из каждой различной (с точностью до симметрий) позиции первых 2 полуходов 3x3."""
+    rules = engine.CLASSIC
+    positions = []
+    for key in sorted(book.opening_positions(rules, 2)):
+        me, opp = key & rules.full_mask, key >> rules.cells
+        if engine.popcount(me) == engine.popcount(opp):
+            positions.append((me, opp, 1))
+        else:
+            positions.append((opp, me, 2))
+
+    results = {}
+    # как в игре (core.Match.best_move_steps): для 3x3 - таблица solver
+    searcher = search.AlphaBetaSearch(rules)
+
+    def best_move(x, o, side):
+        return lambda: search.run_to_completion(
+            ai.best_move_steps(rules, searcher, x, o, side, search.AI_MOVE_TIME_MS))
+    latencies = [_per_call(best_move(x, o, side), 0.02, 1) for x, o, side in positions]
+    results["best_move_3x3_table_mean"] = _metric(1000 * sum(latencies) / len(latencies), "ms", "lower")
+
+    # поиск без таблицы и без общей таблицы транспозиций - худший случай
+    latencies = []
+    for x, o, side in positions:
+        me, opp = (x, o) if side == 1 else (o, x)
+        start = time.perf_counter()
+        search.AlphaBetaSearch(rules).best_move(me, opp, 60000, rules.cells)
+        latencies.append(time.perf_counter() - start)
+    results["best_move_3x3_search_mean"] = _metric(1000 * sum(latencies) / len(latencies), "ms", "lower")
+    results["best_move_3x3_search_max"] = _metric(1000 * max(latencies), "ms", "lower")
+    results["opening_positions"] = _metric(len(positions), "positions", None)
+    return results
+
+
+def bench_render():
+    """Полная перерисовка поля и целые кадры меню, меню ИИ и партии."""
+    import game  # pygame - только для этой группы
+    pygame = game.pygame
+    tmp = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        # счёт - во временном файле, архив партий не нужен
+        store = scorejournal.ScoreboardStore(os.path.join(tmp, "scoreboard.json"))
+        game.match = core.Match(game.rules, store)
+        game.init_ui()
+        for cell in (4, 0, 8, 2, 6):
+            game.match.state.play(cell)
+
+        def frame(draw):
+            def run():
+                draw()
+                pygame.display.update()
+            return run
+
+        def game_frame():
+            game.board_renderer.invalidate()
+            pygame.display.update(game.board_renderer.render())
+
+        results = {
+            "draw_board": _metric(1000 * _per_call(game.draw_board), "ms", "lower"),
+            "frame_menu": _metric(1000 * _per_call(frame(game.draw_main_menu)), "ms", "lower"),
+            "frame_ai_menu": _metric(1000 * _per_call(frame(game.draw_ai_menu)), "ms", "lower"),
+            "frame_game": _metric(1000 * _per_call(game_frame), "ms", "lower"),
+        }
+        game.match.close()
+        pygame.quit()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def bench_scoreboard():
+    """Запись результата партии (до fsync журнала) и свёртка журнала в снимок."""
+    tmp = tempfile.mkdtemp(prefix="bench_scoreboard_")
+    try:
+        store = scorejournal.ScoreboardStore(os.path.join(tmp, "scoreboard.json"), compact_every=10 ** 9)
+
+        def record():
+            store.record("vs_ai", "human")
+            store.flush()
+        results = {"scoreboard_record": _metric(1000 * _per_call(record, repeat=1), "ms", "lower")}
+        start = time.perf_counter()
+        store.close()
+        results["scoreboard_compact"] = _metric(1000 * (time.perf_counter() - start), "ms", "lower")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+GROUPS = {
+    "engine": bench_engine,
+    "search": bench_search,
+    "opening": bench_opening,
+    "render": bench_render,
+    "scoreboard": bench_scoreboard,
+}
+
+
+# ----------------------------------------
+# СРАВНЕНИЕ С БАЗОЙ
+# ----------------------------------------
+def median_metrics(runs):
+    """Медиана каждой метрики по нескольким прогонам группы."""
+    merged = {}
+    for name, m in runs[0].items():
+        merged[name] = _metric(statistics.median(r[name]["value"] for r in runs), m["unit"], m["better"])
+    return merged
+
+
+def compare(results, baseline, threshold=THRESHOLD, thresholds=THRESHOLDS):
+    """
+    Список (метрика, база, сейчас, изменение) для метрик хуже базы больше чем
+    на порог: thresholds[метрика], если задан, иначе threshold.
+    """
+    regressions = []
+    for name, m in results.items():
+        base = baseline.get(name)
+        if base is None or not m["better"] or not base["value"]:
+            continue
+        change = m["value"] / base["value"] - 1
+        limit = thresholds.get(name, threshold)
+        if (m["better"] == "higher" and change < -limit) or (m["better"] == "lower" and change > limit):
+            regressions.append((name, base["value"], m["value"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки ядра, ИИ и отрисовки")
+    parser.add_argument("--only", nargs="+", choices=list(GROUPS), help="только эти группы")
+    parser.add_argument("--json", help="сохранить результаты в JSON-файл")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="файл базового замера")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как базу")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="допустимое ухудшение (доля)")
+    parser.add_argument("--runs", type=int, default=RUNS, help="прогонов каждой группы (медиана)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or GROUPS:
+        start = time.perf_counter()
+        part = median_metrics([GROUPS[name]() for _ in range(args.runs)])
+        print("[%s] %.1f с, медиана %d прогонов" % (name, time.perf_counter() - start, args.runs))
+        for metric, m in part.items():
+            print("  %-28s %14.3f %s" % (metric, m["value"], m["unit"]))
+        results.update(part)
+
+    report = {"python": sys.version.split()[0], "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)  # с --only обновляются только замеренные группы
+        report["results"] = baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("База сохранена:", args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        print("Базового замера нет (%s) - сравнивать не с чем" % args.baseline)
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, value, change in regressions:
+        print("ЗАМЕДЛЕНИЕ %s: %.3f -> %.3f (%+.0f%%)" % (name, base, value, 100 * change))
+    if regressions:
+        sys.exit(1)
+    print("Без замедлений (порог %.0f%%)" % (100 * args.threshold))
+
+
+if __name__ == "__main__":
+    main()
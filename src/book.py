@@ -0,0 +1,309 @@
+"""
+Дебютная книга и эндшпильная база для полей больше 3x3 (для 3x3 есть solver.py).
+
+Книга - лучший ход (по поиску с лимитом времени) для каждой позиции первых
+plies полуходов; база - точный результат и лучший ход для позиций, где
+свободно не больше max_empty клеток (позиции берутся из партий самоигры
+и, если указан, из архива партий gamerecords). Позиции сводятся к
+каноническому виду по 8 симметриям (transposition.BoardSymmetry), ключ -
+как в таблице транспозиций: камни ходящего | камни соперника << cells.
+
+Файл book_NxN_K.bin: заголовок (HEADER_SIZE байт) + записи фиксированной
+длины, отсортированные по ключу:
+    ключ (key_width байт, big-endian), ход (номер клетки в канонической
+    ориентации или NO_MOVE), вид (BOOK / EXACT), результат (-1 / 0 / +1
+    для ходящего, только для EXACT), полуходов до конца.
+Файл открывается через mmap, поиск - двоичный прямо по отображению,
+без чтения файла целиком.
+
+    python book.py --size 7 --win 5 --plies 2 --empty 6 --games 200
+"""
+import argparse
+import multiprocessing
+import mmap
+import os
+import random
+import struct
+import time
+
+import ai
+import engine
+import gamerecords
+import search
+import transposition
+
+MAGIC = b"TTTB1\n"
+HEADER_FORMAT = "<6sBBBxHI"  # магия, size, win_length, max_empty, key_width, число записей
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 16
+ENTRY_TAIL = "<BBbB"          # ход, вид, результат, полуходов до конца
+NO_MOVE = 0xFF
+MAX_CELLS = NO_MOVE          # клетка - байт, и 0xFF занят под "хода нет": не больше 255 клеток (15x15)
+
+BOOK = 0   # ход из дебютной книги (поиск с лимитом времени)
+EXACT = 1  # точный результат (эндшпильная база)
+
+CHUNK_POSITIONS = 50  # позиций в одном задании для процесса
+
+
+def book_file(rules):
+    here = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(here, "book_%dx%d_%d.bin" % (rules.size, rules.size, rules.win_length))
+
+
+def _key_width(rules):
+    return (2 * rules.cells + 7) // 8
+
+
+# ----------------------------------------
+# ЧТЕНИЕ
+# ----------------------------------------
+class Book:
+    """Книга + база в файле через mmap; probe() - двоичный поиск по ключу."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError("повреждённый файл книги: %s" % path)
+            magic, size, win_length, max_empty, key_width, count = struct.unpack(HEADER_FORMAT, header)
+            if magic != MAGIC:
+                raise ValueError("повреждённый файл книги: %s" % path)
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else b""
+        self.rules = engine.Rules(size, win_length)
+        self.max_empty = max_empty
+        self.key_width = key_width
+        self.entry_size = key_width + struct.calcsize(ENTRY_TAIL)
+        self.count = count
+        # пустая книга (count == 0) - только заголовок, он проверен выше
+        if count and len(self.buffer) < HEADER_SIZE + count * self.entry_size:
+            raise ValueError("повреждённый файл книги: %s" % path)
+        self.symmetry = transposition.BoardSymmetry(size)
+
+    def __len__(self):
+        return self.count
+
+    def probe(self, key):
+        """(ход, вид, результат, полуходов) для канонического ключа или None."""
+        target = key.to_bytes(self.key_width, "big")
+        buf, width, size = self.buffer, self.key_width, self.entry_size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = HEADER_SIZE + mid * size
+            k = buf[start:start + width]
+            if k < target:
+                lo = mid + 1
+            elif k > target:
+                hi = mid
+            else:
+                return struct.unpack_from(ENTRY_TAIL, buf, start + width)
+        return None
+
+    def probe_exact(self, key):
+        """(результат, полуходов) из эндшпильной базы или None - для поиска."""
+        entry = self.probe(key)
+        if entry is None or entry[1] != EXACT:
+            return None
+        return entry[2], entry[3]
+
+    def best_move(self, me, opp):
+        """Ход (row, col) стороны с камнями me из книги или базы; None - позиции нет."""
+        key, t = self.symmetry.canonical_transform(me, opp)
+        entry = self.probe(key)
+        if entry is None or entry[0] == NO_MOVE:
+            return None
+        return self.rules.cell_coords[self.symmetry.original_cell(t, entry[0])]
+
+
+_books = {}
+
+
+def get_book(rules):
+    """
+    Книга для поля rules (открывается один раз) или None, если файла нет
+    или он построен для других правил.
+    """
+    key = (rules.size, rules.win_length)
+    if key not in _books:
+        try:
+            b = Book(book_file(rules))
+        except (OSError, ValueError, struct.error):
+            b = None
+        if b is not None and (b.rules.size, b.rules.win_length) != key:
+            b = None
+        _books[key] = b
+    return _books[key]
+
+
+def write_book(path, rules, entries, max_empty):
+    """entries: {канонический ключ: (ход, вид, результат, полуходов)}."""
+    width = _key_width(rules)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, rules.size, rules.win_length, max_empty,
+                            width, len(entries)))
+        for key in sorted(entries):
+            f.write(key.to_bytes(width, "big"))
+            f.write(struct.pack(ENTRY_TAIL, *entries[key]))
+    os.replace(tmp, path)
+
+
+# ----------------------------------------
+# ПОСТРОЕНИЕ
+# ----------------------------------------
+_searchers = {}
+
+
+def _searcher(rules, full):
+    """Поиск в процессе пула; full - без отсечения далёких клеток (для точного результата)."""
+    key = (rules.size, rules.win_length, full)
+    if key not in _searchers:
+        # без книги: иначе поиск вернул бы ход из старого файла вместо перебора
+        _searchers[key] = search.AlphaBetaSearch(rules, move_radius=rules.size if full else None)
+    return _searchers[key]
+
+
+def _result(score):
+    """(результат, полуходов) по оценке поиска: форсированный выигрыш/проигрыш или 0."""
+    if score > search.MATE_BOUND:
+        return 1, search.WIN_SCORE - score
+    if score < -search.MATE_BOUND:
+        return -1, search.WIN_SCORE + score
+    return 0, 0
+
+
+def _solve_chunk(task):
+    """Задание для процесса: (size, win_length, kind, time_ms, [ключи])."""
+    size, win_length, kind, time_limit_ms, keys = task
+    rules = engine.Rules(size, win_length)
+    searcher = _searcher(rules, kind == EXACT)
+    out = []
+    for key in keys:
+        me, opp = key & rules.full_mask, key >> rules.cells
+        empties = rules.cells - engine.popcount(me | opp)
+        if kind == EXACT:
+            move = searcher.best_move(me, opp, time_limit_ms, empties)
+            value, plies = _result(searcher.last_score)
+            # точный результат - только из досчитанной итерации: если время
+            # вышло посреди итерации, её оценка (в т.ч. -1) смотрела не все ходы
+            if time.perf_counter() > searcher.deadline and searcher.last_depth < empties:
+                continue
+            if value == 0:
+                if searcher.last_depth < empties:
+                    continue  # не успели досчитать - точного результата нет
+                plies = empties
+        else:
+            move = searcher.best_move(me, opp, time_limit_ms)
+            value, plies = 0, 0
+        cell = NO_MOVE if move is None else move[0] * size + move[1]
+        out.append((key, (cell, kind, value, plies)))
+    return out
+
+
+def opening_positions(rules, plies):
+    """Канонические ключи всех позиций первых plies полуходов (партия ещё идёт)."""
+    symmetry = transposition.BoardSymmetry(rules.size)
+    level = {0: engine.GameState(rules)}
+    keys = set(level)
+    for _ in range(plies):
+        nxt = {}
+        for state in level.values():
+            for cell in range(rules.cells):
+                if not state.is_free(cell):
+                    continue
+                state.play(cell)
+                if state.winner is None:
+                    me, opp = (state.x, state.o) if state.player == 1 else (state.o, state.x)
+                    key = symmetry.canonical(me, opp)
+                    if key not in keys and key not in nxt:
+                        nxt[key] = state.copy()
+                state.undo()
+        keys.update(nxt)
+        level = nxt
+    return keys
+
+
+def endgame_positions(rules, max_empty, games, seed=0, difficulty=0.5, archive=None):
+    """
+    Канонические ключи позиций с <= max_empty свободными клетками из партий
+    самоигры (ход - как у ИИ уровня difficulty) и из архива партий.
+    """
+    symmetry = transposition.BoardSymmetry(rules.size)
+    keys = set()
+
+    def collect(state):
+        if state.winner is None and state.free <= max_empty:
+            me, opp = (state.x, state.o) if state.player == 1 else (state.o, state.x)
+            keys.add(symmetry.canonical(me, opp))
+
+    rng = random.Random(seed)
+    searcher = search.AlphaBetaSearch(rules)
+    for _ in range(games):
+        state = engine.GameState(rules)
+        while state.winner is None:
+            collect(state)
+            r, c = ai.choose_move(rules, searcher, state.x, state.o, state.player, difficulty, 20, rng)
+            state.play(r * rules.size + c)
+
+    if archive is not None:
+        for rec in gamerecords.GameArchive(archive):
+            state = engine.GameState(rules)
+            for cell in rec.moves:
+                collect(state)
+                state.play(cell)
+    return keys
+
+
+def build(rules, plies=2, max_empty=6, games=100, time_limit_ms=500, workers=None, seed=0,
+          archive=None, path=None):
+    """Построить книгу и базу и записать файл; возвращает число записей."""
+    if rules.cells > MAX_CELLS:
+        raise ValueError("книга строится для полей до %d клеток" % MAX_CELLS)
+    opening = opening_positions(rules, plies)
+    endgame = endgame_positions(rules, max_empty, games, seed, archive=archive)
+    print("позиций: дебют %d, эндшпиль %d" % (len(opening), len(endgame)))
+
+    tasks = []
+    for kind, keys, limit in ((BOOK, sorted(opening), time_limit_ms),
+                              (EXACT, sorted(endgame), 60000)):
+        for i in range(0, len(keys), CHUNK_POSITIONS):
+            tasks.append((rules.size, rules.win_length, kind, limit, keys[i:i + CHUNK_POSITIONS]))
+
+    entries = {}
+    with multiprocessing.Pool(workers) as pool:
+        for chunk in pool.imap_unordered(_solve_chunk, tasks):
+            for key, entry in chunk:
+                # точный результат базы важнее хода книги
+                if key not in entries or entry[1] == EXACT:
+                    entries[key] = entry
+    write_book(path or book_file(rules), rules, entries, max_empty)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Дебютная книга и эндшпильная база")
+    parser.add_argument("--size", type=int, default=5)
+    parser.add_argument("--win", type=int, default=None, help="длина линии (по умолчанию = size)")
+    parser.add_argument("--plies", type=int, default=2, help="глубина дебютной книги")
+    parser.add_argument("--empty", type=int, default=6, help="свободных клеток в позициях базы")
+    parser.add_argument("--games", type=int, default=100, help="партий самоигры для базы")
+    parser.add_argument("--archive", help="архив партий (gamerecords) - ещё позиции для базы")
+    parser.add_argument("--time-ms", type=int, default=500, help="поиск на позицию книги")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rules = engine.Rules(args.size, args.win or args.size)
+    if ai.is_classic(rules):
+        parser.error("для 3x3 есть полная таблица (solver.py)")
+    if rules.cells > MAX_CELLS:
+        parser.error("книга строится для полей до %d клеток (15x15)" % MAX_CELLS)
+    start = time.perf_counter()
+    n = build(rules, args.plies, args.empty, args.games, args.time_ms, args.workers, args.seed,
+              args.archive)
+    print("%d записей за %.1f с -> %s" % (n, time.perf_counter() - start, book_file(rules)))
+
+
+if __name__ == "__main__":
+    main()
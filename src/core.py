@@ -0,0 +1,221 @@
+"""
+Партия без pygame: поле, ходы игроков и компьютера, просмотр, счёт и архив.
+
+game.py - только окно, ввод, звук и отрисовка поверх Match; скрипты,
+анализ и процессы-помощники импортируют этот модуль, не поднимая SDL.
+
+    match = core.Match(engine.Rules(3, 3))
+    match.start("vs_ai", human_side=2, difficulty=ai.DIFFICULTIES["hard"])
+    row, col = search.run_to_completion(match.computer_move_steps())
+    match.play(row, col)
+"""
+import os
+
+import ai
+import book
+import engine
+import gamerecords
+import mcts
+import profiler
+import ratings
+import search
+
+AI_MOVE_TIME_MS = 1000   # жёсткий лимит времени на ход компьютера
+MCTS_MIN_SIZE = 9        # с этого размера поля компьютер играет MCTS (mcts.py), а не alpha-beta
+# процессов MCTS у игры: все ядра, кроме одного - на нём отрисовка и музыка;
+# меньше - ключом game.py --mcts-workers
+MCTS_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+MODES = gamerecords.MODES
+
+
+def make_searcher(rules, workers=MCTS_WORKERS):
+    """
+    Поиск хода компьютера для поля rules. Alpha-beta с итеративным углублением
+    (таблица транспозиций общая для всех партий - значения считаются от ходящей
+    стороны) и книгой, если она построена; на больших полях - MCTS, деревья
+    в процессах-помощниках живут между ходами.
+    """
+    if rules.size >= MCTS_MIN_SIZE:
+        return mcts.MCTSPlayer(rules, workers=workers)
+    return search.AlphaBetaSearch(rules, book=book.get_book(rules))
+
+
+def scoreboard_result(mode, human_side, winner):
+    """Исход для счёта: на двоих - 1 / 2 / 'draw', против ИИ - 'human' / 'computer' / 'draw'."""
+    if winner == 'draw' or mode == "two_players":
+        return winner
+    return 'human' if winner == human_side else 'computer'
+
+
+def stats_lines(scoreboard):
+    """Строки блока статистики для главного меню."""
+    tp = scoreboard["two_players"]
+    va = scoreboard["vs_ai"]
+    return [f"2P: сыграно {tp['games_played']}",
+            f" P1:{tp['player1_wins']} P2:{tp['player2_wins']} D:{tp['draws']}",
+            f"vsAI: сыграно {va['games_played']}",
+            f" Human:{va['human_wins']} PC:{va['computer_wins']} D:{va['draws']}"]
+
+
+class Match:
+    """
+    Текущая партия: режим, стороны, сложность, поле (engine.GameState) и исход.
+    Законченная партия записывается в счёт (scorejournal.ScoreboardStore),
+    архив (gamerecords.GameLog) и рейтинги (ratings.RatingsDB), если они переданы.
+    player_names - профили первого и второго игрока (против ИИ играет первый).
+    frame_profiler (profiler.FrameProfiler) замеряет фазы хода: поиск линии
+    и запись исхода.
+    """
+
+    def __init__(self, rules, scoreboard_store=None, game_log=None, searcher=None,
+                 time_limit_ms=AI_MOVE_TIME_MS, ratings_db=None, player_names=("Игрок 1", "Игрок 2"),
+                 frame_profiler=None):
+        self.rules = rules
+        self.profiler = frame_profiler if frame_profiler is not None else profiler.FrameProfiler()
+        self.scoreboard_store = scoreboard_store
+        self.game_log = game_log
+        self.ratings_db = ratings_db
+        self.player_names = list(player_names)
+        self.searcher = searcher if searcher is not None else make_searcher(rules)
+        self.time_limit_ms = time_limit_ms
+        # при рестарте поле очищается, а не создаётся заново
+        self.state = engine.GameState(rules)
+        self.mode = None
+        self.human_side = 1
+        self.difficulty = ai.DIFFICULTIES["impossible"]
+        self.game_over = False
+        self.winner = None
+        self.replay_moves = None  # просмотр законченной партии: все её ходы (None - просмотра нет)
+
+    @property
+    def comp_side(self):
+        return 2 if self.human_side == 1 else 1
+
+    def side_names(self):
+        """(профиль X, профиль O): на двоих - по порядку, против ИИ - человек и уровень компьютера."""
+        if self.mode == "two_players":
+            return tuple(self.player_names)
+        computer = ratings.ai_name(gamerecords.difficulty_name(self.difficulty))
+        human = self.player_names[0]
+        return (human, computer) if self.human_side == 1 else (computer, human)
+
+    def start(self, mode, human_side=None, difficulty=None):
+        """Новая партия в режиме mode ("two_players" / "vs_ai")."""
+        if mode not in MODES:
+            raise ValueError("неизвестный режим: %r" % (mode,))
+        self.mode = mode
+        if human_side is not None:
+            self.human_side = human_side
+        if difficulty is not None:
+            self.difficulty = difficulty
+        self.restart()
+
+    def restart(self):
+        """Сброс поля и исхода; режим и стороны сохраняются."""
+        self.state.reset()  # X всегда ходит первым, в любом режиме
+        self.game_over = False
+        self.winner = None
+        self.replay_moves = None
+
+    def is_computer_turn(self):
+        return self.mode == "vs_ai" and not self.game_over and self.state.player == self.comp_side
+
+    def is_human_turn(self):
+        return not self.game_over and (self.mode == "two_players" or self.state.player == self.human_side)
+
+    def is_cell_free(self, row, col):
+        size = self.rules.size
+        return 0 <= row < size and 0 <= col < size and self.state.is_free(row * size + col)
+
+    def play(self, row, col):
+        """Ход текущего игрока в (row, col); возвращает исход (1 | 2 | 'draw') или None."""
+        if self.game_over:
+            raise ValueError("партия окончена")
+        with self.profiler.phase("check_winner"):  # линия ищется при постановке камня
+            self.state.play(row * self.rules.size + col)
+        if self.state.winner is not None:
+            self.game_over = True
+            self.winner = self.state.winner
+            with self.profiler.phase("record_result"):
+                self._finish()
+        return self.winner
+
+    def _finish(self):
+        """Законченная партия - в архив, счёт и рейтинги."""
+        if self.game_log is not None:
+            diff = gamerecords.difficulty_name(self.difficulty) if self.mode == "vs_ai" else None
+            self.game_log.record(gamerecords.GameRecord(self.mode, self.human_side, diff, self.winner,
+                                                        tuple(self.state.moves)))
+        if self.scoreboard_store is not None:
+            self.scoreboard_store.record(self.mode, scoreboard_result(self.mode, self.human_side,
+                                                                      self.winner))
+        x_name, o_name = self.side_names()
+        if self.ratings_db is not None and ratings.name_key(x_name) != ratings.name_key(o_name):
+            self.ratings_db.record(x_name, o_name, self.winner, self.mode,
+                                   self.rules.size, self.rules.win_length)
+
+    def load_moves(self, moves):
+        """
+        Позиция по списку ходов (синхронизация сетевой партии, lan.py); партия,
+        законченная этими ходами, в счёт и архив повторно не записывается.
+        """
+        self.state.reset()
+        for cell in moves:
+            self.state.play(cell)
+        self.replay_moves = None
+        self.winner = self.state.winner
+        self.game_over = self.winner is not None
+
+    # ----------------------------------------
+    # ХОД КОМПЬЮТЕРА
+    # ----------------------------------------
+    def best_move_steps(self):
+        """Генератор лучшего хода компьютера: для 3x3 - решённая таблица, иначе - поиск."""
+        state = self.state
+        return (yield from ai.best_move_steps(self.rules, self.searcher, state.x, state.o,
+                                              self.comp_side, self.time_limit_ms))
+
+    def computer_move_steps(self):
+        """Генератор хода компьютера с учётом сложности (см. search.SearchTask)."""
+        state = self.state
+        return (yield from ai.choose_move_steps(self.rules, self.searcher, state.x, state.o,
+                                                self.comp_side, self.difficulty, self.time_limit_ms))
+
+    # ----------------------------------------
+    # ПРОСМОТР
+    # ----------------------------------------
+    def load_replay(self, rec):
+        """Открыть партию из архива (gamerecords.GameRecord) для просмотра."""
+        self.mode, self.human_side = rec.mode, rec.human_side
+        self.state.reset()
+        for cell in rec.moves:
+            self.state.play(cell)
+        self.replay_moves = None
+        self.game_over = True
+        self.winner = rec.outcome
+
+    def step_replay(self, delta):
+        """Ход назад (delta < 0) или вперёд по законченной партии."""
+        state = self.state
+        if self.replay_moves is None:
+            self.replay_moves = list(state.moves)
+        ply = max(0, min(len(self.replay_moves), state.ply + delta))
+        while state.ply > ply:
+            state.undo()
+        while state.ply < ply:
+            state.play(self.replay_moves[state.ply])
+        if ply == len(self.replay_moves):
+            self.replay_moves = None
+
+    def close(self):
+        """Дописать журнал счёта, закрыть архив и остановить процессы поиска."""
+        if self.scoreboard_store is not None:
+            self.scoreboard_store.close()
+        if self.game_log is not None:
+            self.game_log.close()
+        if self.ratings_db is not None:
+            self.ratings_db.close()
+        close = getattr(self.searcher, "close", None)
+        if close is not None:
+            close()
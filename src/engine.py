@@ -0,0 +1,309 @@
+"""
+Битбордовое ядро игры "крестики-нолики" для поля N x N и линии из K камней.
+
+Камни каждой стороны хранятся как целое число (битовая маска):
+бит с номером (row * size + col) установлен, если в клетке (row, col) стоит камень.
+Победа проверяется сравнением с заранее посчитанными масками линий,
+ничья - одним сравнением с маской полного поля.
+
+Для проверки после каждого хода (GameState, поиск) есть и счётчики камней
+по линиям: все счётчики стороны упакованы в одно целое, ход прибавляет
+к нему заранее посчитанное число (единицы в полях линий через клетку),
+а собранная линия видна по одному "&" - см. Rules.line_bits.
+"""
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(x):
+        return bin(x).count("1")
+
+
+# Направления линий: (dr, dc, вид линии для get_win_line_coords)
+_DIRECTIONS = ((0, 1, "row"), (1, 0, "col"), (1, 1, "diag"), (1, -1, "diag"))
+
+
+class Rules:
+    """
+    Геометрия поля size x size с победой при win_length камнях подряд.
+
+    win_lines - список (маска, win_info). win_info имеет вид ("row", r), ("col", c),
+    ("diag", 1) - главная, ("diag", 2) - побочная диагональ. Если линия короче
+    стороны поля, третьим элементом добавляется начало отрезка:
+    ("row", r, c0), ("col", c, r0), ("diag", 1 | 2, (r0, c0)).
+    """
+
+    def __init__(self, size=3, win_length=None):
+        if win_length is None:
+            win_length = size
+        if not 1 <= win_length <= size:
+            raise ValueError("win_length должен быть от 1 до size")
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full_mask = (1 << self.cells) - 1
+        self.cell_bits = tuple(1 << i for i in range(self.cells))
+        self.cell_coords = tuple(divmod(i, size) for i in range(self.cells))
+
+        first_col = 0
+        for r in range(size):
+            first_col |= self.cell_bit(r, 0)
+        self.not_first_col = self.full_mask & ~first_col
+        self.not_last_col = self.full_mask & ~(first_col << (size - 1))
+
+        self.win_lines = []
+        for dr, dc, kind in _DIRECTIONS:
+            for r0 in range(size):
+                for c0 in range(size):
+                    r1 = r0 + dr * (win_length - 1)
+                    c1 = c0 + dc * (win_length - 1)
+                    if not (0 <= r1 < size and 0 <= c1 < size):
+                        continue
+                    mask = 0
+                    for k in range(win_length):
+                        mask |= self.cell_bit(r0 + dr * k, c0 + dc * k)
+                    self.win_lines.append((mask, self._line_info(kind, dc, r0, c0)))
+        self.win_masks = tuple(m for m, _ in self.win_lines)
+
+        # Линии, проходящие через каждую клетку, - для проверки после хода
+        self.lines_through = tuple(
+            tuple(m for m in self.win_masks if m & self.cell_bits[i])
+            for i in range(self.cells)
+        )
+
+        # Упакованные счётчики камней: по line_bits бит на линию. Поле линии
+        # начинается со значения 2^(line_bits-1) - win_length, поэтому на
+        # win_length-м камне в нём взводится старший бит (line_full_bits).
+        w = self.line_bits = win_length.bit_length() + 1
+        lines = range(len(self.win_masks))
+        self.empty_line_counts = sum(((1 << (w - 1)) - win_length) << (i * w) for i in lines)
+        self.line_full_bits = sum(1 << (i * w + w - 1) for i in lines)
+        self.cell_line_incs = tuple(
+            sum(1 << (i * w) for i in lines if self.win_masks[i] & self.cell_bits[c])
+            for c in range(self.cells)
+        )
+
+    def _line_info(self, kind, dc, r0, c0):
+        full = self.win_length == self.size
+        if kind == "row":
+            return ("row", r0) if full else ("row", r0, c0)
+        if kind == "col":
+            return ("col", c0) if full else ("col", c0, r0)
+        idx = 1 if dc == 1 else 2
+        return ("diag", idx) if full else ("diag", idx, (r0, c0))
+
+    def cell_bit(self, row, col):
+        """Бит клетки (row, col)."""
+        return 1 << (row * self.size + col)
+
+    def is_win(self, bits):
+        """True, если в маске bits есть собранная линия."""
+        for m in self.win_masks:
+            if bits & m == m:
+                return True
+        return False
+
+    def wins_with(self, bits, index):
+        """Собрана ли линия через клетку index (проверка только после хода в неё)."""
+        for m in self.lines_through[index]:
+            if bits & m == m:
+                return True
+        return False
+
+    def neighbours(self, mask, radius=1):
+        """Клетки маски mask и все клетки не дальше radius от них (по 8 направлениям)."""
+        n = self.size
+        for _ in range(radius):
+            h = mask | ((mask >> 1) & self.not_last_col) | ((mask << 1) & self.not_first_col)
+            mask = (h | (h << n) | (h >> n)) & self.full_mask
+        return mask
+
+    def line_counts(self, bits):
+        """Упакованные счётчики линий для камней bits (обычно их ведут по ходу: + cell_line_incs)."""
+        counts = self.empty_line_counts
+        for i in range(self.cells):
+            if bits >> i & 1:
+                counts += self.cell_line_incs[i]
+        return counts
+
+    def completed_line(self, counts):
+        """Номер собранной линии в win_lines (первой по порядку) или None."""
+        full = counts & self.line_full_bits
+        if not full:
+            return None
+        return ((full & -full).bit_length() - 1) // self.line_bits
+
+    def check_winner(self, x_bits, o_bits):
+        """Проверяем победителя: (1 | 2 | 'draw' | None, win_info)."""
+        for m, info in self.win_lines:
+            if x_bits & m == m:
+                return 1, info
+            if o_bits & m == m:
+                return 2, info
+        if x_bits | o_bits == self.full_mask:
+            return 'draw', None
+        return None, None
+
+    def empty_cells(self, occupied):
+        """Список свободных клеток (row, col) для маски занятых клеток."""
+        bits = self.cell_bits
+        return [self.cell_coords[i] for i in range(self.cells) if not occupied & bits[i]]
+
+
+# ----------------------------------------
+# КЛАССИЧЕСКОЕ ПОЛЕ 3x3
+# ----------------------------------------
+CLASSIC = Rules(3, 3)
+
+SIZE = CLASSIC.size
+CELLS = CLASSIC.cells
+FULL_MASK = CLASSIC.full_mask
+CELL_BITS = CLASSIC.cell_bits
+CELL_COORDS = CLASSIC.cell_coords
+WIN_LINES = CLASSIC.win_lines
+WIN_MASKS = CLASSIC.win_masks
+
+cell_bit = CLASSIC.cell_bit
+is_win = CLASSIC.is_win
+check_winner = CLASSIC.check_winner
+empty_cells = CLASSIC.empty_cells
+
+
+# ----------------------------------------
+# СОСТОЯНИЕ ПАРТИИ
+# ----------------------------------------
+class GameState:
+    """
+    Партия на поле rules: камни X и O (битовые маски), чей ход, исход и стек ходов.
+
+    play() и undo() трогают только линии через сыгранную клетку (счётчики
+    Rules.cell_line_incs) и счётчик свободных клеток, поэтому исход и
+    выигрышная линия известны сразу после хода без пересмотра поля.
+    copy() - дешёвая копия, key - одно целое число для ключей кэша.
+    Rules общие для всех партий, поэтому партия вместе со стеком ходов занимает
+    около 250 байт (поле 3x3).
+    """
+
+    __slots__ = ("rules", "x", "o", "x_lines", "o_lines", "free", "player", "winner",
+                 "win_line", "moves")
+
+    def __init__(self, rules=None):
+        self.rules = rules or CLASSIC
+        self.moves = []
+        self.reset()
+
+    @classmethod
+    def from_moves(cls, rules, moves):
+        """Партия после ходов moves (номера клеток по порядку, X первым)."""
+        state = cls(rules)
+        for cell in moves:
+            state.play(cell)
+        return state
+
+    def reset(self):
+        self.x = 0
+        self.o = 0
+        self.x_lines = self.o_lines = self.rules.empty_line_counts
+        self.free = self.rules.cells
+        self.player = 1
+        self.winner = None   # 1, 2, 'draw' или None - партия идёт
+        self.win_line = None  # номер собранной линии в rules.win_lines
+        self.moves.clear()
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.rules = self.rules
+        state.x = self.x
+        state.o = self.o
+        state.x_lines = self.x_lines
+        state.o_lines = self.o_lines
+        state.free = self.free
+        state.player = self.player
+        state.winner = self.winner
+        state.win_line = self.win_line
+        state.moves = self.moves.copy()
+        return state
+
+    @property
+    def ply(self):
+        return len(self.moves)
+
+    @property
+    def occupied(self):
+        return self.x | self.o
+
+    @property
+    def key(self):
+        """Позиция одним числом: камни X в младших битах, O - в старших."""
+        return self.x | self.o << self.rules.cells
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self.rules is other.rules and self.x == other.x and self.o == other.o
+
+    def get(self, index):
+        """Содержимое клетки index: 0=пусто, 1=X, 2=O."""
+        bit = self.rules.cell_bits[index]
+        if self.x & bit:
+            return 1
+        if self.o & bit:
+            return 2
+        return 0
+
+    def is_free(self, index):
+        return not (self.x | self.o) & self.rules.cell_bits[index]
+
+    @property
+    def win_info(self):
+        """win_info собранной линии (как в Rules.check_winner) или None."""
+        if self.win_line is None:
+            return None
+        return self.rules.win_lines[self.win_line][1]
+
+    def play(self, index):
+        """Ход текущего игрока в клетку index; обновляются только линии через неё."""
+        rules = self.rules
+        bit = rules.cell_bits[index]
+        if self.winner is not None:
+            raise ValueError("партия окончена")
+        if (self.x | self.o) & bit:
+            raise ValueError("клетка занята")
+        if self.player == 1:
+            self.x |= bit
+            lines = self.x_lines = self.x_lines + rules.cell_line_incs[index]
+        else:
+            self.o |= bit
+            lines = self.o_lines = self.o_lines + rules.cell_line_incs[index]
+        self.moves.append(index)
+        self.free -= 1
+        if lines & rules.line_full_bits:
+            self.winner = self.player
+            self.win_line = rules.completed_line(lines)
+        elif not self.free:
+            self.winner = 'draw'
+        self.player = 3 - self.player
+
+    def undo(self):
+        """Отменить последний ход; возвращает номер клетки."""
+        rules = self.rules
+        index = self.moves.pop()
+        bit = rules.cell_bits[index]
+        self.player = 3 - self.player
+        if self.player == 1:
+            self.x &= ~bit
+            self.x_lines -= rules.cell_line_incs[index]
+        else:
+            self.o &= ~bit
+            self.o_lines -= rules.cell_line_incs[index]
+        self.free += 1
+        self.winner = None   # до последнего хода партия ещё шла
+        self.win_line = None
+        return index
+
+    def check_winner(self):
+        """Как Rules.check_winner: (1 | 2 | 'draw' | None, win_info) - без пересмотра поля."""
+        return self.winner, self.win_info
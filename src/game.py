@@ -1,20 +1,44 @@
+import argparse
 import pygame
 import sys
-import math
-import random
-import json
 import os
-import time
 
-pygame.init()
+import ai
+import analysis
+import assets
+import core
+import engine
+import gamerecords
+import lan
+import profiler
+import ratings
+import scorejournal
+import search
+import textcache
+
+# Всё, что требует SDL (окно, шрифты, картинки, звук), создаётся в init_ui(),
+# а игра запускается из main(): импорт модуля не открывает окно и не запускает
+# цикл, а логика партии без pygame - в core.py.
 
 # ----------------------------------------
 # НАСТРОЙКИ ОКНА
 # ----------------------------------------
 WIDTH, HEIGHT = 600, 600
-CELL_SIZE = WIDTH // 3
 LINE_WIDTH = 5
 
+# ----------------------------------------
+# НАСТРОЙКИ ПОЛЯ
+# ----------------------------------------
+# Например 5 и 4 (пять на пять, четыре в ряд) или 15 и 5 (гомоку)
+BOARD_SIZE = 3
+WIN_LENGTH = 3
+AI_SLICE_MS = 6          # сколько миллисекунд тика логики (UPDATE_MS) отдаём поиску
+ANALYSIS_SLICE_MS = 4    # и сколько - анализу клеток (A в партии)
+
+rules = engine.Rules(BOARD_SIZE, WIN_LENGTH)
+CELL_SIZE = WIDTH // BOARD_SIZE
+MARK_PADDING = CELL_SIZE // 10   # отступ X / O от краёв клетки
+
 # ----------------------------------------
 # ОТРИСОВКА / ЦВЕТА / ШРИФТЫ
 # ----------------------------------------
@@ -37,219 +61,131 @@ DARK_CYAN = (0, 153, 153)
 RASPBERRY = (179, 0, 89)
 
 
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Крестики-нолики (Расширенная версия)")
-        
-menu_font = pygame.font.Font("joystix_monospace.ttf", 30)   # шрифт для меню
-game_font = pygame.font.SysFont(None, 60)   # шрифт для результатов
-small_font = pygame.font.SysFont(None, 30)  # шрифт для мелких надписей
+screen = None   # окно - создаётся в init_ui()
+clock = None
 
-clock = pygame.time.Clock()
+MENU_FONT_FILE = "joystix_monospace.ttf"
+menu_font = None    # шрифт для меню
+game_font = None    # шрифт для результатов
+small_font = None   # шрифт для мелких надписей
 
+# Параметры командной строки разбираются в main() (parse_args), а не при импорте:
+# game импортируют bench.py и скрипты проверки.
+# python game.py --debug - подробный лог в консоль
+DEBUG = False
 
+def debug_log(*args):
+    if DEBUG:
+        print(*args)
 
+# F3 - оверлей профилировщика, F4 - сохранить трассу (Chrome trace JSON)
+frame_profiler = profiler.FrameProfiler()
+TRACE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_trace.json")
+# python game.py --fps 30 - реже перерисовывать экран (слабое железо); скорость
+# анимаций и хода компьютера от этого не меняется - логика идёт тиками по UPDATE_MS
+FPS = 60
+IDLE_WAIT_MS = 500   # сколько максимум спим без событий, когда ничего не анимируется
+UPDATE_MS = 1000 / 60         # шаг логики (анимации, порции поиска компьютера)
+MAX_UPDATES_PER_FRAME = 10    # больше тиков за кадр не догоняем - остаток времени теряется
 
 
 
-def render_text_with_outline(text, font, text_color, outline_color, outline_width):
-    """
-    Рендер текста с обводкой.
-    
-    :param text: Текст для отображения.
-    :param font: Объект шрифта Pygame.
-    :param text_color: Цвет основного текста.
-    :param outline_color: Цвет обводки.
-    :param outline_width: Толщина обводки.
-    :return: Поверхность с текстом с обводкой.
-    """
-    text_surface = font.render(text, True, text_color)
-    outline_surface = font.render(text, True, outline_color)
-    outline_size = outline_width
 
-    final_surface = pygame.Surface(
-        (text_surface.get_width() + outline_size * 2, text_surface.get_height() + outline_size * 2),
-        pygame.SRCALPHA
-    )
 
-    for dx in range(-outline_size, outline_size + 1):
-        for dy in range(-outline_size, outline_size + 1):
-            if dx != 0 or dy != 0:
-                final_surface.blit(outline_surface, (dx + outline_size, dy + outline_size))
 
-    final_surface.blit(text_surface, (outline_size, outline_size))
-
-    return final_surface
+# Отрисованные надписи переиспользуются между кадрами
+text_cache = textcache.TextCache()
 
 
 
 # ----------------------------------------
 # ЗАГРУЗКА ИЗОБРАЖЕНИЙ (ШАБЛОНЫ)
 # ----------------------------------------
-try:
-    bg_menu = pygame.image.load("start_backgound.png")
-    bg_menu = pygame.transform.scale(bg_menu, (WIDTH, HEIGHT))
-except:
-    bg_menu = None
-
-try:
-    bg_ai_menu = pygame.image.load("computer_mode_background.png")
-    bg_ai_menu = pygame.transform.scale(bg_ai_menu, (WIDTH, HEIGHT))
-except:
-    bg_ai_menu = None
-
-try:
-    bg_game = pygame.image.load("game_field.png")
-    bg_game = pygame.transform.scale(bg_game, (WIDTH, HEIGHT))
-except:
-    bg_game = None
-
-try:
-    x_skin = pygame.image.load("x_skin.png")
-    x_skin = pygame.transform.scale(x_skin, (CELL_SIZE - 40, CELL_SIZE - 40))
-except:
-    x_skin = None
-
-try:
-    o_skin = pygame.image.load("o_skin.png")
-    o_skin = pygame.transform.scale(o_skin, (CELL_SIZE - 40, CELL_SIZE - 40))
-except:
-    o_skin = None
+# Картинки переводятся в формат экрана один раз (см. assets.py);
+# фон подменю ИИ нужен редко и загружается при первом показе.
+SKIN_SIZE = (CELL_SIZE - 2*MARK_PADDING, CELL_SIZE - 2*MARK_PADDING)
+bg_menu = bg_game = x_skin = o_skin = None   # загружаются в init_ui()
+
+def get_bg_ai_menu():
+    return assets.image("computer_mode_background.png", (WIDTH, HEIGHT))
 
 # ----------------------------------------
 # ЗАГРУЗКА ЗВУКОВ/МУЗЫКИ (ШАБЛОНЫ)
 # ----------------------------------------
-pygame.mixer.init()
-try:
-    pygame.mixer.music.load("background_music.mp3")
-    pygame.mixer.music.play(-1)  # зациклить
-    pygame.mixer.music.set_volume(0.2)
-except:
-    print("Фоновая музыка не найдена. Игра продолжается без музыки.")
-
-try:
-    move_sound = pygame.mixer.Sound("move.wav")
-    move_sound.set_volume(0.5)
-except:
-    move_sound = None
-
-try:
-    win_sound = pygame.mixer.Sound("win.wav")
-    win_sound.set_volume(0.7)
-except:
-    win_sound = None
+# Звуки эффектов подгружаются при первом проигрывании
+MOVE_SOUND = ("move.wav", 0.5)
+WIN_SOUND = ("win.wav", 0.7)
+
+def init_ui():
+    """pygame, окно, шрифты, картинки, музыка и кнопки меню - только при запуске игры."""
+    global screen, clock, menu_font, game_font, small_font, bg_menu, bg_game, x_skin, o_skin
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Крестики-нолики (Расширенная версия)")
+    clock = pygame.time.Clock()
+
+    menu_font = assets.font(MENU_FONT_FILE, 30)
+    game_font = assets.font(None, 60)
+    small_font = assets.font(None, 30)
+
+    bg_menu = assets.image("start_backgound.png", (WIDTH, HEIGHT))
+    bg_game = assets.image("game_field.png", (WIDTH, HEIGHT))
+    x_skin = assets.image("x_skin.png", SKIN_SIZE, alpha=True)
+    o_skin = assets.image("o_skin.png", SKIN_SIZE, alpha=True)
+
+    pygame.mixer.init()
+    if not assets.play_music("background_music.mp3", 0.2):
+        print("Фоновая музыка не найдена. Игра продолжается без музыки.")
+
+    init_main_menu_buttons()
+    init_menu_ai_buttons()
 
 # ----------------------------------------
 # СЧЁТ и СТАТИСТИКА (JSON)
 # ----------------------------------------
-SCOREBOARD_FILE = "scoreboard.json"
-
-# Шаблон структуры счёта / статистики
-scoreboard_template = {
-    "two_players": {
-        "games_played": 0,
-        "player1_wins": 0,
-        "player2_wins": 0,
-        "draws": 0,
-        "best_streak_p1": 0,
-        "best_streak_p2": 0,
-        "current_streak_p1": 0,
-        "current_streak_p2": 0
-    },
-    "vs_ai": {
-        "games_played": 0,
-        "human_wins": 0,
-        "computer_wins": 0,
-        "draws": 0,
-        "best_streak_human": 0,
-        "best_streak_comp": 0,
-        "current_streak_human": 0,
-        "current_streak_comp": 0
-    }
-}
-
-def load_scoreboard():
-    if os.path.exists(SCOREBOARD_FILE):
-        try:
-            with open(SCOREBOARD_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return data
-        except:
-            print("Ошибка чтения scoreboard.json. Используем счёт по умолчанию.")
-            return scoreboard_template
-    else:
-        return scoreboard_template
-
-def save_scoreboard(data):
-    with open(SCOREBOARD_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-scoreboard = load_scoreboard()
-
-# ----------------------------------------
-# ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ДЛЯ СТАТИСТИКИ
-# ----------------------------------------
-def update_win_streak(mode, winner_side):
-    """Обновляем винстрики и общее кол-во игр, побед, ничьих."""
-    # mode: "two_players" или "vs_ai"
-    # winner_side: 1, 2, 'draw', 'human', 'computer' (зависит от режима)
-    data = scoreboard[mode]
-    data["games_played"] += 1
-
-    if mode == "two_players":
-        # winner_side = 1, 2 или 'draw'
-        if winner_side == 1:
-            data["player1_wins"] += 1
-            data["current_streak_p1"] += 1
-            data["current_streak_p2"] = 0
-            if data["current_streak_p1"] > data["best_streak_p1"]:
-                data["best_streak_p1"] = data["current_streak_p1"]
-        elif winner_side == 2:
-            data["player2_wins"] += 1
-            data["current_streak_p2"] += 1
-            data["current_streak_p1"] = 0
-            if data["current_streak_p2"] > data["best_streak_p2"]:
-                data["best_streak_p2"] = data["current_streak_p2"]
-        elif winner_side == 'draw':
-            data["draws"] += 1
-            # ничья обнуляет обе серии
-            data["current_streak_p1"] = 0
-            data["current_streak_p2"] = 0
+SCOREBOARD_FILE = assets.asset_path("scoreboard.json")
+
+# Каждая законченная партия (ходы и исход) дописывается в архив - см. gamerecords.py
+GAMES_FILE = gamerecords.records_file(rules)
+
+# Именные профили и рейтинги (SQLite) - см. ratings.py.
+# python game.py --player Аня --player2 Боря - кто играет (против ИИ - первый)
+RATINGS_FILE = ratings.RATINGS_FILE
+PLAYER_NAMES = ["Игрок 1", "Игрок 2"]
+
+# Номера последних записей счёта и рейтингов, по которым собраны строки статистики
+stats_lines_cache = (None, [])
+
+def get_stats_lines():
+    """Строки блока статистики для главного меню (пересчитываются только при смене счёта)."""
+    global stats_lines_cache
+    store, db = match.scoreboard_store, match.ratings_db
+    if store is None:
+        return []
+    version = (store.seq, db.version if db else None)
+    if stats_lines_cache[0] != version:
+        lines = core.stats_lines(store.data)
+        # лидер - одна строка из индекса по рейтингу, история не читается
+        leaders = db.leaderboard(1) if db else []
+        if leaders:
+            lines.append("Лидер: %s (%d)" % (leaders[0]["name"], round(leaders[0]["rating"])))
+        stats_lines_cache = (version, lines)
+    return stats_lines_cache[1]
 
-    else:
-        # vs_ai
-        # winner_side = 'human', 'computer' или 'draw'
-        if winner_side == 'human':
-            data["human_wins"] += 1
-            data["current_streak_human"] += 1
-            data["current_streak_comp"] = 0
-            if data["current_streak_human"] > data["best_streak_human"]:
-                data["best_streak_human"] = data["current_streak_human"]
-        elif winner_side == 'computer':
-            data["computer_wins"] += 1
-            data["current_streak_comp"] += 1
-            data["current_streak_human"] = 0
-            if data["current_streak_comp"] > data["best_streak_comp"]:
-                data["best_streak_comp"] = data["current_streak_comp"]
-        elif winner_side == 'draw':
-            data["draws"] += 1
-            # ничья обнуляет обе серии
-            data["current_streak_human"] = 0
-            data["current_streak_comp"] = 0
-
-    save_scoreboard(scoreboard)
-
-# ----------------------------------------
-# ИГРОВОЕ ПОЛЕ
-# ----------------------------------------
-board = [[0]*3 for _ in range(3)]  # 0=пусто, 1=X, 2=O
-game_over = False
-winner = None
-
-game_mode = None
-difficulty = 1.0
-human_side = 1
-
-current_player = 1
+# ----------------------------------------
+# ПАРТИЯ
+# ----------------------------------------
+# Поле, режим, стороны, сложность и исход - в core.Match (без pygame);
+# создаётся в main(), счёт и архив пишет сама при конце партии
+match = None
+
+# ----------------------------------------
+# ИГРА ПО СЕТИ (lan.py)
+# ----------------------------------------
+# python game.py --host - ждать соперника (порт lan.DEFAULT_PORT),
+# python game.py --join 192.168.0.5[:порт] - подключиться к нему
+LAN_EVENT = pygame.USEREVENT + 1   # поток сети будит главный цикл, ждущий в event.wait()
+lan_session = None
 
 # ----------------------------------------
 # АНИМАЦИЯ ВЫИГРЫШНОЙ ЛИНИИ
@@ -258,8 +194,10 @@ current_player = 1
 # и будем рисовать "растущую" линию (progress от 0 до 1).
 win_line_start = None
 win_line_end = None
-win_line_progress = 0.0
-win_line_speed = 0.02  # скорость "озарения"
+win_line_progress = 0.0       # после последнего тика логики
+win_line_prev_progress = 0.0  # до последнего тика
+win_line_shown = 0.0          # что нарисовано: между prev и progress по доле тика
+WIN_LINE_DURATION_MS = 800    # за сколько линия вырастает целиком
 
 # ----------------------------------------
 # СОСТОЯНИЯ ПРИЛОЖЕНИЯ
@@ -282,7 +220,7 @@ class MenuButton:
         self.text_color = text_color
 
     def draw(self, surface):
-        txt_surf = self.font.render(self.text, True, self.text_color)
+        txt_surf = text_cache.get(self.text, self.font, self.text_color)
         txt_rect = txt_surf.get_rect(center=self.rect.center)
         surface.blit(txt_surf, txt_rect)
 
@@ -297,8 +235,8 @@ buttons_menu_ai = []
 # ФУНКЦИИ МЕНЮ
 # ----------------------------------------
 def start_two_players():
-    global game_mode, current_state
-    game_mode = "two_players"
+    global current_state
+    match.mode = "two_players"
     restart_game()
     current_state = STATE_GAME
 
@@ -307,7 +245,8 @@ def start_vs_ai():
     current_state = STATE_MENU_AI  # подменю
 
 def quit_game():
-    save_scoreboard(scoreboard)
+    close_lan()
+    match.close()
     pygame.quit()
     sys.exit()
 
@@ -317,53 +256,50 @@ def init_main_menu_buttons():
     x = (WIDTH - btn_w)//2
     y_start = 220
     gap = 70
-    button_font = pygame.font.Font("joystix_monospace.ttf", 20)
+    button_font = assets.font(MENU_FONT_FILE, 20)
 
     b1 = MenuButton(30, 160, 200, 50, "ИГРА НА ДВОИХ", start_two_players, button_font, text_color=DARK_CYAN)
     b2 = MenuButton(350, 160, 200, 50, "ИГРА ПРОТИВ ИИ", start_vs_ai, button_font, text_color=RASPBERRY)
     b3 = MenuButton(50, 510, 200, 50, "ВЫХОД", quit_game, button_font, text_color=(102, 0, 0))
-    buttons_menu.extend([b1, b2, b3])
+    buttons_menu[:] = [b1, b2, b3]  # init_ui() может вызываться повторно
 
 # ----------------------------------------
 # ПОДМЕНЮ vs AI
 # Здесь выберем сложность и сторону (X или O).
 # ----------------------------------------
 def set_difficulty_easy():
-    global difficulty
-    difficulty = 0.2
-    print("Сложность: EASY")
+    match.difficulty = ai.DIFFICULTIES["easy"]
+    debug_log("Сложность: EASY")
 
 def set_difficulty_medium():
-    global difficulty
-    difficulty = 0.5
-    print("Сложность: MEDIUM")
+    match.difficulty = ai.DIFFICULTIES["medium"]
+    debug_log("Сложность: MEDIUM")
 
 def set_difficulty_hard():
-    global difficulty
-    difficulty = 0.8
-    print("Сложность: HARD")
+    match.difficulty = ai.DIFFICULTIES["hard"]
+    debug_log("Сложность: HARD")
 
 def set_difficulty_impossible():
-    global difficulty
-    difficulty = 1.0
-    print("Сложность: IMPOSSIBLE")
+    match.difficulty = ai.DIFFICULTIES["impossible"]
+    debug_log("Сложность: IMPOSSIBLE")
 
 def set_side_x():
-    global human_side, game_mode, current_state
-    human_side = 1
-    game_mode = "vs_ai"
+    global current_state
+    match.human_side = 1
+    match.mode = "vs_ai"
     restart_game()
     current_state = STATE_GAME
 
 def set_side_o():
-    global human_side, game_mode, current_state
-    human_side = 2
-    game_mode = "vs_ai"
+    global current_state
+    match.human_side = 2
+    match.mode = "vs_ai"
     restart_game()
     current_state = STATE_GAME
 
 def back_to_menu():
     global current_state
+    cancel_ai_task()
     current_state = STATE_MENU
 
 def init_menu_ai_buttons():
@@ -371,7 +307,7 @@ def init_menu_ai_buttons():
     x = (WIDTH - btn_w)//2
     y_start = 150
     gap = 50
-    button_font = pygame.font.Font("joystix_monospace.ttf", 30)
+    button_font = assets.font(MENU_FONT_FILE, 30)
 
     b_easy = MenuButton(x, y_start, btn_w, btn_h, "Easy (20%)", set_difficulty_easy, button_font, text_color=(255, 255, 255))
     b_med  = MenuButton(x, y_start + gap, btn_w, btn_h, "Medium (50%)", set_difficulty_medium, button_font, text_color=(255, 255, 255))
@@ -383,7 +319,7 @@ def init_menu_ai_buttons():
 
     b_back = MenuButton(10, HEIGHT - 60, 120, 40, "< Назад", back_to_menu, button_font, text_color=(255, 255, 255))
 
-    buttons_menu_ai.extend([b_easy, b_med, b_hard, b_imp, b_side_x, b_side_o, b_back])
+    buttons_menu_ai[:] = [b_easy, b_med, b_hard, b_imp, b_side_x, b_side_o, b_back]
 
 
 # ----------------------------------------
@@ -391,416 +327,677 @@ def init_menu_ai_buttons():
 # ----------------------------------------
 def restart_game():
     """Полный сброс игрового поля и флагов."""
-    global board, game_over, winner, current_player
-    global win_line_start, win_line_end, win_line_progress
+    global win_line_start, win_line_end, win_line_progress, win_line_prev_progress, win_line_shown
 
-    print("Restarting the game...")
-    board = [[0]*3 for _ in range(3)]
-    game_over = False
-    winner = None
+    debug_log("Restarting the game...")
+    cancel_ai_task()
+    board_renderer.invalidate()
+    match.restart()
     win_line_start = None
     win_line_end = None
-    win_line_progress = 0.0
+    win_line_progress = win_line_prev_progress = win_line_shown = 0.0
 
-    if game_mode == "two_players":
-        current_player = 1
-    else:
-        # vs AI
-        if human_side == 1:
-            current_player = 1
+# Фон поля с сеткой не меняется за партию - рисуем его один раз
+board_background = None
+
+def get_board_background():
+    global board_background
+    if board_background is None:
+        board_background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        if bg_game:
+            board_background.blit(bg_game, (0,0))
+        else:
+            board_background.fill(WHITE)
+
+        # линии
+        for i in range(1, BOARD_SIZE):
+            pygame.draw.line(board_background, BLACK, (0, i*CELL_SIZE), (WIDTH, i*CELL_SIZE), LINE_WIDTH)
+            pygame.draw.line(board_background, BLACK, (i*CELL_SIZE, 0), (i*CELL_SIZE, HEIGHT), LINE_WIDTH)
+    return board_background
+
+def draw_mark(row, col, cell_value):
+    """X / O в клетке (row, col)."""
+    x_pix = col * CELL_SIZE
+    y_pix = row * CELL_SIZE
+    if cell_value == 1:  # X
+        if x_skin:
+            rect = x_skin.get_rect(center=(x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2))
+            screen.blit(x_skin, rect)
+        else:
+            # Рисуем крест
+            p = MARK_PADDING
+            pygame.draw.line(screen, RED, (x_pix+p, y_pix+p), (x_pix+CELL_SIZE-p, y_pix+CELL_SIZE-p), LINE_WIDTH)
+            pygame.draw.line(screen, RED, (x_pix+p, y_pix+CELL_SIZE-p), (x_pix+CELL_SIZE-p, y_pix+p), LINE_WIDTH)
+    elif cell_value == 2:  # O
+        if o_skin:
+            rect = o_skin.get_rect(center=(x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2))
+            screen.blit(o_skin, rect)
         else:
-            current_player = 1
+            pygame.draw.circle(screen, BLUE, (x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2),
+                               CELL_SIZE//2 - MARK_PADDING, LINE_WIDTH)
 
 def draw_board():
-    """Отрисовка поля."""
-    if bg_game:
-        screen.blit(bg_game, (0,0))
+    """Отрисовка поля целиком."""
+    screen.blit(get_board_background(), (0,0))
+    values = get_analysis_values()
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            draw_mark(row, col, get_cell(row, col))
+            draw_analysis(row, col, values)
+
+# ----------------------------------------
+# АНАЛИЗ КЛЕТОК (режим обучения, A в партии)
+# ----------------------------------------
+# Над каждой свободной клеткой - исход хода при лучшей игре и полуходов до конца:
+# +N - выигрыш, -N - проигрыш, 0 - ничья, ? - ещё не доказано (см. analysis.py).
+# Считается порциями в update(), а здесь только рисуется готовое.
+analysis_enabled = False
+analyzer = None          # analysis.Analyzer - создаётся при первом включении
+analysis_tiles = {}      # (исход, полуходов) -> готовая поверхность плашки
+ANALYSIS_COLORS = {analysis.WIN: (0, 200, 0, 90), analysis.DRAW: (200, 200, 200, 90),
+                   analysis.LOSS: (255, 0, 0, 90), None: (0, 0, 0, 0)}
+
+def toggle_analysis():
+    global analysis_enabled, analyzer
+    analysis_enabled = not analysis_enabled
+    if analysis_enabled and analyzer is None:
+        analyzer = analysis.Analyzer(rules)
+    board_renderer.invalidate()
+
+def analysis_pending():
+    """
+    Есть ли что досчитывать: позиция на поле сменилась или анализ ещё идёт.
+    В ход компьютера анализ стоит - у поиска лимит по часам, и делить тик с ним нельзя.
+    """
+    if not analysis_enabled or match.game_over or match.is_computer_turn():
+        return False
+    state = match.state
+    return analyzer.position != (state.x, state.o) or not analyzer.done
+
+def update_analysis():
+    """Тик логики: анализ текущей позиции порцией по ANALYSIS_SLICE_MS."""
+    if analysis_pending():
+        state = match.state
+        analyzer.set_position(state.x, state.o)
+        with frame_profiler.phase("analysis"):
+            analyzer.step(ANALYSIS_SLICE_MS)
+
+def get_analysis_values():
+    """{клетка: (исход, полуходов)} для поля на экране или {} (анализ выключен / не про эту позицию)."""
+    if not analysis_enabled or match.game_over:
+        return {}
+    state = match.state
+    if analyzer.position != (state.x, state.o):
+        return {}
+    return analyzer.values
+
+def get_analysis_tile(value):
+    """Полупрозрачная плашка клетки с надписью - рисуется один раз на значение."""
+    tile = analysis_tiles.get(value)
+    if tile is None:
+        tile = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        tile.fill(ANALYSIS_COLORS[value[0]], tile.get_rect().inflate(-2 * LINE_WIDTH, -2 * LINE_WIDTH))
+        text = text_cache.get(analysis.label(value), small_font, BLACK)
+        tile.blit(text, text.get_rect(center=(CELL_SIZE // 2, CELL_SIZE // 2)))
+        analysis_tiles[value] = tile
+    return tile
+
+def draw_analysis(row, col, values):
+    value = values.get(row * BOARD_SIZE + col)
+    if value is not None:
+        screen.blit(get_analysis_tile(value), (col * CELL_SIZE, row * CELL_SIZE))
+
+def get_cell(row, col):
+    """Содержимое клетки: 0=пусто, 1=X, 2=O."""
+    return match.state.get(row * BOARD_SIZE + col)
+
+def is_cell_free(row, col):
+    return match.is_cell_free(row, col)
+
+def play_move(row, col):
+    """Ход текущего игрока в (row, col): звук, а при победе - линия и фанфары."""
+    global win_line_start, win_line_end
+    # фазы check_winner и record_result замеряет сам match
+    res = match.play(row, col)  # законченная партия сама уходит в архив и счёт
+    assets.play_sound(*MOVE_SOUND)
+    if res is not None and res != 'draw':
+        wininfo = match.state.win_info
+        win_line_start, win_line_end = get_win_line_coords(wininfo) if wininfo else (None, None)
+        assets.play_sound(*WIN_SOUND)
+
+def load_replay(rec):
+    """Открыть партию из архива (gamerecords.GameRecord) на поле для просмотра."""
+    global current_state
+    global win_line_start, win_line_end, win_line_progress, win_line_prev_progress, win_line_shown
+    cancel_ai_task()
+    match.load_replay(rec)
+    res, wininfo = check_winner()
+    win_line_start, win_line_end = get_win_line_coords(wininfo) if wininfo else (None, None)
+    win_line_progress = win_line_prev_progress = win_line_shown = 1.0
+    board_renderer.invalidate()
+    current_state = STATE_GAME
+
+def start_lan(join=None):
+    """Партия по сети: хост (join=None) или гость хоста join; этот игрок - первый профиль (--player)."""
+    global lan_session, current_state
+    wake = lambda: pygame.event.post(pygame.event.Event(LAN_EVENT))
+    restart_game()
+    if join is None:
+        lan_session = lan.LanHost(match, PLAYER_NAMES[0], wake=wake)
     else:
-        screen.fill(WHITE)
+        lan_session = lan.LanGuest(match, PLAYER_NAMES[0], lan.parse_address(join), wake=wake)
+    current_state = STATE_GAME
 
-    # линии
-    for i in range(1, 3):
-        pygame.draw.line(screen, BLACK, (0, i*CELL_SIZE), (WIDTH, i*CELL_SIZE), LINE_WIDTH)
-        pygame.draw.line(screen, BLACK, (i*CELL_SIZE, 0), (i*CELL_SIZE, HEIGHT), LINE_WIDTH)
-
-    # X / O
-    for row in range(3):
-        for col in range(3):
-            cell_value = board[row][col]
-            x_pix = col * CELL_SIZE
-            y_pix = row * CELL_SIZE
-            if cell_value == 1:  # X
-                if x_skin:
-                    rect = x_skin.get_rect(center=(x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2))
-                    screen.blit(x_skin, rect)
-                else:
-                    # Рисуем крест
-                    pygame.draw.line(screen, RED, (x_pix+20, y_pix+20), (x_pix+CELL_SIZE-20, y_pix+CELL_SIZE-20), LINE_WIDTH)
-                    pygame.draw.line(screen, RED, (x_pix+20, y_pix+CELL_SIZE-20), (x_pix+CELL_SIZE-20, y_pix+20), LINE_WIDTH)
-            elif cell_value == 2:  # O
-                if o_skin:
-                    rect = o_skin.get_rect(center=(x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2))
-                    screen.blit(o_skin, rect)
-                else:
-                    pygame.draw.circle(screen, BLUE, (x_pix + CELL_SIZE//2, y_pix + CELL_SIZE//2),
-                                       CELL_SIZE//2 - 20, LINE_WIDTH)
+def close_lan():
+    global lan_session
+    if lan_session is not None:
+        lan_session.close()
+        lan_session = None
+        match.player_names = list(PLAYER_NAMES)
+
+def sync_lan():
+    """Применить пришедшее по сети: ход соперника - со звуком, линия победы - по позиции."""
+    ply = match.state.ply
+    if lan_session.poll():
+        if match.state.ply > ply:
+            assets.play_sound(*MOVE_SOUND)
+        sync_win_line()
+
+def lan_move(row, col):
+    """Свой ход в сетевой партии - на поле сразу (см. lan.LanGuest.local_move)."""
+    if lan_session.local_move(row, col):
+        assets.play_sound(*MOVE_SOUND)
+        sync_win_line()
+
+def sync_win_line():
+    """Линия победы по текущей позиции (позицию мог сменить соперник или пересинхронизация)."""
+    global win_line_start, win_line_end, win_line_progress, win_line_prev_progress, win_line_shown
+    wininfo = match.state.win_info
+    coords = get_win_line_coords(wininfo) if wininfo else (None, None)
+    if coords != (win_line_start, win_line_end):
+        win_line_start, win_line_end = coords
+        win_line_progress = win_line_prev_progress = win_line_shown = 0.0
+        board_renderer.invalidate()
+        if wininfo:
+            assets.play_sound(*WIN_SOUND)
+
+def step_replay(delta):
+    """Стрелки влево/вправо после конца партии - ход назад/вперёд."""
+    match.step_replay(delta)
+    board_renderer.invalidate()
 
 def check_winner():
-    """Проверяем победителя: 1, 2, 'draw' или None."""
-    # Строки
-    for r in range(3):
-        if board[r][0] == board[r][1] == board[r][2] != 0:
-            return board[r][0], ("row", r)
-    # Столбцы
-    for c in range(3):
-        if board[0][c] == board[1][c] == board[2][c] != 0:
-            return board[0][c], ("col", c)
-    # Диагонали
-    if board[0][0] == board[1][1] == board[2][2] != 0:
-        return board[0][0], ("diag", 1)
-    if board[0][2] == board[1][1] == board[2][0] != 0:
-        return board[0][2], ("diag", 2)
-
-    # Свободные клетки?
-    for r in range(3):
-        for c in range(3):
-            if board[r][c] == 0:
-                return None, None
-    return 'draw', None
+    """Проверяем победителя: (1 | 2 | 'draw' | None, win_info)."""
+    with frame_profiler.phase("check_winner"):
+        return match.state.check_winner()  # исход и линия уже посчитаны в state.play()
 
 def get_win_line_coords(win_info):
     """Возвращает (start, end) в пикселях для выигрышной линии, исходя из win_info."""
-    # win_info = ("row", r) или ("col", c) или ("diag", 1/2)
-    t, idx = win_info
+    # win_info = ("row", r) или ("col", c) или ("diag", 1/2);
+    # для линии короче поля третий элемент - начало отрезка (см. engine.Rules)
+    t, idx = win_info[:2]
+    length = WIN_LENGTH * CELL_SIZE
     if t == "row":
         # Горизонтальная линия посередине строки
+        x0 = win_info[2] * CELL_SIZE if len(win_info) > 2 else 0
         y = idx * CELL_SIZE + CELL_SIZE//2
-        return (0, y), (WIDTH, y)
+        return (x0, y), (x0 + length, y)
     elif t == "col":
         # Вертикальная линия посередине столбца
+        y0 = win_info[2] * CELL_SIZE if len(win_info) > 2 else 0
         x = idx * CELL_SIZE + CELL_SIZE//2
-        return (x, 0), (x, HEIGHT)
+        return (x, y0), (x, y0 + length)
     elif t == "diag":
         if idx == 1:
-            # главная диагональ
-            return (0, 0), (WIDTH, HEIGHT)
+            # главная диагональ (вниз-вправо)
+            r0, c0 = win_info[2] if len(win_info) > 2 else (0, 0)
+            x0, y0 = c0 * CELL_SIZE, r0 * CELL_SIZE
+            return (x0, y0), (x0 + length, y0 + length)
         else:
-            # побочная диагональ
-            return (WIDTH, 0), (0, HEIGHT)
+            # побочная диагональ (вниз-влево)
+            r0, c0 = win_info[2] if len(win_info) > 2 else (0, BOARD_SIZE - 1)
+            x0, y0 = (c0 + 1) * CELL_SIZE, r0 * CELL_SIZE
+            return (x0, y0), (x0 - length, y0 + length)
+
+def get_win_line_point(progress):
+    """Текущий конец растущей выигрышной линии."""
+    sx, sy = win_line_start
+    ex, ey = win_line_end
+    return sx + (ex - sx) * progress, sy + (ey - sy) * progress
 
 def draw_win_line():
-    """Анимация "озарения" при победе."""
-    if win_line_start and win_line_end and win_line_progress < 1.0:
-        # Интерполируем конец
-        sx, sy = win_line_start
-        ex, ey = win_line_end
-        cx = sx + (ex - sx) * win_line_progress
-        cy = sy + (ey - sy) * win_line_progress
+    """Анимация "озарения" при победе (при progress = 1 - линия целиком)."""
+    if win_line_start and win_line_end and match.replay_moves is None:
+        pygame.draw.line(screen, GREEN, win_line_start, get_win_line_point(win_line_shown), 10)
 
-        pygame.draw.line(screen, GREEN, (sx, sy), (cx, cy), 10)
+def get_game_message():
+    if not match.game_over:
+        return None
+    if match.replay_moves is not None:
+        return "Ход %d из %d (<- / ->)" % (match.state.ply, len(match.replay_moves))
+    if match.winner == 'draw':
+        return "Ничья! (R - заново, ESC - меню)"
+    elif match.winner == 1:
+        return "Победил X! (R - заново, ESC - меню)"
+    elif match.winner == 2:
+        return "Победил O! (R - заново, ESC - меню)"
 
-def evaluate_board():
+# ----------------------------------------
+# ОТРИСОВКА ИГРОВОГО ЭКРАНА "ГРЯЗНЫМИ" ПРЯМОУГОЛЬНИКАМИ
+# ----------------------------------------
+class BoardRenderer:
     """
-    Оценка для minimax:
-      +1, если компьютер выигрывает
-      -1, если человек выигрывает
-      0, если ничья
-      None, если не закончено
+    Перерисовывает только то, что изменилось с прошлого кадра: клетки с новыми
+    (или убранными) знаками, прирост выигрышной линии и надписи поверх поля.
+    render() возвращает список прямоугольников для pygame.display.update().
     """
-    comp_side = 2 if human_side == 1 else 1
-    res, _ = check_winner()
-    if res == comp_side:
-        return +1
-    elif res == human_side:
-        return -1
-    elif res == 'draw':
-        return 0
-    else:
-        return None
 
-def minimax(alpha, beta, is_maximizing):
-    score = evaluate_board()
-    if score is not None:
-        return score
-
-    comp_side = 2 if human_side == 1 else 1
-    hum_side = human_side
-
-    if is_maximizing:  # ход компьютера
-        max_eval = -math.inf
-        for r in range(3):
-            for c in range(3):
-                if board[r][c] == 0:
-                    board[r][c] = comp_side
-                    eval_ = minimax(alpha, beta, False)
-                    board[r][c] = 0
-                    max_eval = max(max_eval, eval_)
-                    alpha = max(alpha, eval_)
-                    if beta <= alpha:
-                        break
-            if beta <= alpha:
-                break
-        return max_eval
-    else:  # ход человека
-        min_eval = math.inf
-        for r in range(3):
-            for c in range(3):
-                if board[r][c] == 0:
-                    board[r][c] = hum_side
-                    eval_ = minimax(alpha, beta, True)
-                    board[r][c] = 0
-                    min_eval = min(min_eval, eval_)
-                    beta = min(beta, eval_)
-                    if beta <= alpha:
-                        break
-            if beta <= alpha:
-                break
-        return min_eval
-
-def get_best_move():
-    comp_side = 2 if human_side == 1 else 1
-    best_score = -math.inf
-    best_move = None
-    for r in range(3):
-        for c in range(3):
-            if board[r][c] == 0:
-                board[r][c] = comp_side
-                score = minimax(-math.inf, math.inf, False)
-                board[r][c] = 0
-                if score > best_score:
-                    best_score = score
-                    best_move = (r, c)
-    return best_move
-
-def get_random_move():
-    empty = []
-    for r in range(3):
-        for c in range(3):
-            if board[r][c] == 0:
-                empty.append((r, c))
-    return random.choice(empty) if empty else None
-
-def computer_move():
-    if random.random() < difficulty:
-        move = get_best_move()
-    else:
-        move = get_random_move()
+    def __init__(self):
+        self.pending = []
+        self.invalidate()
+
+    def invalidate(self):
+        """Следующий кадр - полная перерисовка (смена экрана, рестарт, expose)."""
+        self.full = True
+
+    def invalidate_rect(self, rect):
+        """Следующий кадр - перерисовать область rect (например, из-под оверлея)."""
+        self.pending.append(rect)
+
+    def _text(self, text, font):
+        return text_cache.get(text, font, BLACK)
+
+    def _overlays(self):
+        """Надписи поверх поля: [(surface, rect)]."""
+        items = []
+        msg = get_game_message()
+        if msg:
+            surf = self._text(msg, game_font)
+            items.append((surf, surf.get_rect(center=(WIDTH//2, HEIGHT//2))))
+        elif ai_task is not None:
+            surf = self._text(get_thinking_text(), small_font)
+            items.append((surf, surf.get_rect(topleft=(10, 10))))
+        elif lan_session is not None and lan_session.status_text():
+            surf = self._text(lan_session.status_text(), small_font)
+            items.append((surf, surf.get_rect(topleft=(10, 10))))
+        return items
+
+    def _compose(self, rect, overlays):
+        """Собрать содержимое экрана внутри rect: фон, знаки, линия, надписи."""
+        screen.set_clip(rect)
+        screen.blit(get_board_background(), rect, rect)
+        c0 = max(rect.left // CELL_SIZE, 0)
+        c1 = min((rect.right - 1) // CELL_SIZE, BOARD_SIZE - 1)
+        r0 = max(rect.top // CELL_SIZE, 0)
+        r1 = min((rect.bottom - 1) // CELL_SIZE, BOARD_SIZE - 1)
+        values = get_analysis_values()
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                draw_mark(row, col, get_cell(row, col))
+                draw_analysis(row, col, values)
+        draw_win_line()
+        for surf, r in overlays:
+            if r.colliderect(rect):
+                screen.blit(surf, r)
+        screen.set_clip(None)
+
+    def render(self):
+        overlays = self._overlays()
+        state = match.state
+        values = get_analysis_values()
+        line = (win_line_start, win_line_end, win_line_shown)
+
+        if self.full:
+            dirty = [screen.get_rect()]
+        else:
+            dirty = []
+            changed = (state.x ^ self.drawn_board[0]) | (state.o ^ self.drawn_board[1])
+            if values != self.drawn_values:
+                # анализ досчитал клетки (или сменилась позиция) - перерисовываем только их
+                for idx in set(values) | set(self.drawn_values):
+                    if values.get(idx) != self.drawn_values.get(idx):
+                        changed |= rules.cell_bits[idx]
+            for idx in search.iter_bits(changed):
+                row, col = rules.cell_coords[idx]
+                dirty.append(pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+            if line != self.drawn_line and win_line_start and win_line_end:
+                # только прирост линии с прошлого кадра
+                prev = self.drawn_line[2] if self.drawn_line[0] == win_line_start else 0.0
+                (x0, y0), (x1, y1) = get_win_line_point(prev), get_win_line_point(win_line_shown)
+                seg = pygame.Rect(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+                dirty.append(seg.inflate(12, 12))
+            if overlays != self.drawn_overlays:
+                # надпись сменилась: стираем старую, рисуем новую
+                dirty.extend(r for _, r in self.drawn_overlays)
+                dirty.extend(r for _, r in overlays)
+            dirty.extend(self.pending)
+        self.pending = []
+
+        for rect in dirty:
+            self._compose(rect, overlays)
+
+        self.full = False
+        self.drawn_board = (state.x, state.o)
+        self.drawn_values = dict(values)
+        self.drawn_line = line
+        self.drawn_overlays = overlays
+        return dirty
+
+board_renderer = BoardRenderer()
+
+def apply_computer_move(move):
     if move:
-        r, c = move
-        comp_side = 2 if human_side == 1 else 1
-        board[r][c] = comp_side
-        if move_sound:
-            move_sound.play()
+        play_move(*move)
 
 # ----------------------------------------
-# ИНИЦИАЛИЗАЦИЯ
+# ФОНОВЫЙ ХОД КОМПЬЮТЕРА
 # ----------------------------------------
-init_main_menu_buttons()
-init_menu_ai_buttons()
+# Поиск идёт порциями по AI_SLICE_MS за тик логики, чтобы окно не "замерзало".
+ai_task = None
+
+def cancel_ai_task():
+    global ai_task
+    if ai_task is not None:
+        ai_task.cancel()
+        ai_task = None
+
+def get_thinking_text():
+    """Надпись "думаю..." с бегущими точками, пока идёт поиск."""
+    return "Компьютер думает" + "." * (pygame.time.get_ticks() // 300 % 4)
 
 # ----------------------------------------
-# ГЛАВНЫЙ ЦИКЛ
+# ОВЕРЛЕЙ ПРОФИЛИРОВЩИКА
 # ----------------------------------------
-while True:
-    clock.tick(60)
-    for event in pygame.event.get():
-        print(event)
-        if event.type == pygame.QUIT:
-            save_scoreboard(scoreboard)
-            pygame.quit()
-            sys.exit()
-           
-
-
-        # ОБРАБОТКА СОСТОЯНИЙ
-        if current_state == STATE_MENU:
-            for btn in buttons_menu:
-                btn.handle_event(event)
-
-        elif current_state == STATE_MENU_AI:
-            for btn in buttons_menu_ai:
-                btn.handle_event(event)
-
-        elif current_state == STATE_GAME:
-                
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    restart_game()
-                elif event.key == pygame.K_ESCAPE:
-                    current_state = STATE_MENU
-
-            if not game_over:
-                if game_mode == "two_players":
-                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                        mx, my = event.pos
-                        row = my // CELL_SIZE
-                        col = mx // CELL_SIZE
-                        if 0 <= row < 3 and 0 <= col < 3 and board[row][col] == 0:
-                            board[row][col] = current_player
-                            if move_sound:
-                                move_sound.play()
-                            res, wininfo = check_winner()
-                            if res is not None:
-                                game_over = True
-                                winner = res
-                                if winner != 'draw':
-                                    start, end = get_win_line_coords(wininfo) if wininfo else (None, None)
-                                    win_line_start = start
-                                    win_line_end = end
-                                    if win_sound and winner != 'draw':
-                                        win_sound.play()
-                                if winner == 1:
-                                    update_win_streak("two_players", 1)
-                                elif winner == 2:
-                                    update_win_streak("two_players", 2)
-                                else:
-                                    update_win_streak("two_players", 'draw')
-                            else:
-                                current_player = 1 if current_player == 2 else 2
-                else:
-                    # vs AI
-                    # если ход человека
-                    comp_side = 2 if human_side == 1 else 1
-                    if current_player == human_side:
-                        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                            mx, my = event.pos
-                            row = my // CELL_SIZE
-                            col = mx // CELL_SIZE
-                            if 0 <= row < 3 and 0 <= col < 3 and board[row][col] == 0:
-                                board[row][col] = human_side
-                                if move_sound:
-                                    move_sound.play()
-                                res, wininfo = check_winner()
-                                if res is not None:
-                                    game_over = True
-                                    winner = res
-                                    if winner != 'draw':
-                                        start, end = get_win_line_coords(wininfo) if wininfo else (None, None)
-                                        win_line_start = start
-                                        win_line_end = end
-                                        if win_sound and winner != 'draw':
-                                            win_sound.play()
-                                    # статистика
-                                    if winner == human_side:
-                                        update_win_streak("vs_ai", 'human')
-                                    elif winner == comp_side:
-                                        update_win_streak("vs_ai", 'computer')
-                                    else:
-                                        update_win_streak("vs_ai", 'draw')
-                                else:
-                                    current_player = comp_side
-
-                # # Перезапуск по R
-                # if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                #     restart_game()
-                #     if event.type == pygame.KEYDOWN:
-                #         print(f"Key pressed: {event.key}")
-
-
-                # # Назад в меню по ESC
-                # if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                #     current_state = STATE_MENU
-                    
+profiler_overlay = (0, None)   # (время отрисовки, поверхность) - обновляем 4 раза в секунду
+
+def draw_profiler_overlay():
+    """Таблица времени фаз в правом верхнем углу; возвращает её прямоугольник."""
+    global profiler_overlay
+    now = pygame.time.get_ticks()
+    if profiler_overlay[1] is None or now - profiler_overlay[0] > 250:
+        lines = ["FPS %5.1f" % clock.get_fps()] + frame_profiler.stats_lines()
+        font = assets.font(None, 20)
+        surfs = [font.render(line, True, WHITE) for line in lines]
+        w = max(s.get_width() for s in surfs) + 10
+        panel = pygame.Surface((w, 16 * len(surfs) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, s in enumerate(surfs):
+            panel.blit(s, (5, 4 + 16 * i))
+        profiler_overlay = (now, panel)
+    panel = profiler_overlay[1]
+    rect = panel.get_rect(topright=(WIDTH - 5, 5))
+    screen.blit(panel, rect)
+    return rect
+
+def handle_profiler_key(event):
+    global profiler_overlay
+    if event.key == pygame.K_F3:
+        frame_profiler.toggle()
+        profiler_overlay = (0, None)
+        board_renderer.invalidate()
+    elif event.key == pygame.K_F4:
+        path = frame_profiler.export_chrome_trace(TRACE_FILE)
+        print("Трасса кадров сохранена:", os.path.abspath(path))
 
-    # ЛОГИКА vs AI: если ход компьютера
-    if current_state == STATE_GAME and not game_over and game_mode == "vs_ai":
-        comp_side = 2 if human_side == 1 else 1
-        if current_player == comp_side:
-            computer_move()
-            res, wininfo = check_winner()
-            if res is not None:
-                game_over = True
-                winner = res
-                if winner != 'draw':
-                    start, end = get_win_line_coords(wininfo) if wininfo else (None, None)
-                    win_line_start = start
-                    win_line_end = end
-                    if win_sound and winner != 'draw':
-                        win_sound.play()
-                # статистика
-                if winner == comp_side:
-                    update_win_streak("vs_ai", 'computer')
-                elif winner == human_side:
-                    update_win_streak("vs_ai", 'human')
-                else:
-                    update_win_streak("vs_ai", 'draw')
-            else:
-                current_player = human_side
-
-    # ----------------------------------------
-    # ОТРИСОВКА
-    # ----------------------------------------
-    if current_state == STATE_MENU:
-        if bg_menu:
-            screen.blit(bg_menu, (0, 0))
-        else:
-            screen.fill(WHITE)
-        title_surf = render_text_with_outline("КРЕСТИКИ-НОЛИКИ", menu_font, (255, 230, 204), (102, 0, 51), 2)
-        
-        
-        title_rect = title_surf.get_rect(center=(WIDTH//2, 40))
-        screen.blit(title_surf, title_rect)
+# ----------------------------------------
+# ОТРИСОВКА МЕНЮ
+# ----------------------------------------
+def draw_main_menu():
+    if bg_menu:
+        screen.blit(bg_menu, (0, 0))
+    else:
+        screen.fill(WHITE)
+    title_surf = text_cache.get("КРЕСТИКИ-НОЛИКИ", menu_font, (255, 230, 204), (102, 0, 51), 2)
+    title_rect = title_surf.get_rect(center=(WIDTH//2, 40))
+    screen.blit(title_surf, title_rect)
 
     # Отрисовка кнопок
-        for btn in buttons_menu:
-            btn.draw(screen)
-
-            tp = scoreboard["two_players"]
-            va = scoreboard["vs_ai"]
-            stats_text = (f"2P: сыграно {tp['games_played']}\n P1:{tp['player1_wins']} P2:{tp['player2_wins']} D:{tp['draws']}\n"
-                  f"vsAI: сыграно {va['games_played']}\n Human:{va['human_wins']} PC:{va['computer_wins']} D:{va['draws']}")
-            lines = stats_text.split("\n")
-            y = 350
-            for line in lines:
-                s = small_font.render(line, True, BLACK)
-                r = s.get_rect(center=(WIDTH//2, y))
-                screen.blit(s, r)
-                y += 30
+    for btn in buttons_menu:
+        btn.draw(screen)
+
+    y = 350
+    for line in get_stats_lines():
+        s = text_cache.get(line, small_font, BLACK)
+        r = s.get_rect(center=(WIDTH//2, y))
+        screen.blit(s, r)
+        y += 30
+
+def draw_ai_menu():
+    bg_ai_menu = get_bg_ai_menu()
+    if bg_ai_menu:
+        screen.blit(bg_ai_menu, (0, 0))
+    else:
+        screen.fill(WHITE)
 
-    elif current_state == STATE_MENU_AI:
-        if bg_ai_menu:
-            screen.blit(bg_ai_menu, (0, 0))
-        else:
-            screen.fill(WHITE)
+    # Заголовок
+    sub_title = text_cache.get("РЕЖИМ: Против компьютера", menu_font, BLACK)
+    sub_rect = sub_title.get_rect(center=(WIDTH//2, 80))
+    screen.blit(sub_title, sub_rect)
 
-        # Заголовок
-        sub_title = menu_font.render("РЕЖИМ: Против компьютера", True, BLACK)
-        sub_rect = sub_title.get_rect(center=(WIDTH//2, 80))
-        screen.blit(sub_title, sub_rect)
+    # Инструкция
+    info_text = "Сначала выберите сложность, затем сторону (X / O)."
+    info_surf = text_cache.get(info_text, small_font, BLACK)
+    info_rect = info_surf.get_rect(center=(WIDTH//2, 120))
+    screen.blit(info_surf, info_rect)
 
-        # Инструкция
-        info_text = "Сначала выберите сложность, затем сторону (X / O)."
-        info_surf = small_font.render(info_text, True, BLACK)
-        info_rect = info_surf.get_rect(center=(WIDTH//2, 120))
-        screen.blit(info_surf, info_rect)
+    # Кнопки
+    for btn in buttons_menu_ai:
+        btn.draw(screen)
 
-        # Кнопки
-        for btn in buttons_menu_ai:
-            btn.draw(screen)
+# ----------------------------------------
+# ПЛАНИРОВЩИК КАДРОВ
+# ----------------------------------------
+def is_animating():
+    """Меняется ли что-то без участия игрока: идёт ход компьютера или растёт линия победы."""
+    if current_state != STATE_GAME:
+        return False
+    if ai_task is not None or match.is_computer_turn() or analysis_pending():
+        return True
+    return (match.game_over and match.winner != 'draw' and win_line_start is not None
+            and win_line_shown < 1.0)
+
+def next_events():
+    """
+    (события, мс с прошлого кадра) для очередного кадра. Пока что-то анимируется -
+    обычный цикл на FPS; иначе блокируемся в pygame.event.wait() до ввода
+    (или таймера), не нагружая CPU, - время простоя логике не засчитывается.
+    """
+    if is_animating():
+        return pygame.event.get(), clock.tick(FPS)
+    event = pygame.event.wait(IDLE_WAIT_MS)
+    clock.tick()
+    if event.type == pygame.NOEVENT:
+        return [], 0
+    return [event] + pygame.event.get(), 0
+
+def update_win_line():
+    """Тик анимации выигрышной линии: прирост по времени, а не по кадрам."""
+    global win_line_progress, win_line_prev_progress
+    win_line_prev_progress = win_line_progress
+    if match.game_over and match.winner != 'draw' and win_line_start and win_line_end:
+        win_line_progress = min(1.0, win_line_progress + UPDATE_MS / WIN_LINE_DURATION_MS)
 
-    elif current_state == STATE_GAME:
-        draw_board()
-
-        # Если есть анимация выигрышной линии
-        if game_over and winner != 'draw' and win_line_start and win_line_end and win_line_progress < 1.0:
-            win_line_progress += win_line_speed
-            if win_line_progress > 1.0:
-                win_line_progress = 1.0
-            draw_win_line()
-        else:
-            if game_over and winner != 'draw' and win_line_start and win_line_end:
-                pygame.draw.line(screen, GREEN, win_line_start, win_line_end, 10)
+# ----------------------------------------
+# ГЛАВНЫЙ ЦИКЛ
+# ----------------------------------------
+rendered_state = None  # какой экран был нарисован в прошлом кадре
+update_lag_ms = 0.0    # время, ещё не отработанное тиками логики
+
+def handle_event(event):
+    """Ввод: кнопки меню, клики по полю, клавиши партии."""
+    global current_state
+    if event.type == pygame.QUIT:
+        quit_game()
+    if event.type == pygame.VIDEOEXPOSE:
+        board_renderer.invalidate()
+    if event.type == pygame.KEYDOWN and event.key in (pygame.K_F3, pygame.K_F4):
+        handle_profiler_key(event)
+    if event.type == LAN_EVENT and lan_session is not None:
+        sync_lan()
+
+    # ОБРАБОТКА СОСТОЯНИЙ
+    if current_state == STATE_MENU:
+        for btn in buttons_menu:
+            btn.handle_event(event)
 
-        if game_over:
-            if winner == 'draw':
-                msg = "Ничья! (R - заново, ESC - меню)"
-            elif winner == 1:
-                msg = "Победил X! (R - заново, ESC - меню)"
-            elif winner == 2:
-                msg = "Победил O! (R - заново, ESC - меню)"
+    elif current_state == STATE_MENU_AI:
+        for btn in buttons_menu_ai:
+            btn.handle_event(event)
 
-            msg_surf = game_font.render(msg, True, BLACK)
-            msg_rect = msg_surf.get_rect(center=(WIDTH//2, HEIGHT//2))
-            screen.blit(msg_surf, msg_rect)
+    elif current_state == STATE_GAME:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r and lan_session is not None:
+                lan_session.restart()
+                sync_win_line()
+            elif event.key == pygame.K_r:
+                restart_game()
+            elif event.key == pygame.K_a:
+                toggle_analysis()
+            elif event.key == pygame.K_ESCAPE:
+                cancel_ai_task()
+                close_lan()
+                current_state = STATE_MENU
+            elif match.game_over and lan_session is None and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                step_replay(-1 if event.key == pygame.K_LEFT else 1)
+
+        # ход человека (на двоих - любого из игроков, по сети - только своей стороны)
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            mx, my = event.pos
+            row = my // CELL_SIZE
+            col = mx // CELL_SIZE
+            if lan_session is not None:
+                lan_move(row, col)
+            elif match.is_human_turn() and is_cell_free(row, col):
+                play_move(row, col)
+
+def update():
+    """Тик логики: рост линии победы, порции анализа клеток и поиска хода компьютера."""
+    global ai_task
+    update_win_line()
+    if current_state == STATE_GAME:
+        update_analysis()
 
+    # ЛОГИКА vs AI: если ход компьютера
+    if current_state == STATE_GAME and match.is_computer_turn():
+        searcher = match.searcher
+        if ai_task is None:
+            searcher.nodes = searcher.cutoffs = 0
+            ai_task = search.SearchTask(match.computer_move_steps())
+        with frame_profiler.phase("ai_search"):
+            done = ai_task.step(AI_SLICE_MS)
+        if done:
+            move = ai_task.result
+            ai_task = None
+            frame_profiler.count("ai_nodes", searcher.nodes)
+            frame_profiler.count("ai_cutoffs", searcher.cutoffs)
+            apply_computer_move(move)
+
+def draw_frame():
+    """Кадр текущего экрана: поле - грязными прямоугольниками, меню - целиком."""
+    global win_line_shown
+    if current_state == STATE_MENU:
+        draw_main_menu()
+    elif current_state == STATE_MENU_AI:
+        draw_ai_menu()
+    elif current_state == STATE_GAME:
+        # Линия рисуется между двумя последними тиками - плавно при любом FPS
+        alpha = update_lag_ms / UPDATE_MS
+        win_line_shown = win_line_prev_progress + (win_line_progress - win_line_prev_progress) * alpha
+
+        if rendered_state != STATE_GAME:
+            board_renderer.invalidate()
+        dirty = board_renderer.render()
+        if frame_profiler.enabled:
+            rect = draw_profiler_overlay()
+            dirty.append(rect)
+            board_renderer.invalidate_rect(rect)
+        frame_profiler.lap("draw")
+        if dirty:
+            pygame.display.update(dirty)
+        return
+    if frame_profiler.enabled:
+        draw_profiler_overlay()
+    frame_profiler.lap("draw")
     pygame.display.update()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Крестики-нолики")
+    parser.add_argument("--debug", action="store_true", help="подробный лог в консоль")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="частота кадров (скорость логики от неё не зависит)")
+    parser.add_argument("--player", default=PLAYER_NAMES[0], help="профиль первого игрока (против ИИ - человек)")
+    parser.add_argument("--player2", default=PLAYER_NAMES[1], help="профиль второго игрока")
+    parser.add_argument("--build-assets", action="store_true", help="упаковать картинки в assets.bundle и выйти")
+    parser.add_argument("--mcts-workers", type=int, default=core.MCTS_WORKERS, metavar="N",
+                        help="процессов поиска MCTS на больших полях (по умолчанию - все ядра, кроме одного)")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--replay", type=int, metavar="N", help="открыть партию N из архива (-1 - последнюю)")
+    start.add_argument("--host", action="store_true", help="партия по сети: ждать соперника")
+    start.add_argument("--join", metavar="HOST[:PORT]", help="партия по сети: подключиться к хосту")
+    args = parser.parse_args(argv)
+    if args.replay is not None:
+        count = 0
+        if os.path.exists(GAMES_FILE):
+            archive = gamerecords.GameArchive(GAMES_FILE)
+            count = len(archive)
+            archive.close()
+        if not -count <= args.replay < count:
+            parser.error("нет партии %d (партий в архиве: %d)" % (args.replay, count))
+    return args
+
+def main(argv=None):
+    global match, rendered_state, update_lag_ms, DEBUG, FPS, PLAYER_NAMES
+    args = parse_args(argv)
+    DEBUG, FPS = args.debug, args.fps
+    PLAYER_NAMES = [args.player, args.player2]
+    # Процессы-помощники поиска (MCTS) запускаются до pygame.init(), чтобы не наследовать SDL
+    match = core.Match(rules, scorejournal.ScoreboardStore(SCOREBOARD_FILE),
+                       gamerecords.GameLog(GAMES_FILE, rules),
+                       searcher=core.make_searcher(rules, args.mcts_workers),
+                       ratings_db=ratings.RatingsDB(RATINGS_FILE), player_names=PLAYER_NAMES,
+                       frame_profiler=frame_profiler)
+    init_ui()
+
+    # python game.py --build-assets - упаковать картинки в assets.bundle и выйти
+    if args.build_assets:
+        get_bg_ai_menu()
+        assets.save_bundle()
+        print("Ресурсы упакованы в", assets.BUNDLE_FILE)
+        quit_game()
+
+    # python game.py --replay N - открыть партию N из архива (-1 - последнюю)
+    if args.replay is not None:
+        load_replay(gamerecords.GameArchive(GAMES_FILE)[args.replay])
+    elif args.host or args.join:
+        start_lan(args.join)
+
+    while True:
+        events, frame_ms = next_events()
+        frame_profiler.begin_frame()
+        for event in events:
+            debug_log(event)
+            handle_event(event)
+        frame_profiler.lap("events")
+
+        # ----------------------------------------
+        # ЛОГИКА: фиксированные тики по UPDATE_MS
+        # ----------------------------------------
+        # Медленный кадр (или низкий FPS) отрабатывается несколькими тиками подряд
+        # без отрисовки между ними, так что время игры от частоты кадров не зависит.
+        update_lag_ms = min(update_lag_ms + frame_ms, MAX_UPDATES_PER_FRAME * UPDATE_MS)
+        while update_lag_ms >= UPDATE_MS:
+            update_lag_ms -= UPDATE_MS
+            update()
+        frame_profiler.lap("update")
+
+        # ----------------------------------------
+        # ОТРИСОВКА
+        # ----------------------------------------
+        draw_frame()
+        frame_profiler.lap("display_update")
+        frame_profiler.end_frame()
+        rendered_state = current_state
+
+
+if __name__ == "__main__":
+    main()
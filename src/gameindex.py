@@ -0,0 +1,196 @@
+"""
+Индекс архива партий по дебюту и исходу - запросы без разбора записей по одной.
+
+Ключ партии: первый байт записи (режим, сторона человека, сложность, исход)
+и первые два хода. Индекс (файл <архив>.idx) - таблица групп
+(ключ, начало, число партий) + номера записей, отсортированные по ключу.
+Статистика по дебюту считается по таблице групп (их тысячи, а не миллионы
+партий), список партий - срезами по номерам. Партии, дописанные после
+построения индекса, досчитываются векторно прямо из mmap архива.
+
+Пример (процент побед человека, открывшего игру в углу, против Hard):
+    index = gameindex.GameIndex(gamerecords.GameArchive("games.rec"))
+    res = index.counts(mode="vs_ai", human_side=1, difficulty="hard",
+                       opening=[gameindex.corners(3)])
+    gameindex.win_rate(res, 1)
+
+    python gameindex.py games.rec --mode vs_ai --side 1 --difficulty hard --first 0,2,6,8
+"""
+import argparse
+import os
+import struct
+
+import numpy as np
+
+import gamerecords
+
+INDEX_MAGIC = b"TTTI1\n"
+INDEX_HEADER = "<6sHII"  # магия, длина записи, проиндексировано партий, число групп
+NO_MOVE = 0xFF
+
+OUTCOME_CODES = {1: 1, 2: 2, 'draw': 3}
+
+
+def corners(size):
+    """Угловые клетки поля size x size."""
+    return (0, size - 1, size * (size - 1), size * size - 1)
+
+
+def _records(archive, start=0):
+    """Записи архива начиная со start как массив (n, record_size) поверх mmap."""
+    fmt = archive.format
+    n = len(archive) - start
+    if n <= 0:
+        return np.zeros((0, fmt.record_size if fmt else 1), dtype=np.uint8)
+    offset = gamerecords.HEADER_SIZE + start * fmt.record_size
+    return np.frombuffer(archive.buffer, dtype=np.uint8, count=n * fmt.record_size,
+                         offset=offset).reshape(n, fmt.record_size)
+
+
+def opening_keys(archive, start=0):
+    """Ключи партий: info << 16 | ход1 << 8 | ход2 (NO_MOVE, если хода не было)."""
+    rec = _records(archive, start)
+    if archive.format is None:
+        return np.zeros(0, dtype=np.uint32)
+    bits = archive.format.move_bits
+    mask = (1 << bits) - 1
+    info = rec[:, 0].astype(np.uint32)
+    count = rec[:, 1]
+    # первые два хода целиком лежат в байтах 2-3 (move_bits <= 8)
+    low = rec[:, 2].astype(np.uint32)
+    if rec.shape[1] > 3:
+        low |= rec[:, 3].astype(np.uint32) << 8
+    first = np.where(count >= 1, low & mask, NO_MOVE)
+    second = np.where(count >= 2, low >> bits & mask, NO_MOVE)
+    return info << 16 | first << 8 | second
+
+
+def _match(keys, mode, human_side, difficulty, outcome, opening):
+    """Маска ключей, подходящих под фильтр (None - любое значение)."""
+    info = keys >> 16
+    ok = np.ones(keys.shape, dtype=bool)
+    if mode is not None:
+        ok &= (info & 1) == gamerecords.MODES.index(mode)
+    if human_side is not None:
+        ok &= (info >> 1 & 1) == human_side - 1
+    if difficulty is not None:
+        ok &= (info >> 4 & 7) == gamerecords.DIFFICULTY_NAMES.index(difficulty)
+    if outcome is not None:
+        ok &= (info >> 2 & 3) == OUTCOME_CODES[outcome]
+    for ply, cells in enumerate(opening[:2]):
+        move = keys >> (8 * (1 - ply)) & 0xFF
+        cells = [cells] if isinstance(cells, int) else list(cells)
+        ok &= np.isin(move, cells)
+    return ok
+
+
+def win_rate(counts, side):
+    """Доля побед стороны side (1, 2) в результате counts()."""
+    total = sum(counts.values())
+    return counts[side] / total if total else 0.0
+
+
+class GameIndex:
+    """Индекс архива; читается из <архив>.idx или строится заново."""
+
+    def __init__(self, archive, path=None):
+        self.archive = archive
+        self.path = path or archive.path + ".idx"
+        if not self._load():
+            self.build()
+            self.save()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                magic, record_size, indexed, groups = struct.unpack(
+                    INDEX_HEADER, f.read(struct.calcsize(INDEX_HEADER)))
+        except (OSError, struct.error):
+            return False
+        fmt = self.archive.format
+        if magic != INDEX_MAGIC or fmt is None or record_size != fmt.record_size \
+                or indexed > len(self.archive):
+            return False
+        offset = struct.calcsize(INDEX_HEADER)
+        self.indexed = indexed
+        self.groups = np.memmap(self.path, dtype=np.uint32, mode="r", offset=offset,
+                                shape=(groups, 3)) if groups else np.zeros((0, 3), np.uint32)
+        self.order = np.memmap(self.path, dtype=np.uint32, mode="r",
+                               offset=offset + groups * 12,
+                               shape=(indexed,)) if indexed else np.zeros(0, np.uint32)
+        return True
+
+    def build(self):
+        """Проиндексировать весь архив."""
+        keys = opening_keys(self.archive)
+        self.order = np.argsort(keys, kind="stable").astype(np.uint32)
+        uniq, starts, counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.groups = np.stack([uniq, starts, counts], axis=1).astype(np.uint32)
+        self.indexed = len(keys)
+
+    def save(self):
+        fmt = self.archive.format
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack(INDEX_HEADER, INDEX_MAGIC, fmt.record_size if fmt else 0,
+                                self.indexed, len(self.groups)))
+            f.write(np.ascontiguousarray(self.groups, dtype="<u4").tobytes())
+            f.write(np.ascontiguousarray(self.order, dtype="<u4").tobytes())
+        os.replace(tmp, self.path)
+
+    def counts(self, mode=None, human_side=None, difficulty=None, opening=()):
+        """
+        Исходы партий под фильтром: {1: побед X, 2: побед O, 'draw': ничьих}.
+        opening - клетки первых ходов по порядку: номер клетки или набор номеров.
+        """
+        result = {}
+        tail = opening_keys(self.archive, self.indexed)
+        for outcome, code in OUTCOME_CODES.items():
+            ok = _match(self.groups[:, 0], mode, human_side, difficulty, outcome, opening)
+            total = int(self.groups[ok, 2].sum())
+            total += int(_match(tail, mode, human_side, difficulty, outcome, opening).sum())
+            result[outcome] = total
+        return result
+
+    def find(self, mode=None, human_side=None, difficulty=None, outcome=None, opening=()):
+        """Номера партий под фильтром (для archive[i] / archive.replay)."""
+        ok = _match(self.groups[:, 0], mode, human_side, difficulty, outcome, opening)
+        parts = [self.order[start:start + n] for _, start, n in self.groups[ok]]
+        tail = opening_keys(self.archive, self.indexed)
+        parts.append(np.flatnonzero(_match(tail, mode, human_side, difficulty, outcome, opening))
+                     + self.indexed)
+        return np.sort(np.concatenate(parts).astype(np.int64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Статистика архива партий по дебюту")
+    parser.add_argument("archive", help="файл архива (games.rec)")
+    parser.add_argument("--mode", choices=gamerecords.MODES)
+    parser.add_argument("--side", type=int, choices=(1, 2), help="сторона человека")
+    parser.add_argument("--difficulty", choices=gamerecords.DIFFICULTY_NAMES)
+    parser.add_argument("--first", help="клетки первого хода через запятую")
+    parser.add_argument("--second", help="клетки второго хода через запятую")
+    parser.add_argument("--rebuild", action="store_true", help="перестроить индекс")
+    args = parser.parse_args()
+
+    archive = gamerecords.GameArchive(args.archive)
+    index = GameIndex(archive)
+    if args.rebuild or index.indexed < len(archive):
+        index.build()
+        index.save()
+
+    opening = []
+    for cells in (args.first, args.second):
+        if cells is None:
+            break
+        opening.append([int(c) for c in cells.split(",")])
+
+    res = index.counts(args.mode, args.side, args.difficulty, opening)
+    total = sum(res.values())
+    print("партий: %d (в архиве %d)" % (total, len(archive)))
+    print("X: %d (%.1f%%)  O: %d (%.1f%%)  ничьи: %d" % (
+        res[1], 100 * win_rate(res, 1), res[2], 100 * win_rate(res, 2), res['draw']))
+
+
+if __name__ == "__main__":
+    main()
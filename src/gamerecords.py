@@ -0,0 +1,215 @@
+"""
+Архив сыгранных партий: компактные записи фиксированной длины.
+
+Файл = заголовок (HEADER_SIZE байт: размер поля, длина линии, длина записи)
++ записи подряд. Запись:
+    байт 0 - режим, сторона человека, исход, сложность (см. _pack_info),
+    байт 1 - число ходов,
+    дальше - номера клеток, упакованные по move_bits бит (для 3x3 - по 4 бита,
+    вся партия занимает 7 байт).
+
+Записи только дописываются в конец (GameLog), а читаются через mmap
+(GameArchive) - i-я запись лежит по смещению HEADER_SIZE + i * record_size,
+так что чтение любой партии не требует разбора файла. Запросы по дебютам
+и исходам - в gameindex.py.
+
+Пример:
+    archive = gamerecords.GameArchive(gamerecords.records_file(rules))
+    rec = archive[-1]
+    state = gamerecords.state_at(rules, rec, ply=3)   # engine.GameState
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+import ai
+import engine
+
+MAGIC = b"TTTG1\n"
+HEADER_FORMAT = "<6sBBH6x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 16
+
+MODES = ("two_players", "vs_ai")
+DIFFICULTY_NAMES = tuple(ai.DIFFICULTIES)
+NO_DIFFICULTY = 7
+OUTCOMES = {1: 1, 2: 2, 'draw': 3}  # 0 - партия не доиграна
+
+# moves - номера клеток (row * size + col) по порядку, X ходит первым
+GameRecord = namedtuple("GameRecord", "mode human_side difficulty outcome moves")
+
+
+def records_file(rules):
+    """Файл архива рядом с кодом; для каждого размера поля - свой."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    if rules.size == 3 and rules.win_length == 3:
+        return os.path.join(here, "games.rec")
+    return os.path.join(here, "games_%dx%d_%d.rec" % (rules.size, rules.size, rules.win_length))
+
+
+def difficulty_name(value):
+    """Имя уровня по вероятности лучшего хода из ai.DIFFICULTIES (None - не найден)."""
+    for name, v in ai.DIFFICULTIES.items():
+        if v == value:
+            return name
+    return None
+
+
+# ----------------------------------------
+# ФОРМАТ ЗАПИСИ
+# ----------------------------------------
+def _pack_info(mode, human_side, difficulty, outcome):
+    diff = NO_DIFFICULTY if difficulty is None else DIFFICULTY_NAMES.index(difficulty)
+    return MODES.index(mode) | (human_side - 1) << 1 | OUTCOMES.get(outcome, 0) << 2 | diff << 4
+
+
+def unpack_info(info):
+    """(mode, human_side, difficulty, outcome) из первого байта записи."""
+    diff = info >> 4 & 7
+    outcome = info >> 2 & 3
+    return (MODES[info & 1],
+            (info >> 1 & 1) + 1,
+            None if diff == NO_DIFFICULTY else DIFFICULTY_NAMES[diff],
+            'draw' if outcome == 3 else (outcome or None))
+
+
+class RecordFormat:
+    """Длина записи и упаковка ходов для поля size x size."""
+
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        cells = size * size
+        if cells > 255:
+            raise ValueError("поле больше 255 клеток не помещается в формат записи")
+        self.move_bits = max(1, (cells - 1).bit_length())
+        self.move_bytes = (cells * self.move_bits + 7) // 8
+        self.record_size = 2 + self.move_bytes
+
+    def header(self):
+        return struct.pack(HEADER_FORMAT, MAGIC, self.size, self.win_length, self.record_size)
+
+    def pack(self, rec):
+        packed = 0
+        for i, cell in enumerate(rec.moves):
+            packed |= cell << (i * self.move_bits)
+        info = _pack_info(rec.mode, rec.human_side, rec.difficulty, rec.outcome)
+        return bytes((info, len(rec.moves))) + packed.to_bytes(self.move_bytes, "little")
+
+    def unpack(self, data):
+        info, count = data[0], data[1]
+        packed = int.from_bytes(data[2:self.record_size], "little")
+        mask = (1 << self.move_bits) - 1
+        moves = tuple(packed >> (i * self.move_bits) & mask for i in range(count))
+        return GameRecord(*unpack_info(info), moves)
+
+
+def _read_header(f):
+    data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        return None
+    magic, size, win_length, record_size = struct.unpack(HEADER_FORMAT, data)
+    if magic != MAGIC:
+        raise ValueError("%s: не архив партий" % getattr(f, "name", f))
+    fmt = RecordFormat(size, win_length)
+    if fmt.record_size != record_size:
+        raise ValueError("%s: неизвестная длина записи" % getattr(f, "name", f))
+    return fmt
+
+
+def state_at(rules, rec, ply=None):
+    """engine.GameState после первых ply ходов партии (None - после всех)."""
+    return engine.GameState.from_moves(rules, rec.moves if ply is None else rec.moves[:ply])
+
+
+# ----------------------------------------
+# ЗАПИСЬ
+# ----------------------------------------
+class GameLog:
+    """Дописывает партии в конец архива (файл держится открытым)."""
+
+    def __init__(self, path, rules):
+        self.path = path
+        self.format = RecordFormat(rules.size, rules.win_length)
+        self._file = open(path, "ab+")
+        self._file.seek(0)
+        fmt = _read_header(self._file)
+        if fmt is None:
+            self._file.truncate(0)
+            self._file.write(self.format.header())
+        elif (fmt.size, fmt.win_length) != (rules.size, rules.win_length):
+            self._file.close()
+            raise ValueError("%s: архив для поля %dx%d (линия %d)"
+                             % (path, fmt.size, fmt.size, fmt.win_length))
+        else:
+            # оборванная последняя запись (сбой посреди записи) отбрасывается
+            end = self._file.seek(0, os.SEEK_END)
+            extra = (end - HEADER_SIZE) % self.format.record_size
+            if extra:
+                self._file.truncate(end - extra)
+        self._file.flush()
+
+    def record(self, rec):
+        self._file.write(self.format.pack(rec))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# ----------------------------------------
+# ЧТЕНИЕ
+# ----------------------------------------
+class GameArchive:
+    """Архив только для чтения через mmap: len(), archive[i], replay(i, ply)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = None
+        self.buffer = b""
+        self._file = None
+        self.refresh()
+
+    def refresh(self):
+        """Перечитать размер файла (после дописывания новых партий)."""
+        self.close()
+        self._file = open(self.path, "rb")
+        self.format = _read_header(self._file)
+        size = os.fstat(self._file.fileno()).st_size
+        if self.format is None or size <= HEADER_SIZE:
+            self.buffer = b""
+            self.count = 0
+        else:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.count = (size - HEADER_SIZE) // self.format.record_size
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, i):
+        """Байты i-й записи."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = HEADER_SIZE + i * self.format.record_size
+        return self.buffer[start:start + self.format.record_size]
+
+    def __getitem__(self, i):
+        return self.format.unpack(self.raw(i))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def replay(self, rules, i, ply=None):
+        """Позиция i-й партии после ply ходов (engine.GameState)."""
+        return state_at(rules, self[i], ply)
@@ -0,0 +1,482 @@
+"""
+Игра на двоих по локальной сети: два окна (или процесса), одна партия.
+
+Хост (python game.py --host) - хранитель партии: он проверяет каждый ход
+гостя и рассылает итог, его список ходов - единственная правда. Гость
+(python game.py --join 192.168.0.5) ставит свой ход на поле сразу, не
+дожидаясь ответа, и сверяет его с подтверждением хоста; при расхождении
+позиция гостя пересобирается по ходам хоста. После обрыва гость сам
+переподключается и получает от хоста полный список ходов.
+
+Протокол - маленькие двоичные кадры по TCP (TCP_NODELAY, без склейки),
+заголовок 6 байт: тип, номер партии, seq, аргумент, длина данных.
+
+    HELLO   seq = size << 8 | win_length, arg = версия, данные - имя игрока;
+            от гостя - ещё и запрос полной синхронизации
+    SYNC    seq = число ходов, arg = сторона гостя, данные - клетки ходов
+    MOVE    seq = номер хода в партии (ply до него), arg = клетка
+    RESTART номер партии, которую просят начать заново
+
+Номер партии (0..255 по кругу) растёт при каждом рестарте, поэтому ход,
+отправленный до рестарта, не попадает в новую партию.
+
+Сокеты читают фоновые потоки и складывают кадры в очередь, а применяет
+их poll() в главном потоке - между кадрами игры; wake() из потока будит
+главный цикл (в игре - событие pygame), так что ход соперника виден
+в ближайшем кадре. Проверка на одной машине - двумя процессами:
+
+    python lan.py host --games 200 &
+    python lan.py join 127.0.0.1        # играет, пока хост не закончит
+"""
+import argparse
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+
+import core
+import engine
+import search
+
+DEFAULT_PORT = 8766
+PROTOCOL_VERSION = 1
+RECONNECT_S = 0.5   # пауза между попытками гостя переподключиться
+ACCEPT_POLL_S = 0.5
+
+HEADER = struct.Struct("<BBHBB")  # тип, партия, seq, аргумент, длина данных
+_DISCONNECT, HELLO, SYNC, MOVE, RESTART = range(5)  # _DISCONNECT - только внутри процесса
+
+
+def pack(kind, game=0, seq=0, arg=0, payload=b""):
+    return HEADER.pack(kind, game, seq, arg, len(payload)) + payload
+
+
+def unpack_frames(buf):
+    """Целые кадры из начала buf: ([(тип, партия, seq, аргумент, данные)], остаток)."""
+    frames = []
+    pos = 0
+    while len(buf) - pos >= HEADER.size:
+        kind, game, seq, arg, length = HEADER.unpack_from(buf, pos)
+        end = pos + HEADER.size + length
+        if end > len(buf):
+            break
+        frames.append((kind, game, seq, arg, bytes(buf[pos + HEADER.size:end])))
+        pos = end
+    return frames, buf[pos:]
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """'host' или 'host:port' -> (host, port)."""
+    host, _, port = text.partition(":")
+    return host or "127.0.0.1", int(port) if port else default_port
+
+
+class LanSession:
+    """
+    Общее для хоста и гостя: сокет, фоновое чтение и применение кадров к match
+    (core.Match в режиме "two_players"). side - сторона этого игрока (1 = X).
+    Разбор кадров партии (_on_frame), свой ход local_move(row, col) - True,
+    если он уже стоит на поле, - и restart() (R в партии: новая партия у обоих)
+    у хоста и гостя свои - см. LanHost и LanGuest.
+    """
+    is_host = False
+
+    def __init__(self, match, side, name, wake=None):
+        if match.rules.cells > 255:
+            # клетка - байт arg, а все ходы SYNC - не больше 255 байт данных
+            raise ValueError("поле больше 255 клеток не передаётся")
+        self.match = match
+        self.side = side
+        self.name = name
+        self.peer_name = None
+        self.wake = wake
+        self.game = 0            # номер партии, общий с соперником
+        self.connected = False   # рукопожатие прошло и соединение живо
+        self.error = None        # почему соединение отвергнуто (другие правила / версия)
+        self.latencies = []      # гость: секунд от своего хода до подтверждения хоста
+        self._sent = None        # гость: (seq, время) последнего своего хода
+        self._awaiting = False   # гость: отправлен ход, который сам не ставится (см. local_move)
+        self._inbox = queue.Queue()
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._closed = False
+        match.mode = "two_players"
+        self._set_names()
+
+    # ----------------------------------------
+    # СОКЕТ (фоновые потоки)
+    # ----------------------------------------
+    def _read_loop(self, sock):
+        """Кадры из sock - в очередь, пока соединение не оборвётся."""
+        buf = b""
+        try:
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                frames, buf = unpack_frames(buf + chunk)
+                for frame in frames:
+                    self._inbox.put((sock,) + frame)
+                if frames:
+                    self._wake()
+        except OSError:
+            pass
+        self._inbox.put((sock, _DISCONNECT, 0, 0, 0, b""))
+        self._wake()
+
+    def _wake(self):
+        if self.wake is not None:
+            self.wake()
+
+    def _attach(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._send_lock:
+            old, self._sock = self._sock, sock
+        if old is not None:
+            _shutdown(old)
+
+    def _send(self, kind, seq=0, arg=0, payload=b""):
+        """Кадр сопернику; без соединения - молча теряется (после переподключения будет SYNC)."""
+        with self._send_lock:
+            if self._sock is None:
+                return
+            try:
+                self._sock.sendall(pack(kind, self.game, seq, arg, payload))
+            except OSError:
+                pass  # обрыв заметит поток чтения
+
+    def _send_hello(self):
+        rules = self.match.rules
+        self._send(HELLO, rules.size << 8 | rules.win_length, PROTOCOL_VERSION,
+                   self.name.encode("utf-8")[:255])
+
+    def _send_sync(self):
+        self._send(SYNC, self.match.state.ply, 3 - self.side, bytes(self.match.state.moves))
+
+    # ----------------------------------------
+    # ГЛАВНЫЙ ПОТОК
+    # ----------------------------------------
+    def poll(self):
+        """Применить всё пришедшее; True, если поле (или соединение) изменилось."""
+        changed = False
+        while True:
+            try:
+                sock, kind, game, seq, arg, payload = self._inbox.get_nowait()
+            except queue.Empty:
+                return changed
+            if sock is not self._sock:
+                continue  # кадр старого соединения
+            if kind == _DISCONNECT:
+                self.connected = False
+                self._awaiting = False
+                changed = True
+            elif kind == HELLO:
+                changed |= self._on_hello(seq, arg, payload)
+            elif self.connected:
+                changed |= self._on_frame(kind, game, seq, arg, payload)
+
+    def _on_hello(self, seq, arg, payload):
+        rules = self.match.rules
+        if arg != PROTOCOL_VERSION or seq != (rules.size << 8 | rules.win_length):
+            self.error = "у соперника другая версия или другое поле"
+            self.connected = False
+            _shutdown(self._sock)
+            return True
+        self.peer_name = payload.decode("utf-8", "replace") or "Соперник"
+        self.connected = True
+        self._set_names()
+        return True
+
+    def _set_names(self):
+        names = self.match.player_names
+        names[self.side - 1] = self.name
+        names[2 - self.side] = self.peer_name or "Соперник"
+
+    def _play(self, cell):
+        row, col = divmod(cell, self.match.rules.size)
+        self.match.play(row, col)
+
+    def my_turn(self):
+        match = self.match
+        return (self.connected and not self._awaiting and not match.game_over
+                and match.state.player == self.side)
+
+    def status_text(self):
+        """Строка состояния сети для поля (None - показывать нечего)."""
+        if self.error:
+            return self.error
+        if not self.connected:
+            return "Ожидание соперника..."
+        if not self.match.game_over and self.match.state.player != self.side:
+            return "Ход: %s" % self.peer_name
+        return None
+
+    def close(self):
+        self._closed = True
+        with self._send_lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            _shutdown(sock)
+
+
+def _shutdown(sock):
+    """Закрыть сокет так, чтобы проснулся поток, ждущий в recv()."""
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+class LanHost(LanSession):
+    """Хост: ждёт гостя на port, проверяет его ходы и рассылает итог."""
+    is_host = True
+
+    def __init__(self, match, name, port=DEFAULT_PORT, side=1, wake=None, bind=""):
+        super().__init__(match, side, name, wake)
+        self._listener = socket.create_server((bind, port))
+        self._listener.settimeout(ACCEPT_POLL_S)
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="lan-accept", daemon=True).start()
+
+    def _accept_loop(self):
+        """Новый гость вытесняет прежнее соединение (переподключение после обрыва)."""
+        while not self._closed:
+            try:
+                sock, _ = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            sock.settimeout(None)
+            self._attach(sock)
+            threading.Thread(target=self._read_loop, args=(sock,), name="lan-read", daemon=True).start()
+
+    def _on_hello(self, seq, arg, payload):
+        changed = super()._on_hello(seq, arg, payload)
+        if self.connected:
+            self._send_hello()
+            self._send_sync()
+        return changed
+
+    def _on_frame(self, kind, game, seq, arg, payload):
+        match = self.match
+        state = match.state
+        if kind == MOVE:
+            if (game == self.game and seq == state.ply and not match.game_over
+                    and state.player != self.side and arg < match.rules.cells and state.is_free(arg)):
+                self._play(arg)
+                self._send(MOVE, seq, arg)  # гостю это подтверждение
+                return True
+            self._send_sync()  # устаревший или неверный ход - гость берёт позицию хоста
+        elif kind == RESTART:
+            if game == self.game:
+                self.restart()
+                return True
+            self._send_sync()
+        return False
+
+    def local_move(self, row, col):
+        if not self.my_turn() or not self.match.is_cell_free(row, col):
+            return False
+        seq = self.match.state.ply
+        cell = row * self.match.rules.size + col
+        self._play(cell)
+        self._send(MOVE, seq, cell)
+        return True
+
+    def restart(self):
+        self.game = (self.game + 1) & 0xFF
+        self.match.restart()
+        self._send_sync()
+
+    def status_text(self):
+        if not self.connected and not self.error:
+            return "Ожидание соперника (порт %d)..." % self.port
+        return super().status_text()
+
+    def close(self):
+        super().close()
+        self._listener.close()
+
+
+class LanGuest(LanSession):
+    """Гость: подключается к хосту, ставит свои ходы сразу и сверяет их с хостом."""
+
+    def __init__(self, match, name, address, wake=None):
+        super().__init__(match, 2, name, wake)  # сторона уточнится в SYNC
+        self.address = address
+        self.confirmed = 0  # сколько первых ходов партии подтвердил хост
+        self.resyncs = 0    # сколько раз позиция пересобиралась по ходам хоста
+        threading.Thread(target=self._connect_loop, name="lan-connect", daemon=True).start()
+
+    def _connect_loop(self):
+        """Подключиться, поздороваться и читать; после обрыва - снова, пока сессия открыта."""
+        while not self._closed and not self.error:
+            try:
+                sock = socket.create_connection(self.address, timeout=RECONNECT_S)
+            except OSError:
+                time.sleep(RECONNECT_S)
+                continue
+            sock.settimeout(None)
+            self._attach(sock)
+            if self._closed:
+                _shutdown(sock)
+                return
+            self._send_hello()
+            self._read_loop(sock)
+            time.sleep(RECONNECT_S)
+
+    def _on_frame(self, kind, game, seq, arg, payload):
+        match = self.match
+        state = match.state
+        if kind == SYNC:
+            moves = list(payload)
+            if state.moves == moves:
+                changed = False
+            else:
+                # новая партия после рестарта - не расхождение
+                self.resyncs += game == self.game
+                match.load_moves(moves)
+                changed = True
+            self.game = game
+            self.side = arg
+            self._set_names()
+            self._awaiting = False
+            self._sent = None
+            self.confirmed = seq
+            return changed
+        if kind != MOVE or game != self.game or seq < self.confirmed:
+            return False  # кадр прошлой партии или повтор
+        if self._sent is not None and self._sent[0] == seq:
+            self.latencies.append(time.perf_counter() - self._sent[1])
+            self._sent = None
+            self._awaiting = False
+        if seq > self.confirmed:
+            self._send_hello()  # пропуск - просим полную позицию
+            return False
+        self.confirmed += 1
+        if seq < state.ply:
+            if state.moves[seq] == arg:
+                return False  # подтверждение хода, уже стоящего на поле
+            self.resyncs += 1
+            match.load_moves(state.moves[:seq] + [arg])  # хост решил иначе
+            return True
+        if match.game_over or not state.is_free(arg):
+            self._send_hello()
+            return False
+        self._play(arg)
+        return True
+
+    def local_move(self, row, col):
+        """
+        Ход ставится на поле сразу; подтверждение хоста придёт через время
+        пути туда и обратно. Ход, заканчивающий партию, ждёт подтверждения,
+        чтобы в счёт и рейтинги не попал исход, который хост отвергнет.
+        """
+        match = self.match
+        if not self.my_turn() or not match.is_cell_free(row, col):
+            return False
+        state = match.state
+        seq = state.ply
+        cell = row * match.rules.size + col
+        state.play(cell)
+        finishing = state.winner is not None
+        state.undo()
+        self._sent = (seq, time.perf_counter())
+        if finishing:
+            self._awaiting = True
+        else:
+            self._play(cell)
+        self._send(MOVE, seq, cell)
+        return not finishing
+
+    def restart(self):
+        self._send(RESTART)  # новая позиция придёт от хоста в SYNC
+
+    def status_text(self):
+        if not self.connected and not self.error:
+            return "Подключение к %s:%d..." % self.address
+        return super().status_text()
+
+
+# ----------------------------------------
+# ПРОВЕРКА ДВУМЯ ПРОЦЕССАМИ
+# ----------------------------------------
+def _play_games(session, games, rng):
+    """
+    Случайные ходы за своего игрока. Хост после конца партии сразу начинает
+    следующую и закрывает сессию после games партий; гость играет, пока хост
+    не отключится.
+    """
+    woke = threading.Event()
+    session.wake = woke.set
+    match = session.match
+    finished = 0
+    was_connected = False
+    start = time.perf_counter()
+    while True:
+        session.poll()
+        if session.error:
+            raise RuntimeError(session.error)
+        if session.connected:
+            was_connected = True
+        elif was_connected and not session.is_host:
+            break
+        if session.is_host and match.game_over:
+            finished += 1
+            if finished == games:
+                break
+            session.restart()
+        elif session.my_turn():
+            state = match.state
+            cell = rng.choice([i for i in range(match.rules.cells) if state.is_free(i)])
+            session.local_move(*divmod(cell, match.rules.size))
+        else:
+            woke.wait(RECONNECT_S)
+            woke.clear()
+    return finished, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка сетевой игры на двоих: случайные ходы")
+    sub = parser.add_subparsers(dest="role", required=True)
+    host = sub.add_parser("host", help="ждать гостя")
+    host.add_argument("--port", type=int, default=DEFAULT_PORT)
+    join = sub.add_parser("join", help="подключиться к хосту")
+    join.add_argument("address", help="host[:port]")
+    host.add_argument("--games", type=int, default=100)
+    for p in (host, join):
+        p.add_argument("--size", type=int, default=3)
+        p.add_argument("--win", type=int, default=None, help="длина линии (по умолчанию = size)")
+        p.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    rules = engine.Rules(args.size, args.win or args.size)
+    match = core.Match(rules, searcher=search.AlphaBetaSearch(rules))
+    if args.role == "host":
+        session = LanHost(match, "Хост", args.port)
+    else:
+        session = LanGuest(match, "Гость", parse_address(args.address))
+    try:
+        games, elapsed = _play_games(session, getattr(args, "games", None), random.Random(args.seed))
+        if session.is_host:
+            time.sleep(RECONNECT_S)  # последний ход должен дойти до гостя
+    finally:
+        session.close()
+
+    if session.is_host:
+        print("host: %d партий за %.2f с" % (games, elapsed))
+    else:
+        print("join: %.2f с, пересинхронизаций позиции: %d" % (elapsed, session.resyncs))
+    lat = sorted(session.latencies)
+    if lat:
+        pick = lambda q: 1000 * lat[min(len(lat) - 1, int(q * len(lat)))]
+        print("ход -> подтверждение хоста (%d ходов): p50 %.2f мс, p99 %.2f мс, max %.2f мс"
+              % (len(lat), pick(0.5), pick(0.99), pick(1.0)))
+
+
+if __name__ == "__main__":
+    main()
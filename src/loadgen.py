@@ -0,0 +1,105 @@
+"""
+Нагрузочный клиент для server.py: ходов в секунду и хвосты задержек.
+
+Открывает clients одновременных подключений; каждое играет партии подряд
+(случайные ходы в свободные клетки) и замеряет время от отправки хода
+до ответа сервера (в режиме vs_ai - вместе с ответным ходом компьютера).
+
+Пример:
+    python server.py &
+    python loadgen.py --clients 1000 --games 20 --mode vs_ai --difficulty hard
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import ai
+import server
+
+
+async def _request(reader, writer, msg):
+    writer.write((json.dumps(msg) + "\n").encode("utf-8"))
+    await writer.drain()
+    while True:
+        reply = json.loads(await reader.readline())
+        if "event" not in reply:  # уведомления других игроков пропускаем
+            return reply
+
+
+async def _client(args, latencies, rng):
+    reader, writer = await asyncio.open_connection(args.host, args.port, limit=server.MAX_LINE)
+    try:
+        for _ in range(args.games):
+            reply = await _request(reader, writer, {
+                "op": "new", "mode": args.mode, "size": args.size, "win": args.win,
+                "side": rng.choice((1, 2)), "difficulty": args.difficulty})
+            if not reply["ok"]:
+                raise RuntimeError(reply["error"])
+            state = reply["state"]
+            size = state["size"]
+            while not state["game_over"]:
+                occupied = state["x"] | state["o"]
+                free = [i for i in range(size * size) if not occupied >> i & 1]
+                cell = rng.choice(free)
+                start = time.perf_counter()
+                reply = await _request(reader, writer,
+                                       {"op": "move", "row": cell // size, "col": cell % size})
+                latencies.append(time.perf_counter() - start)
+                if not reply["ok"]:
+                    raise RuntimeError(reply["error"])
+                state = reply["state"]
+        await _request(reader, writer, {"op": "state"})
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(args):
+    latencies = []
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(args, latencies, random.Random(rng.random()))
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный клиент игрового сервера")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=100, help="одновременных подключений")
+    parser.add_argument("--games", type=int, default=10, help="партий на подключение")
+    parser.add_argument("--mode", default="vs_ai", choices=["vs_ai", "two_players"])
+    parser.add_argument("--difficulty", default="impossible", choices=list(ai.DIFFICULTIES))
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win", type=int, default=None, help="длина линии (по умолчанию = size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+
+    latencies, elapsed = asyncio.run(run(args))
+    latencies.sort()
+    ms = [1000 * percentile(latencies, q) for q in (0.5, 0.95, 0.99, 1.0)]
+    print("%d ходов за %.1f с (%.0f ходов/с, подключений: %d)"
+          % (len(latencies), elapsed, len(latencies) / elapsed, args.clients))
+    print("задержка хода: p50 %.2f мс, p95 %.2f мс, p99 %.2f мс, max %.2f мс" % tuple(ms))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"clients": args.clients, "games": args.games, "mode": args.mode,
+                       "difficulty": args.difficulty, "size": args.size, "moves": len(latencies),
+                       "elapsed_s": elapsed, "moves_per_s": len(latencies) / elapsed,
+                       "p50_ms": ms[0], "p95_ms": ms[1], "p99_ms": ms[2], "max_ms": ms[3]},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
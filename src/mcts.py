@@ -0,0 +1,317 @@
+"""
+Игрок на поиске по дереву Монте-Карло (MCTS/UCT) для больших полей.
+
+Alpha-beta на полях 9x9 и больше успевает лишь на пару полуходов, а MCTS
+оценивает ходы случайными партиями (playout) до конца и с каждой итерацией
+уточняет дерево там, где ходы лучше. Ходы рассматриваются только рядом
+с камнями (engine.Rules.neighbours), партии доигрываются на engine.GameState.
+
+Параллельность - по корню: каждый процесс растит своё дерево от той же
+позиции, по истечении времени счётчики посещений ходов корня суммируются,
+выбирается самый посещаемый ход. Чем больше ядер, тем больше партий успевает
+сыграться за тот же лимит времени. Деревья живут в процессах между ходами:
+если новая позиция получается из прежнего корня ходами, которые уже есть
+в дереве, поиск продолжается с соответствующего узла. Отменённый ход
+(SearchTask.cancel - Esc, рестарт) останавливает поиск и в процессах.
+Умерший процесс выбывает из пула - ход считается по ответам остальных,
+а без них поиск идёт в своём процессе.
+
+MCTSPlayer можно передавать в ai.choose_move вместо search.AlphaBetaSearch -
+у него тот же iter_best_move(me, opp, time_limit_ms).
+
+    player = mcts.MCTSPlayer(rules, workers=4)
+    move = player.best_move(me, opp, time_limit_ms=1000)
+    player.close()
+"""
+import math
+import multiprocessing
+import random
+import time
+
+import engine
+import search
+
+UCT_C = 1.4          # вес исследования в формуле UCT
+PLAYOUT_RADIUS = 1   # ходы случайной партии - рядом с камнями
+BATCH = 16           # итераций между проверками времени в процессе-помощнике
+CANCEL = "cancel"    # сообщение процессу: бросить текущий поиск
+REPLY_GRACE_S = 1.0  # сколько ждать ответа процесса сверх лимита времени на ход
+
+
+class Node:
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, parent, untried):
+        self.move = move          # клетка, которой пришли в узел (None - корень)
+        self.parent = parent
+        self.children = []
+        self.untried = untried    # ещё не раскрытые ходы
+        self.visits = 0
+        self.wins = 0.0           # с точки зрения игрока, сделавшего move
+
+
+def _candidates(rules, occupied, rng):
+    """Свободные клетки рядом с камнями в случайном порядке (пустое поле - центр)."""
+    if not occupied:
+        return [rules.cells // 2]
+    cells = list(search.iter_bits(rules.neighbours(occupied, PLAYOUT_RADIUS) & ~occupied))
+    rng.shuffle(cells)
+    return cells
+
+
+class Tree:
+    """Дерево одного процесса (или одного потока при workers=1)."""
+
+    def __init__(self, rules, seed=0, c=UCT_C):
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.c = c
+        self.state = engine.GameState(rules)
+        self.root = Node(None, None, _candidates(rules, 0, self.rng))
+
+    def set_position(self, x, o):
+        """Перейти к позиции (x, o): спуск по дереву, если возможно, иначе новое дерево."""
+        state = self.state
+        if x & state.x == state.x and o & state.o == state.o:
+            node = self.root
+            while (state.x, state.o) != (x, o):
+                added = (x & ~state.x) if state.player == 1 else (o & ~state.o)
+                child = next((ch for ch in node.children if added >> ch.move & 1), None)
+                if child is None:
+                    break
+                state.play(child.move)
+                node = child
+            else:
+                node.parent = None
+                self.root = node
+                return
+
+        # порядок ходов неважен: на поле те же камни, а собранной линии в позиции нет
+        state = engine.GameState(self.rules)
+        o_cells = list(search.iter_bits(o))
+        for i, cell in enumerate(search.iter_bits(x)):
+            state.play(cell)
+            if i < len(o_cells):
+                state.play(o_cells[i])
+        self.state = state
+        self.root = Node(None, None, _candidates(self.rules, x | o, self.rng))
+
+    def iterate(self, count):
+        """count итераций: выбор по UCT, раскрытие, случайная партия, обратный проход."""
+        state = self.state
+        rules = self.rules
+        rng = self.rng
+        log = math.log
+        sqrt = math.sqrt
+        c = self.c
+        root = self.root
+        for _ in range(count):
+            node = root
+            # выбор
+            while not node.untried and node.children and state.winner is None:
+                log_n = log(node.visits)
+                best = None
+                best_score = -1.0
+                for ch in node.children:
+                    score = ch.wins / ch.visits + c * sqrt(log_n / ch.visits)
+                    if score > best_score:
+                        best, best_score = ch, score
+                node = best
+                state.play(node.move)
+            # раскрытие
+            if node.untried and state.winner is None:
+                move = node.untried.pop()
+                state.play(move)
+                untried = _candidates(rules, state.x | state.o, rng) if state.winner is None else []
+                child = Node(move, node, untried)
+                node.children.append(child)
+                node = child
+            # случайная партия
+            played = 0
+            while state.winner is None:
+                state.play(_candidates(rules, state.x | state.o, rng)[0])
+                played += 1
+            winner = state.winner
+            for _ in range(played):
+                state.undo()
+            # обратный проход (ход корня после спуска по дереву уже сыгран - его не отменяем)
+            while node is not root:
+                node.visits += 1
+                mover = 3 - state.player  # сделавший node.move
+                if winner == mover:
+                    node.wins += 1.0
+                elif winner == 'draw':
+                    node.wins += 0.5
+                state.undo()
+                node = node.parent
+            root.visits += 1
+
+    def root_stats(self):
+        """{клетка: [посещений, выигрышей]} для ходов корня."""
+        return {ch.move: [ch.visits, ch.wins] for ch in self.root.children}
+
+    def search(self, duration_s, iterations, interrupted=None):
+        """
+        Итерации до лимита времени или числа итераций (что раньше);
+        interrupted() проверяется между порциями - True останавливает поиск.
+        """
+        deadline = time.perf_counter() + duration_s
+        done = 0
+        while time.perf_counter() < deadline and (iterations is None or done < iterations):
+            if interrupted is not None and interrupted():
+                break
+            n = BATCH if iterations is None else min(BATCH, iterations - done)
+            self.iterate(n)
+            done += n
+        return done
+
+
+def _worker(conn, size, win_length, seed, c):
+    """Процесс пула: хранит своё дерево и отвечает на запросы поиска."""
+    tree = Tree(engine.Rules(size, win_length), seed, c)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            return
+        if msg == CANCEL:
+            continue  # поиск уже закончился сам
+        request, x, o, duration_s, iterations = msg
+        tree.set_position(x, o)
+        # любое новое сообщение (отмена, следующий ход, выход) прерывает поиск
+        done = tree.search(duration_s, iterations, conn.poll)
+        conn.send((request, tree.root_stats(), done))
+
+
+class MCTSPlayer:
+    """
+    Игрок MCTS. workers > 1 - деревья в отдельных процессах (параллельность по корню).
+    iterations - число итераций на ход (на все процессы вместе); None - только по времени.
+    После хода доступны nodes (сыграно партий) и last_stats ({клетка: [посещений, выигрышей]}).
+    """
+
+    def __init__(self, rules, workers=1, iterations=None, c=UCT_C, seed=0):
+        self.rules = rules
+        self.workers = max(1, workers)
+        self.iterations = iterations
+        self.nodes = 0
+        self.cutoffs = 0   # для совместимости со счётчиками AlphaBetaSearch
+        self.last_stats = {}
+        self._request = 0
+        self._procs = []
+        self._conns = []
+        # своё дерево - при workers=1 и на случай, если все процессы умрут
+        self._tree = Tree(rules, seed, c)
+        if self.workers > 1:
+            ctx = multiprocessing.get_context()
+            for i in range(self.workers):
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(target=_worker, args=(child, rules.size, rules.win_length,
+                                                          seed * 1000003 + i, c), daemon=True)
+                proc.start()
+                child.close()  # иначе смерть процесса не закроет канал
+                self._procs.append(proc)
+                self._conns.append(parent)
+
+    def best_move(self, me, opp, time_limit_ms=search.AI_MOVE_TIME_MS, max_depth=None):
+        return search.run_to_completion(self.iter_best_move(me, opp, time_limit_ms, max_depth))
+
+    def iter_best_move(self, me, opp, time_limit_ms=search.AI_MOVE_TIME_MS, max_depth=None):
+        """Генератор хода (row, col) стороны с камнями me; max_depth не используется."""
+        if (me | opp) == self.rules.full_mask:
+            return None
+        x, o = (me, opp) if engine.popcount(me) == engine.popcount(opp) else (opp, me)
+        duration_s = time_limit_ms / 1000.0
+        deadline = time.perf_counter() + duration_s
+        iterations = self.iterations
+
+        if not self._conns:
+            stats = yield from self._search_here(x, o, deadline, iterations)
+        else:
+            self._request += 1
+            request = self._request
+            per_worker = None if iterations is None else -(-iterations // len(self._conns))
+            # запас на пересылку результатов
+            budget = max(0.0, duration_s - 0.01)
+            pending = []
+            for conn in list(self._conns):
+                try:
+                    conn.send((request, x, o, budget, per_worker))
+                    pending.append(conn)
+                except (OSError, EOFError):
+                    self._drop_worker(conn)
+            stats = {}
+            self.nodes = 0
+            try:
+                while pending:
+                    for conn in list(pending):
+                        try:
+                            if not conn.poll(0.001):
+                                if not self._procs[self._conns.index(conn)].is_alive():
+                                    raise EOFError
+                                continue
+                            reply, part, done = conn.recv()
+                        except (OSError, EOFError):
+                            # процесс умер - ход по ответам остальных
+                            pending.remove(conn)
+                            self._drop_worker(conn)
+                            continue
+                        if reply != request:
+                            continue  # ответ на отменённый запрос
+                        pending.remove(conn)
+                        self.nodes += done
+                        for move, (visits, wins) in part.items():
+                            total = stats.setdefault(move, [0, 0.0])
+                            total[0] += visits
+                            total[1] += wins
+                    if pending and time.perf_counter() > deadline + REPLY_GRACE_S:
+                        break  # зависший процесс не держит ход; его поиск отменяется ниже
+                    yield
+            finally:
+                # генератор закрыт до ответа всех процессов (SearchTask.cancel) -
+                # остановить их поиск, а не ждать до конца лимита времени
+                for conn in pending:
+                    try:
+                        conn.send(CANCEL)
+                    except (OSError, EOFError):
+                        pass
+            if not stats:
+                # ни одного ответа - ищем сами в оставшееся время
+                stats = yield from self._search_here(x, o, deadline, iterations)
+
+        self.last_stats = stats
+        if not stats:
+            # не успели ни одной итерации - любой ход рядом с камнями
+            move = _candidates(self.rules, me | opp, random)[0]
+        else:
+            move = max(stats, key=lambda m: stats[m][0])
+        return self.rules.cell_coords[move]
+
+    def _search_here(self, x, o, deadline, iterations):
+        """Поиск своим деревом; генератор, результат - статистика корня."""
+        tree = self._tree
+        tree.set_position(x, o)
+        self.nodes = 0
+        # yield после каждой итерации: на 15x15 одна итерация - пара миллисекунд,
+        # и порция SearchTask.step не выходит за свой slice_ms больше чем на неё
+        while time.perf_counter() < deadline and (iterations is None or self.nodes < iterations):
+            tree.iterate(1)
+            self.nodes += 1
+            yield
+        return tree.root_stats()
+
+    def _drop_worker(self, conn):
+        i = self._conns.index(conn)
+        conn.close()
+        self._procs[i].join(0)
+        del self._conns[i], self._procs[i]
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (OSError, EOFError):
+                pass
+        for proc in self._procs:
+            proc.join(1)
+        self._procs = []
+        self._conns = []
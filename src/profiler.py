@@ -0,0 +1,133 @@
+"""
+Профилировщик кадров: время фаз главного цикла и счётчики поиска.
+
+Фазы замеряются так:
+    with profiler.phase("check_winner"):
+        ...
+или "кругами" внутри кадра: lap("events") относит к фазе events время,
+прошедшее с начала кадра или предыдущего lap(). Пока профилировщик выключен,
+phase() возвращает общий пустой объект, а lap() сразу выходит - накладные
+расходы сводятся к одному вызову метода. Собранные данные
+показываются оверлеем (stats_lines) и выгружаются в формате Chrome trace
+(chrome://tracing, Perfetto) через export_chrome_trace().
+"""
+import json
+import os
+import time
+from collections import deque
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameProfiler:
+    """Время фаз за последние window кадров + лента событий для трассировки."""
+
+    def __init__(self, window=120, max_trace_events=200000):
+        self.enabled = False
+        self.window = window
+        self.frames = deque(maxlen=window)      # {фаза: мс} по кадрам
+        self.trace = deque(maxlen=max_trace_events)
+        self.counters = {}
+        self.origin = time.perf_counter()
+        self.current = None
+        self.frame_start_time = None
+        self.lap_time = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.current = None
+        return self.enabled
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.frame_start_time = self.lap_time = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled or self.current is None:
+            return
+        now = time.perf_counter()
+        self._record(name, self.lap_time, now)
+        self.lap_time = now
+
+    def end_frame(self):
+        if not self.enabled or self.current is None:
+            return
+        end = time.perf_counter()
+        self.current["frame"] = (end - self.frame_start_time) * 1000.0
+        self.frames.append(self.current)
+        self._trace_event("frame", self.frame_start_time, end)
+        self.current = None
+
+    def _record(self, name, start, end):
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0.0) + (end - start) * 1000.0
+        self._trace_event(name, start, end)
+
+    def _trace_event(self, name, start, end):
+        self.trace.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                           "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+
+    def count(self, name, value):
+        """Значение счётчика (например, узлы поиска за ход) - и в оверлей, и в трассу."""
+        if not self.enabled:
+            return
+        self.counters[name] = value
+        self.trace.append({"name": name, "ph": "C", "pid": 1, "tid": 1,
+                           "ts": (time.perf_counter() - self.origin) * 1e6,
+                           "args": {name: value}})
+
+    # ----------------------------------------
+    # ВЫВОД
+    # ----------------------------------------
+    def averages(self):
+        """Среднее время каждой фазы (мс) по окну кадров."""
+        totals = {}
+        for frame in self.frames:
+            for name, ms in frame.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        n = len(self.frames) or 1
+        return {name: ms / n for name, ms in totals.items()}
+
+    def stats_lines(self):
+        avg = self.averages()
+        lines = ["%-14s %6.2f ms" % (name, ms) for name, ms in sorted(avg.items())]
+        lines += ["%-14s %9s" % (name, value) for name, value in sorted(self.counters.items())]
+        return lines
+
+    def export_chrome_trace(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": list(self.trace), "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+        return path
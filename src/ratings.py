@@ -0,0 +1,357 @@
+"""
+Именные профили игроков: рейтинг Глико, серии, личные встречи, таблица лидеров.
+
+База - SQLite в режиме WAL (ratings.db рядом с кодом): запись результата -
+одна короткая транзакция, читатели (меню, таблица лидеров) не ждут писателя.
+После каждой партии обновляются только строки двух игроков и их пары:
+    players      - рейтинг, отклонение (RD), партии, победы, серии;
+    head_to_head - счёт личных встреч пары (игрок с меньшим id - первый);
+    totals       - итоги по режимам для меню;
+    games        - история (кто, чем, исход, изменение рейтинга).
+Таблица лидеров, серии и личные встречи читаются по индексам и агрегатам,
+история для них не просматривается.
+
+Рейтинг - Глико-1, период = одна партия: ожидание как у Эло, но шаг
+тем больше, чем меньше партий у игрока (RD), а за время без игр RD растёт.
+Компьютер каждого уровня сложности - тоже профиль ("ИИ (hard)").
+Имена сравниваются без учёта регистра через str.casefold() ("Аня" и "аня" -
+один профиль): NOCASE в SQLite складывает только латиницу.
+
+    db = ratings.RatingsDB(ratings.RATINGS_FILE)
+    db.record("Аня", "ИИ (hard)", 1, mode="vs_ai")
+    for row in db.leaderboard(10):
+        print(row["name"], round(row["rating"]))
+
+    python ratings.py top
+    python ratings.py h2h Аня Боря
+    python ratings.py --synthetic 300000 top    # проверка скорости на больших данных
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RATINGS_FILE = os.path.join(HERE, "ratings.db")
+
+START_RATING = 1500.0
+START_RD = 350.0
+MIN_RD = 30.0               # не даём рейтингу "застыть" совсем
+RD_GROWTH_PER_DAY = 34.6    # RD 50 -> 350 примерно за 100 дней без игр
+
+_Q = math.log(10) / 400
+
+AI_PREFIX = "ИИ"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id             INTEGER PRIMARY KEY,
+    name           TEXT NOT NULL,   -- как записан при первой партии
+    name_key       TEXT NOT NULL,   -- name_key(name): по нему ищем и держим уникальность
+    is_ai          INTEGER NOT NULL DEFAULT 0,
+    rating         REAL NOT NULL,
+    rd             REAL NOT NULL,
+    games          INTEGER NOT NULL DEFAULT 0,
+    wins           INTEGER NOT NULL DEFAULT 0,
+    losses         INTEGER NOT NULL DEFAULT 0,
+    draws          INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    best_streak    INTEGER NOT NULL DEFAULT 0,
+    last_played    REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS players_name_key ON players (name_key);
+CREATE INDEX IF NOT EXISTS players_rating ON players (rating DESC);
+CREATE INDEX IF NOT EXISTS players_best_streak ON players (best_streak DESC);
+CREATE INDEX IF NOT EXISTS players_current_streak ON players (current_streak DESC);
+
+CREATE TABLE IF NOT EXISTS head_to_head (
+    a      INTEGER NOT NULL,
+    b      INTEGER NOT NULL,
+    a_wins INTEGER NOT NULL DEFAULT 0,
+    b_wins INTEGER NOT NULL DEFAULT 0,
+    draws  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (a, b)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS totals (
+    mode   TEXT PRIMARY KEY,
+    games  INTEGER NOT NULL DEFAULT 0,
+    x_wins INTEGER NOT NULL DEFAULT 0,
+    o_wins INTEGER NOT NULL DEFAULT 0,
+    draws  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS games (
+    id         INTEGER PRIMARY KEY,
+    played_at  REAL NOT NULL,
+    mode       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    win_length INTEGER NOT NULL,
+    x_player   INTEGER NOT NULL,
+    o_player   INTEGER NOT NULL,
+    outcome    INTEGER NOT NULL,   -- 1 - X, 2 - O, 0 - ничья
+    x_delta    REAL NOT NULL,
+    o_delta    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_x ON games (x_player, id);
+CREATE INDEX IF NOT EXISTS games_o ON games (o_player, id);
+"""
+
+
+def name_key(name):
+    """Ключ профиля: регистр не важен ни для латиницы, ни для кириллицы."""
+    return name.casefold()
+
+
+def ai_name(difficulty_name):
+    """Имя профиля компьютера для уровня сложности (ключ ai.DIFFICULTIES)."""
+    return "%s (%s)" % (AI_PREFIX, difficulty_name)
+
+
+# ----------------------------------------
+# ГЛИКО
+# ----------------------------------------
+def _g(rd):
+    return 1 / math.sqrt(1 + 3 * (_Q * rd) ** 2 / math.pi ** 2)
+
+
+def expected_score(rating, opp_rating, opp_rd=0.0):
+    """Ожидаемый результат (0..1) игрока против соперника."""
+    return 1 / (1 + 10 ** (-_g(opp_rd) * (rating - opp_rating) / 400))
+
+
+def inflate_rd(rd, days):
+    """RD после days дней без партий."""
+    return min(START_RD, math.sqrt(rd * rd + RD_GROWTH_PER_DAY ** 2 * days))
+
+
+def glicko_update(rating, rd, opp_rating, opp_rd, score):
+    """Новые (рейтинг, RD) после одной партии; score - 1, 0.5 или 0."""
+    g = _g(opp_rd)
+    e = expected_score(rating, opp_rating, opp_rd)
+    d2 = 1 / (_Q * _Q * g * g * e * (1 - e))
+    denom = 1 / (rd * rd) + 1 / d2
+    return rating + _Q / denom * g * (score - e), max(MIN_RD, math.sqrt(1 / denom))
+
+
+# ----------------------------------------
+# БАЗА
+# ----------------------------------------
+class RatingsDB:
+    """Профили и рейтинги в SQLite (WAL). record() - одна транзакция на партию."""
+
+    def __init__(self, path=RATINGS_FILE):
+        self.path = path
+        # сервер пишет из своего потока-писателя (server.py), а открывает и
+        # закрывает базу главный поток; одновременно обращается один поток
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # в WAL достаточно NORMAL: при сбое питания теряется последняя партия, но не база
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.version = 0   # растёт с каждой записью - по нему меню пересобирает строки
+
+    def close(self):
+        self.conn.close()
+
+    def _player_id(self, name, now):
+        row = self.conn.execute("SELECT id FROM players WHERE name_key = ?", (name_key(name),)).fetchone()
+        if row is not None:
+            return row[0]
+        cur = self.conn.execute(
+            "INSERT INTO players (name, name_key, is_ai, rating, rd, last_played) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, name_key(name), int(name.startswith(AI_PREFIX + " (")), START_RATING, START_RD, now))
+        return cur.lastrowid
+
+    def ensure_player(self, name):
+        """Создать профиль, если его нет; возвращает id."""
+        with self.conn:
+            return self._player_id(name, time.time())
+
+    def record(self, x_name, o_name, outcome, mode="two_players", size=3, win_length=3, now=None):
+        """Результат партии: outcome - 1 (X), 2 (O) или 'draw'. Возвращает (изменение X, изменение O)."""
+        if name_key(x_name) == name_key(o_name):
+            raise ValueError("игрок не может играть сам с собой")
+        now = time.time() if now is None else now
+        with self.conn:
+            x_id = self._player_id(x_name, now)
+            o_id = self._player_id(o_name, now)
+            rows = {r["id"]: r for r in self.conn.execute(
+                "SELECT id, rating, rd, last_played FROM players WHERE id IN (?, ?)", (x_id, o_id))}
+            rx, ro = rows[x_id], rows[o_id]
+            x_rd = inflate_rd(rx["rd"], (now - (rx["last_played"] or now)) / 86400)
+            o_rd = inflate_rd(ro["rd"], (now - (ro["last_played"] or now)) / 86400)
+            x_score = 0.5 if outcome == 'draw' else float(outcome == 1)
+            # оба обновления - от рейтингов до партии
+            x_new = glicko_update(rx["rating"], x_rd, ro["rating"], o_rd, x_score)
+            o_new = glicko_update(ro["rating"], o_rd, rx["rating"], x_rd, 1 - x_score)
+
+            for pid, (rating, rd), score in ((x_id, x_new, x_score), (o_id, o_new, 1 - x_score)):
+                if score == 1:
+                    self.conn.execute(
+                        "UPDATE players SET rating = ?, rd = ?, games = games + 1, wins = wins + 1,"
+                        " current_streak = current_streak + 1,"
+                        " best_streak = MAX(best_streak, current_streak + 1), last_played = ?"
+                        " WHERE id = ?", (rating, rd, now, pid))
+                else:
+                    # поражение и ничья обрывают серию (как в scorejournal)
+                    self.conn.execute(
+                        "UPDATE players SET rating = ?, rd = ?, games = games + 1,"
+                        " losses = losses + ?, draws = draws + ?, current_streak = 0, last_played = ?"
+                        " WHERE id = ?", (rating, rd, int(score == 0), int(score == 0.5), now, pid))
+
+            a, b = (x_id, o_id) if x_id < o_id else (o_id, x_id)
+            a_won = (outcome == 1) == (a == x_id) and outcome != 'draw'
+            self.conn.execute("INSERT OR IGNORE INTO head_to_head (a, b) VALUES (?, ?)", (a, b))
+            self.conn.execute(
+                "UPDATE head_to_head SET a_wins = a_wins + ?, b_wins = b_wins + ?, draws = draws + ?"
+                " WHERE a = ? AND b = ?",
+                (int(a_won), int(outcome != 'draw' and not a_won), int(outcome == 'draw'), a, b))
+
+            self.conn.execute("INSERT OR IGNORE INTO totals (mode) VALUES (?)", (mode,))
+            self.conn.execute(
+                "UPDATE totals SET games = games + 1, x_wins = x_wins + ?, o_wins = o_wins + ?,"
+                " draws = draws + ? WHERE mode = ?",
+                (int(outcome == 1), int(outcome == 2), int(outcome == 'draw'), mode))
+
+            deltas = (x_new[0] - rx["rating"], o_new[0] - ro["rating"])
+            self.conn.execute(
+                "INSERT INTO games (played_at, mode, size, win_length, x_player, o_player, outcome,"
+                " x_delta, o_delta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, mode, size, win_length, x_id, o_id, 0 if outcome == 'draw' else outcome) + deltas)
+        self.version += 1
+        return deltas
+
+    # ----------------------------------------
+    # ЗАПРОСЫ
+    # ----------------------------------------
+    def player(self, name):
+        return self.conn.execute("SELECT * FROM players WHERE name_key = ?", (name_key(name),)).fetchone()
+
+    def leaderboard(self, limit=10, offset=0, min_games=1, include_ai=False):
+        """Лучшие по рейтингу (индекс players_rating)."""
+        return self.conn.execute(
+            "SELECT * FROM players WHERE games >= ? AND (? OR is_ai = 0)"
+            " ORDER BY rating DESC LIMIT ? OFFSET ?",
+            (min_games, int(include_ai), limit, offset)).fetchall()
+
+    def rank(self, name):
+        """Место игрока в таблице лидеров (среди людей) или None."""
+        row = self.player(name)
+        if row is None:
+            return None
+        return 1 + self.conn.execute(
+            "SELECT COUNT(*) FROM players WHERE rating > ? AND is_ai = 0 AND games > 0",
+            (row["rating"],)).fetchone()[0]
+
+    def streak_leaders(self, limit=10, current=False):
+        """Лучшие серии побед (или текущие, current=True) - по индексу."""
+        column = "current_streak" if current else "best_streak"
+        return self.conn.execute(
+            "SELECT * FROM players WHERE is_ai = 0 ORDER BY %s DESC LIMIT ?" % column,
+            (limit,)).fetchall()
+
+    def head_to_head(self, name_a, name_b):
+        """(победы a, победы b, ничьи) в личных встречах."""
+        a, b = self.player(name_a), self.player(name_b)
+        if a is None or b is None:
+            return 0, 0, 0
+        lo, hi = sorted((a["id"], b["id"]))
+        row = self.conn.execute("SELECT a_wins, b_wins, draws FROM head_to_head WHERE a = ? AND b = ?",
+                                (lo, hi)).fetchone()
+        if row is None:
+            return 0, 0, 0
+        return (row[0], row[1], row[2]) if lo == a["id"] else (row[1], row[0], row[2])
+
+    def recent_games(self, name, limit=10):
+        """Последние партии игрока (индексы games_x / games_o)."""
+        row = self.player(name)
+        if row is None:
+            return []
+        return self.conn.execute(
+            "SELECT g.*, px.name AS x_name, po.name AS o_name FROM"
+            " (SELECT * FROM (SELECT * FROM games WHERE x_player = :p ORDER BY id DESC LIMIT :n)"
+            "  UNION ALL SELECT * FROM (SELECT * FROM games WHERE o_player = :p ORDER BY id DESC LIMIT :n)) g"
+            " JOIN players px ON px.id = g.x_player JOIN players po ON po.id = g.o_player"
+            " ORDER BY g.id DESC LIMIT :n", {"p": row["id"], "n": limit}).fetchall()
+
+    def totals(self):
+        """{режим: (партий, побед X, побед O, ничьих)}."""
+        return {r["mode"]: (r["games"], r["x_wins"], r["o_wins"], r["draws"])
+                for r in self.conn.execute("SELECT * FROM totals")}
+
+
+# ----------------------------------------
+# КОМАНДНАЯ СТРОКА
+# ----------------------------------------
+def fill_synthetic(db, games, players=500, seed=0):
+    """Случайные партии между players игроками (проверка скорости запросов)."""
+    rng = random.Random(seed)
+    names = ["Игрок %03d" % i for i in range(players)]
+    strength = {n: rng.gauss(0, 1) for n in names}
+    now = time.time() - games * 60
+    for i in range(games):
+        x, o = rng.sample(names, 2)
+        p = 1 / (1 + math.exp(strength[o] - strength[x]))
+        r = rng.random()
+        outcome = 'draw' if r < 0.2 else (1 if r < 0.2 + 0.8 * p else 2)
+        db.record(x, o, outcome, now=now + i * 60)
+
+
+def _print_players(rows):
+    for i, r in enumerate(rows, 1):
+        print("%3d. %-20s %6.0f ±%3.0f  партий %5d  +%d -%d =%d  серия %d (лучшая %d)" % (
+            i, r["name"], r["rating"], 2 * r["rd"], r["games"], r["wins"], r["losses"], r["draws"],
+            r["current_streak"], r["best_streak"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Рейтинги игроков и таблица лидеров")
+    parser.add_argument("--db", default=RATINGS_FILE)
+    parser.add_argument("--synthetic", type=int, default=0, help="сначала добавить N случайных партий")
+    sub = parser.add_subparsers(dest="command")
+    top = sub.add_parser("top", help="таблица лидеров")
+    top.add_argument("--limit", type=int, default=10)
+    top.add_argument("--ai", action="store_true", help="вместе с профилями компьютера")
+    sub.add_parser("streaks", help="лучшие серии побед")
+    player = sub.add_parser("player", help="профиль и последние партии")
+    player.add_argument("name")
+    h2h = sub.add_parser("h2h", help="личные встречи")
+    h2h.add_argument("a")
+    h2h.add_argument("b")
+    args = parser.parse_args()
+
+    db = RatingsDB(args.db)
+    if args.synthetic:
+        start = time.perf_counter()
+        fill_synthetic(db, args.synthetic)
+        print("%d партий за %.1f с" % (args.synthetic, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    if args.command == "top":
+        _print_players(db.leaderboard(args.limit, include_ai=args.ai))
+    elif args.command == "streaks":
+        _print_players(db.streak_leaders())
+    elif args.command == "player":
+        row = db.player(args.name)
+        if row is None:
+            parser.error("нет игрока %r" % args.name)
+        _print_players([row])
+        print("место:", db.rank(args.name))
+        for g in db.recent_games(args.name):
+            result = {0: "ничья", 1: "победа X", 2: "победа O"}[g["outcome"]]
+            print("  %s  %s - %s: %s" % (time.strftime("%Y-%m-%d %H:%M", time.localtime(g["played_at"])),
+                                         g["x_name"], g["o_name"], result))
+    elif args.command == "h2h":
+        a, b, d = db.head_to_head(args.a, args.b)
+        print("%s %d : %d %s (ничьих %d)" % (args.a, a, b, args.b, d))
+    if args.command:
+        print("запрос: %.2f мс" % (1000 * (time.perf_counter() - start)))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Счёт и статистика: снимок (scoreboard.json) + журнал результатов.
+
+Результат партии не переписывает весь JSON в главном потоке: он применяется
+к счёту в памяти, а на диск уходит маленькой строкой в журнал
+(scoreboard.json.journal) из фонового потока. Раз в compact_every записей
+(и при выходе) журнал сворачивается в снимок: временный файл + fsync +
+os.replace, затем журнал обнуляется. У каждой записи есть номер, а снимок
+помнит номер последней учтённой записи, поэтому сбой между заменой снимка
+и очисткой журнала не приводит к двойному учёту.
+
+При загрузке читается снимок и поверх него проигрываются записи журнала;
+оборванная последняя строка (сбой посреди записи) отбрасывается.
+"""
+import copy
+import json
+import os
+import queue
+import threading
+
+# Шаблон структуры счёта / статистики
+SCOREBOARD_TEMPLATE = {
+    "two_players": {
+        "games_played": 0,
+        "player1_wins": 0,
+        "player2_wins": 0,
+        "draws": 0,
+        "best_streak_p1": 0,
+        "best_streak_p2": 0,
+        "current_streak_p1": 0,
+        "current_streak_p2": 0
+    },
+    "vs_ai": {
+        "games_played": 0,
+        "human_wins": 0,
+        "computer_wins": 0,
+        "draws": 0,
+        "best_streak_human": 0,
+        "best_streak_comp": 0,
+        "current_streak_human": 0,
+        "current_streak_comp": 0
+    }
+}
+
+SEQ_KEY = "journal_seq"  # номер последней записи журнала, учтённой в снимке
+
+
+def apply_result(scoreboard, mode, winner_side):
+    """Обновляем винстрики и общее кол-во игр, побед, ничьих."""
+    # mode: "two_players" или "vs_ai"
+    # winner_side: 1, 2, 'draw', 'human', 'computer' (зависит от режима)
+    data = scoreboard[mode]
+    data["games_played"] += 1
+
+    if mode == "two_players":
+        # winner_side = 1, 2 или 'draw'
+        if winner_side == 1:
+            data["player1_wins"] += 1
+            data["current_streak_p1"] += 1
+            data["current_streak_p2"] = 0
+            if data["current_streak_p1"] > data["best_streak_p1"]:
+                data["best_streak_p1"] = data["current_streak_p1"]
+        elif winner_side == 2:
+            data["player2_wins"] += 1
+            data["current_streak_p2"] += 1
+            data["current_streak_p1"] = 0
+            if data["current_streak_p2"] > data["best_streak_p2"]:
+                data["best_streak_p2"] = data["current_streak_p2"]
+        elif winner_side == 'draw':
+            data["draws"] += 1
+            # ничья обнуляет обе серии
+            data["current_streak_p1"] = 0
+            data["current_streak_p2"] = 0
+
+    else:
+        # vs_ai
+        # winner_side = 'human', 'computer' или 'draw'
+        if winner_side == 'human':
+            data["human_wins"] += 1
+            data["current_streak_human"] += 1
+            data["current_streak_comp"] = 0
+            if data["current_streak_human"] > data["best_streak_human"]:
+                data["best_streak_human"] = data["current_streak_human"]
+        elif winner_side == 'computer':
+            data["computer_wins"] += 1
+            data["current_streak_comp"] += 1
+            data["current_streak_human"] = 0
+            if data["current_streak_comp"] > data["best_streak_comp"]:
+                data["best_streak_comp"] = data["current_streak_comp"]
+        elif winner_side == 'draw':
+            data["draws"] += 1
+            # ничья обнуляет обе серии
+            data["current_streak_human"] = 0
+            data["current_streak_comp"] = 0
+
+
+_STOP = object()
+
+
+class ScoreboardStore:
+    """
+    self.data - актуальный счёт в памяти (его читает меню).
+    record() применяет результат сразу, а запись на диск делает фоновый поток.
+    """
+
+    def __init__(self, path, compact_every=50):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+
+        self.data, self.seq, replayed = self._load()
+        # копия счёта, соответствующая тому, что уже лежит на диске (только для потока записи)
+        self._disk_data = copy.deepcopy(self.data)
+        self._disk_seq = self.seq
+        self._uncompacted = replayed
+
+        self._queue = queue.Queue()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._writer, name="scoreboard-writer", daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------
+    # ЗАГРУЗКА
+    # ----------------------------------------
+    def _load(self):
+        data = copy.deepcopy(SCOREBOARD_TEMPLATE)
+        seq = 0
+        replayed = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                seq = data.pop(SEQ_KEY, 0)
+            except (OSError, ValueError):
+                # не затираем испорченный файл молча - откладываем его в сторону
+                print("Ошибка чтения scoreboard.json. Используем счёт по умолчанию.")
+                try:
+                    os.replace(self.path, self.path + ".corrupt")
+                except OSError:
+                    pass
+                data = copy.deepcopy(SCOREBOARD_TEMPLATE)
+
+        if os.path.exists(self.journal_path):
+            good = 0  # длина целой части журнала в байтах
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # оборванная запись в конце журнала
+                    good += len(line)
+                    if rec["seq"] > seq:
+                        apply_result(data, rec["mode"], rec["winner"])
+                        seq = rec["seq"]
+                        replayed += 1
+            if good < os.path.getsize(self.journal_path):
+                # отрезаем хвост, чтобы новые записи не склеились с ним
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+        return data, seq, replayed
+
+    # ----------------------------------------
+    # ЗАПИСЬ
+    # ----------------------------------------
+    def record(self, mode, winner_side):
+        """Учесть результат партии; на диск он попадёт из фонового потока."""
+        apply_result(self.data, mode, winner_side)
+        self.seq += 1
+        self._queue.put((self.seq, mode, winner_side))
+
+    def flush(self):
+        """Дождаться, пока все записи окажутся в журнале."""
+        self._queue.join()
+
+    def close(self):
+        """Записать всё, свернуть журнал в снимок и остановить поток."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    self._compact()
+                    self._journal.close()
+                    return
+                seq, mode, winner_side = item
+                self._journal.write(json.dumps({"seq": seq, "mode": mode, "winner": winner_side}) + "\n")
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                apply_result(self._disk_data, mode, winner_side)
+                self._disk_seq = seq
+                self._uncompacted += 1
+                if self._uncompacted >= self.compact_every:
+                    self._compact()
+            finally:
+                self._queue.task_done()
+
+    def _compact(self):
+        """Снимок = всё, что в журнале; атомарно заменяем файл и обнуляем журнал."""
+        if not self._uncompacted and os.path.exists(self.path):
+            return
+        snapshot = dict(self._disk_data)
+        snapshot[SEQ_KEY] = self._disk_seq
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._uncompacted = 0
@@ -0,0 +1,307 @@
+"""
+Alpha-beta поиск с итеративным углублением для поля N x N.
+
+Поиск идёт от стороны, чей ход (negamax), с эвристической оценкой позиции
+на листьях, упорядочиванием ходов по killer- и history-эвристикам, таблицей
+транспозиций и жёстким лимитом времени на ход: по истечении времени
+возвращается лучший ход, найденный к этому моменту.
+
+Поиск написан генераторами: он регулярно отдаёт управление (yield), поэтому
+его можно выполнять порциями по несколько миллисекунд за кадр (SearchTask)
+или до конца за один вызов (run_to_completion).
+"""
+import time
+
+import engine
+import transposition
+
+WIN_SCORE = 1000000
+MATE_BOUND = WIN_SCORE - 10000  # всё, что выше, - форсированный выигрыш
+
+AI_MOVE_TIME_MS = 1000  # лимит времени на ход по умолчанию
+YIELD_EVERY = 8         # узлов между точками возврата управления (степень двойки)
+
+
+class SearchTimeout(Exception):
+    """Время на ход истекло - прерываем текущую итерацию."""
+
+
+def run_to_completion(steps):
+    """Прогнать генератор поиска до конца и вернуть его результат."""
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+class SearchTask:
+    """
+    Поиск, выполняемый порциями: step() крутит генератор не дольше slice_ms
+    и возвращает True, когда результат готов (он в self.result).
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.done = False
+        self.result = None
+
+    def step(self, slice_ms):
+        if self.done:
+            return True
+        end = time.perf_counter() + slice_ms / 1000.0
+        try:
+            while time.perf_counter() < end:
+                next(self.steps)
+        except StopIteration as stop:
+            self.done = True
+            self.result = stop.value
+        return self.done
+
+    def cancel(self):
+        """Немедленно остановить поиск."""
+        self.steps.close()
+        self.done = True
+        self.result = None
+
+
+def iter_bits(mask):
+    """Номера установленных битов маски по возрастанию."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AlphaBetaSearch:
+    """
+    Движок поиска для заданных правил (engine.Rules).
+
+    После best_move() доступны last_score (с точки зрения ходящего),
+    last_depth (глубина последней завершённой итерации), nodes и cutoffs.
+    book - дебютная книга и эндшпильная база (book.Book): ход в позиции из
+    книги возвращается сразу, а позиции, где свободно не больше
+    book.max_empty клеток, внутри перебора берутся из базы.
+    """
+
+    def __init__(self, rules, tt=None, move_radius=None, book=None):
+        self.rules = rules
+        self.tt = tt if tt is not None else transposition.TranspositionTable()
+        self.book = book
+        self.symmetry = transposition.BoardSymmetry(rules.size)
+
+        # На больших полях рассматриваем только клетки рядом с камнями
+        if move_radius is None and rules.size > 4:
+            move_radius = 2 if rules.size < 10 else 1
+        self.move_radius = move_radius
+
+        n = rules.size
+        self.center_bit = rules.cell_bit(n // 2, n // 2)
+
+        # Вес незаблокированной линии с k камнями одной стороны
+        self.line_weights = [0] + [10 ** k for k in range(1, rules.win_length)] + [WIN_SCORE]
+
+        self.history = [0] * rules.cells
+        self.killers = []
+        self.deadline = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.last_score = 0
+        self.last_depth = 0
+        self.root_best = None
+
+    # ----------------------------------------
+    # ОЦЕНКА И ГЕНЕРАЦИЯ ХОДОВ
+    # ----------------------------------------
+    def evaluate(self, me, opp):
+        """Эвристика: сумма весов линий, где есть камни только одной стороны."""
+        score = 0
+        weights = self.line_weights
+        popcount = engine.popcount
+        for m in self.rules.win_masks:
+            a = me & m
+            b = opp & m
+            if a:
+                if not b:
+                    score += weights[popcount(a)]
+            elif b:
+                score -= weights[popcount(b)]
+        return score
+
+    def candidate_mask(self, occupied):
+        """Маска свободных клеток, которые имеет смысл рассматривать."""
+        free = self.rules.full_mask & ~occupied
+        if self.move_radius is None:
+            return free
+        if not occupied:
+            return self.center_bit
+        return self.rules.neighbours(occupied, self.move_radius) & free
+
+    def ordered_moves(self, occupied, ply):
+        moves = sorted(iter_bits(self.candidate_mask(occupied)),
+                       key=self.history.__getitem__, reverse=True)
+        if ply < len(self.killers):
+            for k in reversed(self.killers[ply]):
+                if k in moves:
+                    moves.remove(k)
+                    moves.insert(0, k)
+        return moves
+
+    def _store_killer(self, ply, idx):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        slot = self.killers[ply]
+        if idx not in slot:
+            slot.insert(0, idx)
+            del slot[2:]
+
+    # ----------------------------------------
+    # ПОИСК
+    # ----------------------------------------
+    def negamax(self, me, opp, depth, alpha, beta, ply, me_lines, opp_lines):
+        """
+        Генератор; значение позиции - в StopIteration (score = yield from ...).
+        me_lines/opp_lines - упакованные счётчики линий сторон (engine.Rules.line_counts).
+        """
+        self.nodes += 1
+        if self.nodes & (YIELD_EVERY - 1) == 0:
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+            yield
+
+        rules = self.rules
+        occupied = me | opp
+        if occupied == rules.full_mask:
+            return 0
+        if depth == 0:
+            return self.evaluate(me, opp)
+
+        key = self.symmetry.canonical(me, opp)
+        if self.book is not None and rules.cells - engine.popcount(occupied) <= self.book.max_empty:
+            known = self.book.probe_exact(key)
+            if known is not None:
+                value, plies = known
+                return value * (WIN_SCORE - ply - plies) if value else 0
+        entry = self.tt.probe(key, depth)
+        if entry is not None:
+            value, flag = entry
+            value = _from_tt(value, ply)
+            if flag == transposition.EXACT:
+                return value
+            if flag == transposition.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+        alpha_orig = alpha
+
+        best = -WIN_SCORE - 1
+        cell_bits = rules.cell_bits
+        incs = rules.cell_line_incs
+        full = rules.line_full_bits
+        for idx in self.ordered_moves(occupied, ply):
+            new_lines = me_lines + incs[idx]
+            if new_lines & full:
+                score = WIN_SCORE - ply - 1
+            else:
+                score = -(yield from self.negamax(opp, me | cell_bits[idx], depth - 1, -beta, -alpha,
+                                                  ply + 1, opp_lines, new_lines))
+            if score > best:
+                best = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.cutoffs += 1
+                self._store_killer(ply, idx)
+                self.history[idx] += depth * depth
+                break
+
+        if best <= alpha_orig:
+            flag = transposition.UPPER
+        elif best >= beta:
+            flag = transposition.LOWER
+        else:
+            flag = transposition.EXACT
+        self.tt.store(key, _to_tt(best, ply), flag, depth)
+        return best
+
+    def _search_root(self, me, opp, moves, depth):
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        rules = self.rules
+        me_lines = rules.line_counts(me)
+        opp_lines = rules.line_counts(opp)
+        self.root_best = None
+        for idx in moves:
+            new_lines = me_lines + rules.cell_line_incs[idx]
+            if new_lines & rules.line_full_bits:
+                score = WIN_SCORE - 1
+            else:
+                score = -(yield from self.negamax(opp, me | rules.cell_bits[idx], depth - 1,
+                                                  -beta, -alpha, 1, opp_lines, new_lines))
+            if score > alpha:
+                alpha = score
+                self.root_best = (idx, score)
+        return self.root_best
+
+    def best_move(self, me, opp, time_limit_ms=AI_MOVE_TIME_MS, max_depth=None):
+        """
+        Лучший ход (row, col) для стороны с камнями me или None, если ходить некуда.
+        Итерации углубляются, пока не кончится время, не будет достигнут
+        max_depth или не найден форсированный результат.
+        """
+        return run_to_completion(self.iter_best_move(me, opp, time_limit_ms, max_depth))
+
+    def iter_best_move(self, me, opp, time_limit_ms=AI_MOVE_TIME_MS, max_depth=None):
+        """То же, что best_move(), но генератором - для выполнения порциями."""
+        self.deadline = time.perf_counter() + time_limit_ms / 1000.0
+        self.nodes = 0
+        self.cutoffs = 0
+        if self.book is not None:
+            move = self.book.best_move(me, opp)
+            if move is not None:
+                self.last_score = self.last_depth = 0
+                return move
+        occupied = me | opp
+        moves = self.ordered_moves(occupied, 0)
+        if not moves:
+            return None
+
+        empties = self.rules.cells - engine.popcount(occupied)
+        if max_depth is None or max_depth > empties:
+            max_depth = empties
+        best_idx = moves[0]
+        self.last_score = 0
+        self.last_depth = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                idx, score = yield from self._search_root(me, opp, moves, depth)
+            except SearchTimeout:
+                # недосчитанная итерация: её лучший ход уже не хуже прежнего,
+                # т.к. прежний лучший ход стоит первым и был досчитан
+                if self.root_best is not None:
+                    best_idx, self.last_score = self.root_best
+                break
+            best_idx, self.last_score, self.last_depth = idx, score, depth
+            moves.remove(idx)
+            moves.insert(0, idx)
+            if abs(score) > MATE_BOUND or time.perf_counter() > self.deadline:
+                break
+        return self.rules.cell_coords[best_idx]
+
+
+def _to_tt(value, ply):
+    """Счёт выигрыша храним относительно узла, а не корня."""
+    if value > MATE_BOUND:
+        return value + ply
+    if value < -MATE_BOUND:
+        return value - ply
+    return value
+
+
+def _from_tt(value, ply):
+    if value > MATE_BOUND:
+        return value - ply
+    if value < -MATE_BOUND:
+        return value + ply
+    return value
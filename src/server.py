@@ -0,0 +1,332 @@
+"""
+Безоконный игровой сервер на asyncio: много партий в одном процессе.
+
+Каждая партия - отдельный объект Session со своим engine.GameState, поэтому сервер
+держит тысячи одновременных партий "двое игроков" и "против компьютера".
+Протокол - строки JSON по TCP (одна команда - одна строка, ответ - тоже):
+
+    {"op": "new", "mode": "vs_ai", "side": 1, "difficulty": "hard", "size": 3, "win": 3}
+                                            - size от 3 до 15, win от 1 до size
+    {"op": "join", "session": 7}            - второй игрок в партию двоих
+    "name": "Аня" в new / join              - профиль игрока для рейтингов (--ratings)
+    {"op": "move", "row": 1, "col": 1}
+    {"op": "state"} / {"op": "restart"} / {"op": "quit"}
+
+Ответ: {"ok": true, "session": id, "state": {...}} или {"ok": false, "error": "..."}.
+Игроку, ожидающему своего хода в партии двоих, состояние приходит само
+({"event": "state", ...}), когда соперник сходит.
+
+Ход компьютера на 3x3 - поиск по общей решённой таблице (solver.py),
+это микросекунды прямо в цикле событий. На больших полях поиск уходит
+в пул процессов (у каждого процесса свой AlphaBetaSearch с таблицей
+транспозиций на все партии этого размера), так что долгий поиск одной
+партии не задерживает остальные.
+
+С --ratings законченные партии именных игроков (против ИИ - против профиля
+уровня сложности) записываются в рейтинги (ratings.py) отдельным потоком:
+commit SQLite не задерживает цикл событий.
+
+    python server.py --port 8765 --workers 4 --ratings ratings.db
+Нагрузочный клиент - loadgen.py.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
+import random
+
+import ai
+import book
+import engine
+import ratings
+import search
+import solver
+
+DEFAULT_PORT = 8765
+MAX_LINE = 64 * 1024
+MIN_SIZE, MAX_SIZE = 3, 15   # Rules строится в цикле событий и кэшируется навсегда - размер ограничен
+
+_rules_cache = {}
+_searchers = {}  # в процессах пула: (size, win_length) -> AlphaBetaSearch
+
+
+def get_rules(size, win_length):
+    """Одни и те же Rules на все партии одного размера."""
+    key = (size, win_length)
+    rules = _rules_cache.get(key)
+    if rules is None:
+        rules = _rules_cache[key] = engine.Rules(size, win_length)
+    return rules
+
+
+def _ai_move_job(size, win_length, x_bits, o_bits, side, difficulty, time_limit_ms, seed):
+    """Ход компьютера в процессе пула (поле больше 3x3)."""
+    rules = get_rules(size, win_length)
+    searcher = _searchers.get((size, win_length))
+    if searcher is None:
+        searcher = _searchers[(size, win_length)] = search.AlphaBetaSearch(
+            rules, book=book.get_book(rules))
+    return ai.choose_move(rules, searcher, x_bits, o_bits, side, difficulty,
+                          time_limit_ms, random.Random(seed))
+
+
+class GameError(Exception):
+    """Неверная команда клиента - уходит ему в ответе как error."""
+
+
+class Session:
+    """Одна партия: поле, чей ход, исход и подключённые игроки."""
+
+    def __init__(self, session_id, mode, size=3, win_length=None, human_side=1,
+                 difficulty="impossible"):
+        if mode not in ("two_players", "vs_ai"):
+            raise GameError("неизвестный режим: %r" % (mode,))
+        if difficulty not in ai.DIFFICULTIES:
+            raise GameError("неизвестная сложность: %r" % (difficulty,))
+        if human_side not in (1, 2):
+            raise GameError("side должен быть 1 или 2")
+        win_length = win_length or size
+        if not MIN_SIZE <= size <= MAX_SIZE:
+            raise GameError("size должен быть от %d до %d" % (MIN_SIZE, MAX_SIZE))
+        if not 1 <= win_length <= size:
+            raise GameError("win должен быть от 1 до size")
+        self.rules = get_rules(size, win_length)
+        self.id = session_id
+        self.mode = mode
+        self.human_side = human_side
+        self.difficulty = difficulty
+        self.rng = random.Random()
+        self.lock = asyncio.Lock()
+        self.players = {}  # сторона -> writer подключения
+        self.names = {}    # сторона -> профиль игрока (для рейтингов)
+        self.recorded = False
+        self.state = engine.GameState(self.rules)
+
+    def restart(self):
+        self.state.reset()
+        self.recorded = False
+
+    @property
+    def comp_side(self):
+        return 2 if self.human_side == 1 else 1
+
+    def ai_to_move(self):
+        state = self.state
+        return self.mode == "vs_ai" and state.winner is None and state.player == self.comp_side
+
+    def place(self, row, col, side):
+        state = self.state
+        if state.winner is not None:
+            raise GameError("партия окончена")
+        if side != state.player:
+            raise GameError("сейчас не ваш ход")
+        if not (0 <= row < self.rules.size and 0 <= col < self.rules.size):
+            raise GameError("клетка вне поля")
+        index = row * self.rules.size + col
+        if not state.is_free(index):
+            raise GameError("клетка занята")
+        state.play(index)
+
+    def to_json(self):
+        state = self.state
+        return {"size": self.rules.size, "win": self.rules.win_length, "mode": self.mode,
+                "x": state.x, "o": state.o, "moves": state.moves,
+                "current_player": state.player, "game_over": state.winner is not None,
+                "winner": state.winner, "win_info": state.win_info}
+
+
+class GameServer:
+    def __init__(self, workers=None, time_limit_ms=search.AI_MOVE_TIME_MS, ratings_db=None):
+        self.sessions = {}
+        self.ratings_db = ratings_db
+        self.ratings_writer = None  # один поток - записи в базу по очереди
+        self.ids = itertools.count(1)
+        self.time_limit_ms = time_limit_ms
+        self.workers = workers
+        self.pool = None
+        self.moves = 0
+        solver.get_table()  # решённая таблица 3x3 - одна на все партии
+
+    # ----------------------------------------
+    # ХОД КОМПЬЮТЕРА
+    # ----------------------------------------
+    async def ai_move(self, session):
+        rules = session.rules
+        x, o = session.state.x, session.state.o
+        if ai.is_classic(rules):
+            move = ai.choose_move(rules, None, x, o, session.comp_side,
+                                  ai.DIFFICULTIES[session.difficulty], rng=session.rng)
+        else:
+            if self.pool is None:
+                self.pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _ai_move_job, rules.size, rules.win_length, x, o, session.comp_side,
+                ai.DIFFICULTIES[session.difficulty], self.time_limit_ms, session.rng.random())
+        session.place(move[0], move[1], session.comp_side)
+        self.moves += 1
+
+    async def record_result(self, session):
+        """Законченная партия двух именных профилей - в рейтинги (один раз)."""
+        state = session.state
+        if self.ratings_db is None or state.winner is None or session.recorded:
+            return
+        session.recorded = True
+        names = dict(session.names)
+        if session.mode == "vs_ai":
+            names[session.comp_side] = ratings.ai_name(session.difficulty)
+        if names.get(1) and names.get(2) and ratings.name_key(names[1]) != ratings.name_key(names[2]):
+            if self.ratings_writer is None:
+                self.ratings_writer = concurrent.futures.ThreadPoolExecutor(1)
+            await asyncio.get_running_loop().run_in_executor(
+                self.ratings_writer, functools.partial(
+                    self.ratings_db.record, names[1], names[2], state.winner, session.mode,
+                    session.rules.size, session.rules.win_length))
+
+    # ----------------------------------------
+    # КОМАНДЫ
+    # ----------------------------------------
+    async def handle(self, conn, msg):
+        op = msg.get("op")
+        if op == "new":
+            session = Session(next(self.ids), msg.get("mode", "vs_ai"), int(msg.get("size", 3)),
+                              int(msg.get("win") or 0), int(msg.get("side", 1)),
+                              msg.get("difficulty", "impossible"))
+            self.sessions[session.id] = session
+            self.leave(conn)
+            conn["session"] = session
+            conn["side"] = session.human_side
+            session.players[session.human_side] = conn["writer"]
+            if msg.get("name"):
+                session.names[session.human_side] = str(msg["name"])
+            if session.ai_to_move():
+                async with session.lock:
+                    await self.ai_move(session)
+            return session
+
+        if op == "join":
+            session = self.sessions.get(msg.get("session"))
+            if session is None or session.mode != "two_players":
+                raise GameError("нет такой партии двоих")
+            free = [side for side in (1, 2) if side not in session.players]
+            if not free:
+                raise GameError("в партии уже два игрока")
+            self.leave(conn)
+            conn["session"] = session
+            conn["side"] = free[0]
+            session.players[free[0]] = conn["writer"]
+            if msg.get("name"):
+                session.names[free[0]] = str(msg["name"])
+            return session
+
+        session = conn.get("session")
+        if session is None:
+            raise GameError("сначала создайте партию (op=new)")
+
+        if op == "move":
+            async with session.lock:
+                if session.mode == "vs_ai":
+                    side = session.human_side
+                elif len(session.players) < 2:
+                    side = session.state.player  # оба игрока за одним подключением
+                else:
+                    side = conn["side"]
+                session.place(int(msg["row"]), int(msg["col"]), side)
+                self.moves += 1
+                if session.ai_to_move():
+                    await self.ai_move(session)
+                await self.record_result(session)
+            await self.notify(session, conn["writer"])
+        elif op == "restart":
+            async with session.lock:
+                session.restart()
+                if session.ai_to_move():
+                    await self.ai_move(session)
+            await self.notify(session, conn["writer"])
+        elif op != "state":
+            raise GameError("неизвестная команда: %r" % (op,))
+        return session
+
+    async def notify(self, session, origin):
+        """Отправить новое состояние остальным игрокам партии."""
+        line = (json.dumps({"event": "state", "session": session.id,
+                            "state": session.to_json()}) + "\n").encode("utf-8")
+        for writer in session.players.values():
+            if writer is not origin:
+                writer.write(line)
+
+    def leave(self, conn):
+        session = conn.pop("session", None)
+        if session is None:
+            return
+        session.players.pop(conn.get("side"), None)
+        if not session.players:
+            del self.sessions[session.id]
+
+    async def client(self, reader, writer):
+        conn = {"writer": writer}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # строка длиннее MAX_LINE: где начинается следующая команда - неизвестно
+                    reply = {"ok": False, "error": "строка длиннее %d байт" % MAX_LINE}
+                    writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                    if msg.get("op") == "quit":
+                        break
+                    session = await self.handle(conn, msg)
+                    reply = {"ok": True, "session": session.id, "state": session.to_json()}
+                except (GameError, ValueError, KeyError, TypeError, AttributeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self.leave(conn)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.client, host, port, limit=MAX_LINE)
+        print("Сервер слушает %s:%d" % (host, port))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+            if self.ratings_writer is not None:
+                self.ratings_writer.shutdown()  # дописать рейтинги до закрытия базы
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Безоконный сервер партий (JSON по TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="процессов для поиска хода на больших полях")
+    parser.add_argument("--time-ms", type=int, default=search.AI_MOVE_TIME_MS,
+                        help="лимит поиска на ход (не 3x3)")
+    parser.add_argument("--ratings", help="база рейтингов (ratings.py) для именных игроков")
+    args = parser.parse_args()
+    ratings_db = ratings.RatingsDB(args.ratings) if args.ratings else None
+    try:
+        asyncio.run(GameServer(args.workers, args.time_ms, ratings_db).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ratings_db is not None:
+            ratings_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Безоконная пакетная симуляция партий для подбора уровней сложности.
+
+Компьютер каждого уровня играет за X и за O против случайного игрока
+(или против другого уровня) с той же логикой выбора хода, что и в игре (ai.py).
+Партии раскладываются на пул процессов порциями; у каждой порции своё зерно
+генератора (seed, номер порции), поэтому результаты воспроизводимы при любом
+числе процессов.
+
+Пример:
+    python simulate.py --games 1000000 --opponent random
+    python simulate.py --games 20000 --opponent impossible --workers 8 --json sim.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import ai
+import book
+import engine
+import search
+import solver
+
+CHUNK_GAMES = 5000  # партий в одной порции (задании для процесса)
+
+
+def play_game(rules, searcher, difficulties, rng, time_limit_ms):
+    """Одна партия; difficulties[side] - сложность стороны 1 (X) и 2 (O). Возвращает 1, 2 или 'draw'."""
+    bits = [0, 0, 0]
+    side = 1
+    while True:
+        move = ai.choose_move(rules, searcher, bits[1], bits[2], side,
+                              difficulties[side], time_limit_ms, rng)
+        r, c = move
+        bits[side] |= rules.cell_bit(r, c)
+        if rules.wins_with(bits[side], r * rules.size + c):
+            return side
+        if bits[1] | bits[2] == rules.full_mask:
+            return 'draw'
+        side = 3 - side
+
+
+def _run_chunk(task):
+    """Задание для процесса: (size, win_length, time_ms, seed, chunk, level, side, opponent, games)."""
+    size, win_length, time_limit_ms, seed, chunk, level, side, opponent, games = task
+    rules = engine.Rules(size, win_length)
+    searcher = None if ai.is_classic(rules) else search.AlphaBetaSearch(
+        rules, book=book.get_book(rules))
+    rng = random.Random(seed * 1000003 + chunk)
+
+    difficulties = [None, None, None]
+    difficulties[side] = ai.DIFFICULTIES[level]
+    difficulties[3 - side] = 0.0 if opponent == "random" else ai.DIFFICULTIES[opponent]
+
+    wins = draws = losses = 0
+    for _ in range(games):
+        res = play_game(rules, searcher, difficulties, rng, time_limit_ms)
+        if res == 'draw':
+            draws += 1
+        elif res == side:
+            wins += 1
+        else:
+            losses += 1
+    return level, side, wins, draws, losses
+
+
+def simulate(games, levels=tuple(ai.DIFFICULTIES), opponent="random", size=3, win_length=3,
+             time_limit_ms=50, workers=None, seed=0):
+    """
+    Сыграть games партий для каждой пары (уровень, сторона).
+    Возвращает {(level, side): {"wins", "draws", "losses"}}.
+    """
+    if size == 3 and win_length == 3:
+        solver.get_table()  # таблица строится один раз, процессы её читают из файла
+
+    tasks = []
+    chunk = 0
+    for level in levels:
+        for side in (1, 2):
+            left = games
+            while left > 0:
+                n = min(CHUNK_GAMES, left)
+                tasks.append((size, win_length, time_limit_ms, seed, chunk, level, side, opponent, n))
+                chunk += 1
+                left -= n
+
+    results = {(level, side): {"wins": 0, "draws": 0, "losses": 0}
+               for level in levels for side in (1, 2)}
+    with multiprocessing.Pool(workers) as pool:
+        for level, side, w, d, l in pool.imap_unordered(_run_chunk, tasks):
+            r = results[(level, side)]
+            r["wins"] += w
+            r["draws"] += d
+            r["losses"] += l
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Безоконная симуляция партий против ИИ")
+    parser.add_argument("--games", type=int, default=100000, help="партий на уровень и сторону")
+    parser.add_argument("--levels", nargs="+", default=list(ai.DIFFICULTIES),
+                        choices=list(ai.DIFFICULTIES))
+    parser.add_argument("--opponent", default="random",
+                        choices=["random"] + list(ai.DIFFICULTIES))
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win", type=int, default=None, help="длина линии (по умолчанию = size)")
+    parser.add_argument("--time-ms", type=int, default=50, help="лимит поиска на ход (не 3x3)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+    win_length = args.win or args.size
+
+    start = time.perf_counter()
+    results = simulate(args.games, args.levels, args.opponent, args.size, win_length,
+                       args.time_ms, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+
+    total = args.games * len(results)
+    print("%d партий за %.1f с (%.0f партий/с, процессов: %d)"
+          % (total, elapsed, total / elapsed, args.workers))
+    print("%-12s %-4s %8s %8s %8s" % ("уровень", "за", "побед", "ничьих", "поражений"))
+    rows = []
+    for (level, side), r in results.items():
+        n = r["wins"] + r["draws"] + r["losses"]
+        row = {"level": level, "side": "X" if side == 1 else "O", "games": n,
+               "win_rate": r["wins"] / n, "draw_rate": r["draws"] / n, "loss_rate": r["losses"] / n}
+        rows.append(row)
+        print("%-12s %-4s %7.2f%% %7.2f%% %7.2f%%" % (level, row["side"], 100 * row["win_rate"],
+                                                    100 * row["draw_rate"], 100 * row["loss_rate"]))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"opponent": args.opponent, "size": args.size, "win_length": win_length,
+                       "seed": args.seed, "elapsed_s": elapsed, "results": rows},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Полностью решённая таблица позиций 3x3.
+
+Дерево игры перебирается один раз: для каждой достижимой позиции храним
+результат при идеальной игре (с точки зрения того, чей ход), число полуходов
+до конца партии и маску лучших ходов. Таблица индексируется троичным кодом
+позиции (3^9 = 19683 записей), строится при первом обращении или читается
+из компактного файла solved_3x3.bin - ход компьютера становится поиском по массиву.
+"""
+import os
+import sys
+from array import array
+
+import engine
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved_3x3.bin")
+MAGIC = b"TTT1"
+POSITIONS = 3 ** engine.CELLS
+
+UNKNOWN = -2  # значение для недостижимых позиций
+
+# Троичный "вес" маски: сумма 3^i по установленным битам.
+# Код позиции = вес(X) + 2 * вес(O), т.е. клетка i даёт 0/1/2 в i-м разряде.
+_TERNARY = [sum(3 ** i for i in range(engine.CELLS) if b >> i & 1)
+            for b in range(1 << engine.CELLS)]
+
+
+def position_key(x_bits, o_bits):
+    """Троичный код позиции - индекс в таблице."""
+    return _TERNARY[x_bits] + 2 * _TERNARY[o_bits]
+
+
+def x_to_move(x_bits, o_bits):
+    """X ходит, если камней поровну."""
+    return engine.popcount(x_bits) == engine.popcount(o_bits)
+
+
+class SolvedTable:
+    """
+    values[key] - +1 / 0 / -1 для стороны, чей ход (UNKNOWN - недостижима),
+    plies[key]  - полуходов до конца при идеальной игре,
+    moves[key]  - битовая маска всех лучших ходов.
+    """
+
+    def __init__(self, values, plies, moves):
+        self.values = values
+        self.plies = plies
+        self.moves = moves
+
+    def lookup(self, x_bits, o_bits):
+        """(value, plies, moves_mask) или None для недостижимой позиции."""
+        key = position_key(x_bits, o_bits)
+        value = self.values[key]
+        if value == UNKNOWN:
+            return None
+        return value, self.plies[key], self.moves[key]
+
+    def best_moves(self, x_bits, o_bits):
+        """Все лучшие ходы (row, col) в порядке обхода поля."""
+        entry = self.lookup(x_bits, o_bits)
+        if entry is None:
+            return []
+        mask = entry[2]
+        return [engine.CELL_COORDS[i] for i in range(engine.CELLS) if mask >> i & 1]
+
+    def best_move(self, x_bits, o_bits):
+        """Первый лучший ход (как у перебора get_best_move) или None."""
+        entry = self.lookup(x_bits, o_bits)
+        if entry is None or not entry[2]:
+            return None
+        mask = entry[2]
+        return engine.CELL_COORDS[(mask & -mask).bit_length() - 1]
+
+    # ----------------------------------------
+    # ФАЙЛ
+    # ----------------------------------------
+    def save(self, path=TABLE_FILE):
+        moves = array("H", self.moves)
+        if sys.byteorder != "little":
+            moves.byteswap()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(self.values.tobytes())
+            f.write(self.plies.tobytes())
+            f.write(moves.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=TABLE_FILE):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != MAGIC or len(data) != 4 + POSITIONS * 4:
+            raise ValueError("повреждённый файл таблицы: %s" % path)
+        pos = 4
+        values = array("b")
+        values.frombytes(data[pos:pos + POSITIONS])
+        pos += POSITIONS
+        plies = array("B")
+        plies.frombytes(data[pos:pos + POSITIONS])
+        pos += POSITIONS
+        moves = array("H")
+        moves.frombytes(data[pos:])
+        if sys.byteorder != "little":
+            moves.byteswap()
+        return cls(values, plies, moves)
+
+
+# ----------------------------------------
+# ПОСТРОЕНИЕ
+# ----------------------------------------
+def build():
+    """Перебираем всё дерево игры от пустого поля."""
+    values = array("b", [UNKNOWN]) * POSITIONS
+    plies = array("B", [0]) * POSITIONS
+    moves = array("H", [0]) * POSITIONS
+
+    def solve(x_bits, o_bits):
+        key = position_key(x_bits, o_bits)
+        if values[key] != UNKNOWN:
+            return values[key], plies[key]
+
+        x_turn = x_to_move(x_bits, o_bits)
+        last = o_bits if x_turn else x_bits
+        occupied = x_bits | o_bits
+        if engine.is_win(last):
+            best, depth, mask = -1, 0, 0
+        elif occupied == engine.FULL_MASK:
+            best, depth, mask = 0, 0, 0
+        else:
+            best, depth, mask = -2, 0, 0
+            for bit in engine.CELL_BITS:
+                if occupied & bit:
+                    continue
+                if x_turn:
+                    v, d = solve(x_bits | bit, o_bits)
+                else:
+                    v, d = solve(x_bits, o_bits | bit)
+                v, d = -v, d + 1
+                if v > best:
+                    best, depth, mask = v, d, bit
+                elif v == best:
+                    mask |= bit
+                    # выигрывающий спешит, проигрывающий тянет время
+                    depth = min(depth, d) if v > 0 else max(depth, d)
+
+        values[key] = best
+        plies[key] = depth
+        moves[key] = mask
+        return best, depth
+
+    solve(0, 0)
+    return SolvedTable(values, plies, moves)
+
+
+_table = None
+
+
+def get_table():
+    """Таблица загружается из файла или строится при первом обращении."""
+    global _table
+    if _table is None:
+        try:
+            _table = SolvedTable.load()
+        except (OSError, ValueError):
+            _table = build()
+            try:
+                _table.save()
+            except OSError:
+                pass  # каталог только для чтения - живём с таблицей в памяти
+    return _table
+
+
+def best_move(x_bits, o_bits):
+    return get_table().best_move(x_bits, o_bits)
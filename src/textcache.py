@@ -0,0 +1,80 @@
+"""
+Кэш отрисованного текста.
+
+font.render() и особенно текст с обводкой ((2w+1)^2 - 1 блитов обводки) дорогие,
+а надписи меню каждый кадр одни и те же. Поверхности кэшируются по ключу
+(текст, шрифт, цвет, цвет обводки, толщина обводки); при превышении лимита
+памяти вытесняются давно не использованные (LRU).
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+def render_text_with_outline(text, font, text_color, outline_color, outline_width):
+    """
+    Рендер текста с обводкой.
+
+    :param text: Текст для отображения.
+    :param font: Объект шрифта Pygame.
+    :param text_color: Цвет основного текста.
+    :param outline_color: Цвет обводки.
+    :param outline_width: Толщина обводки.
+    :return: Поверхность с текстом с обводкой.
+    """
+    text_surface = font.render(text, True, text_color)
+    outline_surface = font.render(text, True, outline_color)
+    outline_size = outline_width
+
+    final_surface = pygame.Surface(
+        (text_surface.get_width() + outline_size * 2, text_surface.get_height() + outline_size * 2),
+        pygame.SRCALPHA
+    )
+
+    for dx in range(-outline_size, outline_size + 1):
+        for dy in range(-outline_size, outline_size + 1):
+            if dx != 0 or dy != 0:
+                final_surface.blit(outline_surface, (dx + outline_size, dy + outline_size))
+
+    final_surface.blit(text_surface, (outline_size, outline_size))
+
+    return final_surface
+
+
+class TextCache:
+    """LRU-кэш поверхностей с текстом с ограничением по памяти (в байтах пикселей)."""
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, font, color, outline_color=None, outline_width=0):
+        key = (text, font, color, outline_color, outline_width)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        if outline_width:
+            surf = render_text_with_outline(text, font, color, outline_color, outline_width)
+        else:
+            surf = font.render(text, True, color)
+        self.surfaces[key] = surf
+        self.bytes += _surface_bytes(surf)
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= _surface_bytes(old)
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+
+def _surface_bytes(surf):
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
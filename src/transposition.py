@@ -0,0 +1,141 @@
+"""
+Таблица транспозиций для alpha-beta поиска.
+
+Позиции, полученные разным порядком ходов, а также повороты и отражения
+одной позиции (8 симметрий квадрата) сводятся к одному каноническому ключу.
+Записи хранят флаг точности (EXACT / LOWER / UPPER), поэтому значения остаются
+корректными при отсечениях. Размер таблицы ограничен, старые записи вытесняются (LRU).
+"""
+from collections import OrderedDict
+
+EXACT = 0   # точное значение
+LOWER = 1   # нижняя граница (было отсечение по beta)
+UPPER = 2   # верхняя граница (ни один ход не поднял alpha)
+
+
+class BoardSymmetry:
+    """
+    Канонизация пары битбордов поля size x size по группе симметрий квадрата.
+
+    Каждое из 8 преобразований задано таблицами по байтам: для k-го байта
+    маски таблица сразу даёт преобразованные биты, так что преобразование
+    стоит (2 * size^2 / 8) обращений к спискам, а не обхода каждой клетки.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        bits = 2 * self.cells  # обе стороны в одной маске
+        self.chunks = (bits + 7) // 8
+
+        self.tables = []
+        self.perms = []  # perms[t][клетка] - куда она переходит при t-м преобразовании
+        for t in range(8):
+            perm = self._permutation(t)
+            self.perms.append(perm)
+            full_perm = perm + [self.cells + p for p in perm]
+            chunk_tables = []
+            for k in range(self.chunks):
+                table = [0] * 256
+                for byte in range(256):
+                    m = 0
+                    for j in range(8):
+                        i = k * 8 + j
+                        if byte >> j & 1 and i < bits:
+                            m |= 1 << full_perm[i]
+                    table[byte] = m
+                chunk_tables.append(table)
+            self.tables.append(chunk_tables)
+
+    def _permutation(self, t):
+        """Куда переходит каждая клетка: t % 4 поворотов на 90°, при t >= 4 ещё отражение."""
+        n = self.size
+        perm = []
+        for i in range(self.cells):
+            r, c = divmod(i, n)
+            for _ in range(t % 4):
+                r, c = c, n - 1 - r
+            if t >= 4:
+                c = n - 1 - c
+            perm.append(r * n + c)
+        return perm
+
+    def transform(self, t, mask):
+        """Применить t-е преобразование к объединённой маске."""
+        result = 0
+        k = 0
+        for table in self.tables[t]:
+            byte = (mask >> k) & 0xFF
+            if byte:
+                result |= table[byte]
+            k += 8
+        return result
+
+    def canonical(self, a_bits, b_bits):
+        """Минимальная по всем симметриям объединённая маска (a | b << cells)."""
+        mask = a_bits | (b_bits << self.cells)
+        best = mask
+        for t in range(1, 8):
+            m = self.transform(t, mask)
+            if m < best:
+                best = m
+        return best
+
+    def canonical_transform(self, a_bits, b_bits):
+        """(каноническая маска, номер преобразования t, которое к ней приводит)."""
+        mask = a_bits | (b_bits << self.cells)
+        best = mask
+        best_t = 0
+        for t in range(1, 8):
+            m = self.transform(t, mask)
+            if m < best:
+                best = m
+                best_t = t
+        return best, best_t
+
+    def original_cell(self, t, cell):
+        """Клетка исходной позиции, которая при t-м преобразовании перешла в cell."""
+        return self.perms[t].index(cell)
+
+
+class TranspositionTable:
+    """LRU-таблица: ключ -> (value, flag, depth) со счётчиками попаданий."""
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def probe(self, key, depth):
+        """(value, flag) для записи, просчитанной хотя бы на depth, иначе None."""
+        entry = self.entries.get(key)
+        if entry is None or entry[2] < depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def store(self, key, value, flag, depth):
+        entries = self.entries
+        old = entries.get(key)
+        if old is not None and old[2] > depth:
+            return  # не затираем более глубокий результат
+        entries[key] = (value, flag, depth)
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,5 @@
+"""Модули игры лежат плоско в src/ и импортируются по имени (как в самой игре)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,94 @@
+"""Анализ клеток (analysis.Analyzer): 3x3 - против решённой таблицы, 4x4 - против перебора."""
+import functools
+import random
+
+import analysis
+import engine
+import solver
+
+
+def _reachable(rules):
+    """Позиции (x, o), достижимые из пустого поля, где партия ещё идёт."""
+    seen = set()
+    stack = [engine.GameState(rules)]
+    while stack:
+        state = stack.pop()
+        if (state.x, state.o) in seen or state.winner is not None:
+            continue
+        seen.add((state.x, state.o))
+        for idx in range(rules.cells):
+            if state.is_free(idx):
+                child = state.copy()
+                child.play(idx)
+                stack.append(child)
+    return seen
+
+
+def test_3x3_matches_solver():
+    rules = engine.CLASSIC
+    table = solver.build()
+    analyzer = analysis.Analyzer(rules)
+    for x, o in _reachable(rules):
+        analyzer.set_position(x, o)
+        assert analyzer.done
+        value, plies, best = table.lookup(x, o)
+        free = [i for i in range(rules.cells) if not (x | o) >> i & 1]
+        assert sorted(analyzer.values) == free
+        # лучшие клетки таблицы - ровно те, где исход равен значению позиции
+        assert {i for i in free if analyzer.values[i][0] == value} == {i for i in free if best >> i & 1}
+        # у лучших клеток - те же полуходы до конца, что у таблицы
+        best_plies = [analyzer.values[i][1] for i in free if best >> i & 1]
+        assert (min(best_plies) if value > 0 else max(best_plies)) == plies
+
+
+def test_finished_game_has_no_values():
+    analyzer = analysis.Analyzer(engine.CLASSIC)
+    state = engine.GameState.from_moves(engine.CLASSIC, [0, 3, 1, 4, 2])
+    analyzer.set_position(state.x, state.o)
+    assert analyzer.done and analyzer.values == {}
+
+
+def test_cache_and_version():
+    analyzer = analysis.Analyzer(engine.CLASSIC)
+    analyzer.set_position(1, 0)
+    first, version = analyzer.values, analyzer.version
+    analyzer.set_position(1, 0)                 # та же позиция - ничего не меняется
+    assert analyzer.version == version
+    analyzer.set_position(1, 2)
+    analyzer.set_position(1, 0)                 # отмена хода - анализ из кэша
+    assert analyzer.values is first
+    assert analyzer.version == version + 2
+
+
+def test_4x4_search_matches_brute_force():
+    rules = engine.Rules(4, 4)
+
+    @functools.lru_cache(maxsize=None)
+    def brute_force(me, opp):
+        if rules.is_win(opp):
+            return analysis.LOSS
+        if (me | opp) == rules.full_mask:
+            return analysis.DRAW
+        return max(-brute_force(opp, me | bit) for bit in rules.cell_bits if not (me | opp) & bit)
+
+    analyzer = analysis.Analyzer(rules, time_limit_ms=60000)
+    rng = random.Random(0)
+    checked = 0
+    while checked < 5:
+        state = engine.GameState(rules)
+        cells = list(range(rules.cells))
+        rng.shuffle(cells)
+        for cell in cells[:10]:
+            state.play(cell)
+            if state.winner is not None:
+                break
+        else:
+            analyzer.set_position(state.x, state.o)
+            while not analyzer.step(50):
+                pass
+            me, opp = (state.x, state.o) if state.player == 1 else (state.o, state.x)
+            for idx in range(rules.cells):
+                if state.is_free(idx):
+                    expected = -brute_force(opp, me | rules.cell_bits[idx])
+                    assert analyzer.values[idx][0] == expected, (state.moves, idx)
+            checked += 1
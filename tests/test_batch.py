@@ -0,0 +1,51 @@
+"""Пакетная оценка досок (batch) против engine.Rules.check_winner."""
+import itertools
+
+import numpy as np
+import pytest
+
+import batch
+import engine
+
+WINNER_CODES = {None: batch.NONE, 1: 1, 2: 2, 'draw': batch.DRAW}
+
+
+def _check(boards, rules):
+    res = batch.evaluate_boards(boards, rules.win_length)
+    for i, board in enumerate(boards.reshape(len(boards), -1)):
+        x = sum(1 << int(c) for c in np.flatnonzero(board == 1))
+        o = sum(1 << int(c) for c in np.flatnonzero(board == 2))
+        winner, info = rules.check_winner(x, o)
+        assert res.winner[i] == WINNER_CODES[winner], board
+        assert batch.line_info(res.line[i], rules.size, rules.win_length) == info
+        assert res.terminal[i] == (winner is not None)
+
+
+def test_all_3x3_boards():
+    # все 3^9 раскладок, в т.ч. недостижимые (линии у обоих)
+    boards = np.array(list(itertools.product((0, 1, 2), repeat=9)), dtype=np.int8).reshape(-1, 3, 3)
+    _check(boards, engine.CLASSIC)
+
+
+@pytest.mark.parametrize("size, win_length", [(4, 3), (5, 4), (15, 5)])
+def test_random_boards(size, win_length):
+    rng = np.random.default_rng(size)
+    boards = rng.choice(3, size=(500, size, size), p=[0.5, 0.25, 0.25]).astype(np.int8)
+    boards[::50] = rng.choice((1, 2), size=(size, size))  # полные доски - ничьи и победы
+    _check(boards, engine.Rules(size, win_length))
+
+
+def test_scores():
+    boards = np.array([[[1, 1, 1], [2, 2, 0], [0, 0, 0]],
+                       [[2, 2, 2], [1, 1, 0], [1, 0, 0]],
+                       [[1, 2, 1], [1, 2, 2], [2, 1, 1]],
+                       [[0, 0, 0], [0, 1, 0], [0, 0, 0]]])
+    res = batch.evaluate_boards(boards)
+    assert list(batch.scores(res, 1)) == [1, -1, 0, 0]
+    assert list(batch.scores(res, 2)) == [-1, 1, 0, 0]
+    assert list(res.terminal) == [True, True, True, False]
+
+
+def test_bad_shape():
+    with pytest.raises(ValueError):
+        batch.evaluate_boards(np.zeros((2, 3, 4)))
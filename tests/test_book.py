@@ -0,0 +1,100 @@
+"""Дебютная книга и эндшпильная база: формат файла и точные результаты."""
+import functools
+
+import pytest
+
+import book
+import engine
+import transposition
+
+RULES = engine.Rules(4, 4)
+
+
+@functools.lru_cache(maxsize=None)
+def brute_force(me, opp):
+    """Результат (-1 / 0 / +1) для ходящего с камнями me - полный перебор."""
+    if RULES.is_win(opp):
+        return -1
+    if (me | opp) == RULES.full_mask:
+        return 0
+    return max(-brute_force(opp, me | bit) for bit in RULES.cell_bits if not (me | opp) & bit)
+
+
+def test_write_and_probe(tmp_path):
+    path = str(tmp_path / "book.bin")
+    symmetry = transposition.BoardSymmetry(RULES.size)
+    me, opp = RULES.cell_bit(0, 1), RULES.cell_bit(3, 3)
+    key = symmetry.canonical(me, opp)
+    entries = {key: (5, book.EXACT, -1, 7), 1: (book.NO_MOVE, book.BOOK, 0, 0), 3: (2, book.BOOK, 0, 0)}
+    book.write_book(path, RULES, entries, max_empty=6)
+
+    b = book.Book(path)
+    assert len(b) == 3
+    assert (b.rules.size, b.rules.win_length, b.max_empty) == (4, 4, 6)
+    for k, entry in entries.items():
+        assert b.probe(k) == entry
+    assert b.probe(2) is None
+    assert b.probe_exact(key) == (-1, 7)
+    assert b.probe_exact(3) is None          # ход книги - не точный результат
+    assert b.best_move(1, 0) is None         # NO_MOVE
+
+    # ход хранится в канонической ориентации и возвращается в исходной
+    _, t = symmetry.canonical_transform(me, opp)
+    row, col = b.best_move(me, opp)
+    assert symmetry.perms[t][row * RULES.size + col] == 5
+
+
+def test_corrupt_file(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book.write_book(path, RULES, {1: (0, book.BOOK, 0, 0), 2: (0, book.BOOK, 0, 0)}, max_empty=6)
+    with open(path, "r+b") as f:
+        f.truncate(book.HEADER_SIZE + 3)
+    with pytest.raises(ValueError):
+        book.Book(path)
+
+
+def test_empty_book(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book.write_book(path, RULES, {}, max_empty=6)
+    b = book.Book(path)
+    assert len(b) == 0 and b.probe(1) is None and b.best_move(0, 0) is None
+
+
+def test_book_for_other_rules_is_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.bin")
+    book.write_book(path, engine.Rules(4, 3), {1: (0, book.BOOK, 0, 0)}, max_empty=6)
+    monkeypatch.setattr(book, "book_file", lambda rules: path)
+    monkeypatch.setattr(book, "_books", {})
+    assert book.get_book(RULES) is None
+    assert book.get_book(engine.Rules(4, 3)) is not None
+
+
+def test_large_boards_are_rejected():
+    # клетка 255 совпала бы с NO_MOVE, а дальше не помещается в байт
+    with pytest.raises(ValueError):
+        book.build(engine.Rules(16, 5), path="unused")
+
+
+def test_exact_results_match_brute_force():
+    # слабый ИИ в самоигре - больше позиций с форсированным выигрышем
+    keys = sorted(book.endgame_positions(RULES, 7, games=20, difficulty=0.2))
+    solved = dict(book._solve_chunk((RULES.size, RULES.win_length, book.EXACT, 60000, keys)))
+    assert set(solved) == set(keys)
+    for key, (cell, kind, value, plies) in solved.items():
+        me, opp = key & RULES.full_mask, key >> RULES.cells
+        assert kind == book.EXACT
+        assert value == brute_force(me, opp), key
+        if value == 0:
+            assert plies == RULES.cells - engine.popcount(me | opp)
+        # записанный ход даёт тот же результат
+        assert -brute_force(opp, me | RULES.cell_bits[cell]) == value
+
+
+
+def test_timed_out_search_is_not_stored():
+    # время кончается посреди итераций - в базу идут только досчитанные результаты
+    keys = sorted(book.endgame_positions(RULES, 9, games=10, difficulty=0.2))
+    solved = dict(book._solve_chunk((RULES.size, RULES.win_length, book.EXACT, 1, keys)))
+    assert len(solved) < len(keys)
+    for key, (cell, kind, value, plies) in solved.items():
+        assert value == brute_force(key & RULES.full_mask, key >> RULES.cells), key
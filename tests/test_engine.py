@@ -0,0 +1,57 @@
+"""GameState (счётчики линий) против полной проверки поля Rules.check_winner."""
+import random
+
+import pytest
+
+import engine
+
+RULES = [(3, 3), (4, 3), (5, 4), (7, 5), (15, 5)]
+
+
+@pytest.mark.parametrize("size, win_length", RULES)
+def test_play_matches_check_winner(size, win_length):
+    rules = engine.Rules(size, win_length)
+    rng = random.Random(size * 100 + win_length)
+    for _ in range(50):
+        state = engine.GameState(rules)
+        cells = list(range(rules.cells))
+        rng.shuffle(cells)
+        for cell in cells:
+            state.play(cell)
+            assert state.check_winner() == rules.check_winner(state.x, state.o)
+            if state.winner is not None:
+                break
+
+
+@pytest.mark.parametrize("size, win_length", RULES)
+def test_undo_restores_position(size, win_length):
+    rules = engine.Rules(size, win_length)
+    rng = random.Random(size)
+    state = engine.GameState(rules)
+    snapshots = []
+    while state.winner is None:
+        snapshots.append(state.copy())
+        state.play(rng.choice([i for i in range(rules.cells) if state.is_free(i)]))
+    while snapshots:
+        state.undo()
+        before = snapshots.pop()
+        assert (state.x, state.o, state.player, state.free) == (before.x, before.o, before.player, before.free)
+        assert state.x_lines == rules.line_counts(state.x)
+        assert state.o_lines == rules.line_counts(state.o)
+        assert state.check_winner() == (None, None)
+
+
+def test_play_rejects_illegal_moves():
+    state = engine.GameState.from_moves(engine.CLASSIC, [0, 3, 1, 4, 2])
+    assert state.check_winner() == (1, ("row", 0))
+    with pytest.raises(ValueError):
+        state.play(5)
+    state.undo()
+    with pytest.raises(ValueError):
+        state.play(0)
+
+
+def test_draw_on_full_board():
+    state = engine.GameState.from_moves(engine.CLASSIC, [0, 1, 2, 4, 3, 5, 7, 6, 8])
+    assert state.check_winner() == ('draw', None)
+    assert engine.CLASSIC.check_winner(state.x, state.o) == ('draw', None)
@@ -0,0 +1,116 @@
+"""Архив партий (gamerecords) и индекс по дебютам (gameindex)."""
+import random
+
+import pytest
+
+import engine
+import gameindex
+import gamerecords
+
+
+def _random_games(rules, count, seed=0):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = [0, 0, 0]
+        moves = []
+        winner = None
+        cells = list(range(rules.cells))
+        rng.shuffle(cells)
+        for cell in cells[:rng.randrange(rules.cells + 1)]:  # часть партий не доиграна
+            board[1 + len(moves) % 2] |= rules.cell_bits[cell]
+            moves.append(cell)
+            winner = rules.check_winner(board[1], board[2])[0]
+            if winner is not None:
+                break
+        mode = rng.choice(gamerecords.MODES)
+        difficulty = rng.choice(gamerecords.DIFFICULTY_NAMES) if mode == "vs_ai" else None
+        games.append(gamerecords.GameRecord(mode, rng.choice((1, 2)), difficulty, winner, tuple(moves)))
+    return games
+
+
+def _write(path, rules, games):
+    log = gamerecords.GameLog(path, rules)
+    for rec in games:
+        log.record(rec)
+    log.close()
+
+
+@pytest.mark.parametrize("size, win_length", [(3, 3), (5, 4), (15, 5)])
+def test_round_trip(tmp_path, size, win_length):
+    rules = engine.Rules(size, win_length)
+    path = str(tmp_path / "games.rec")
+    games = _random_games(rules, 200, seed=size)
+    _write(path, rules, games)
+    archive = gamerecords.GameArchive(path)
+    assert list(archive) == games
+    assert archive[-1] == games[-1]
+    state = archive.replay(rules, 5)
+    assert state.moves == list(games[5].moves)
+    assert state.winner == games[5].outcome
+    assert archive.replay(rules, 5, ply=1).moves == list(games[5].moves[:1])
+    archive.close()
+
+
+def test_record_size_3x3():
+    assert gamerecords.RecordFormat(3, 3).record_size == 7
+
+
+def test_torn_record_is_dropped(tmp_path):
+    rules = engine.CLASSIC
+    path = str(tmp_path / "games.rec")
+    games = _random_games(rules, 10)
+    _write(path, rules, games)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x05\x12")  # сбой посреди записи
+    _write(path, rules, games[:1])
+    assert list(gamerecords.GameArchive(path)) == games + games[:1]
+
+
+def test_other_board_is_rejected(tmp_path):
+    path = str(tmp_path / "games.rec")
+    _write(path, engine.CLASSIC, _random_games(engine.CLASSIC, 1))
+    with pytest.raises(ValueError):
+        gamerecords.GameLog(path, engine.Rules(4, 4))
+
+
+def _filter(games, mode=None, human_side=None, difficulty=None, outcome=None, opening=()):
+    for i, rec in enumerate(games):
+        if mode is not None and rec.mode != mode:
+            continue
+        if human_side is not None and rec.human_side != human_side:
+            continue
+        if difficulty is not None and rec.difficulty != difficulty:
+            continue
+        if outcome is not None and rec.outcome != outcome:
+            continue
+        cells = [(c,) if isinstance(c, int) else c for c in opening]
+        if any(ply >= len(rec.moves) or rec.moves[ply] not in c for ply, c in enumerate(cells)):
+            continue
+        yield i
+
+
+QUERIES = [
+    {},
+    {"mode": "vs_ai", "human_side": 1, "difficulty": "hard"},
+    {"mode": "two_players", "opening": (4,)},
+    {"opening": (gameindex.corners(3), 4)},
+    {"mode": "vs_ai", "human_side": 2, "opening": ((0, 8),)},
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_index_matches_scan(tmp_path, query):
+    rules = engine.CLASSIC
+    path = str(tmp_path / "games.rec")
+    games = _random_games(rules, 500)
+    _write(path, rules, games[:400])
+    gameindex.GameIndex(gamerecords.GameArchive(path))  # строит и сохраняет .idx
+    _write(path, rules, games[400:])                     # партии после построения индекса
+    index = gameindex.GameIndex(gamerecords.GameArchive(path))
+    assert index.indexed == 400
+
+    assert list(index.find(**query)) == list(_filter(games, **query))
+    counts = index.counts(**query)
+    for outcome in (1, 2, 'draw'):
+        assert counts[outcome] == len(list(_filter(games, outcome=outcome, **query)))
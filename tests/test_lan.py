@@ -0,0 +1,116 @@
+"""Сетевая игра: двоичные кадры и синхронизация хоста с гостем по localhost."""
+import random
+import struct
+import time
+
+import pytest
+
+import core
+import engine
+import lan
+
+FRAMES = [
+    (lan.HELLO, 0, 3 << 8 | 3, lan.PROTOCOL_VERSION, "Аня".encode("utf-8")),
+    (lan.SYNC, 7, 4, 2, bytes([4, 0, 8, 2])),
+    (lan.MOVE, 255, 65535, 224, b""),
+    (lan.RESTART, 1, 0, 0, b""),
+    (lan.SYNC, 2, 255, 1, bytes(range(255))),   # самый длинный SYNC
+]
+
+
+def test_frames_round_trip():
+    data = b"".join(lan.pack(*frame) for frame in FRAMES)
+    frames, rest = lan.unpack_frames(data)
+    assert frames == FRAMES
+    assert rest == b""
+
+
+def test_frames_split_anywhere():
+    # TCP режет поток где угодно: кадр собирается из кусков
+    data = b"".join(lan.pack(*frame) for frame in FRAMES)
+    for cut in range(len(data) + 1):
+        first, rest = lan.unpack_frames(data[:cut])
+        second, tail = lan.unpack_frames(rest + data[cut:])
+        assert first + second == FRAMES
+        assert tail == b""
+
+
+def test_payload_limit():
+    with pytest.raises(struct.error):
+        lan.pack(lan.SYNC, 0, 256, 1, bytes(256))
+
+
+def test_board_over_255_cells_is_rejected():
+    # 16x16: клетка 256 и SYNC из 256 ходов не помещаются в кадр
+    match = core.Match(engine.Rules(16, 5), searcher=object())
+    with pytest.raises(ValueError):
+        lan.LanSession(match, 1, "Аня")
+    lan.LanSession(core.Match(engine.Rules(15, 5), searcher=object()), 1, "Аня")
+
+
+def _quiet_moves(rules, rng):
+    """Длинная партия без победителя - ходы, после которых никто не собрал линию."""
+    state = engine.GameState(rules)
+    while True:
+        cells = [i for i in range(rules.cells) if state.is_free(i)]
+        rng.shuffle(cells)
+        for cell in cells:
+            state.play(cell)
+            if state.winner is None:
+                break
+            state.undo()
+        else:
+            return state.moves
+
+
+def _wait(sessions, condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        for session in sessions:
+            session.poll()
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("не дождались")
+
+
+@pytest.fixture
+def pair():
+    def make(rules, moves=()):
+        host_match = core.Match(rules, searcher=object())
+        host_match.start("two_players")
+        host_match.load_moves(list(moves))
+        host = lan.LanHost(host_match, "Хост", port=0, bind="127.0.0.1")
+        guest = lan.LanGuest(core.Match(rules, searcher=object()), "Гость", ("127.0.0.1", host.port))
+        sessions.extend((host, guest))
+        _wait(sessions, lambda: host.connected and guest.connected)
+        return host, guest
+
+    sessions = []
+    yield make
+    for session in sessions:
+        session.close()
+
+
+def test_moves_and_restart(pair):
+    host, guest = pair(engine.CLASSIC)
+    assert guest.match.player_names == ["Хост", "Гость"]
+    assert host.local_move(1, 1)
+    _wait([host, guest], lambda: guest.match.state.moves == [4])
+    assert guest.my_turn()
+    assert guest.local_move(0, 0)
+    _wait([host, guest], lambda: host.match.state.moves == [4, 0] and guest.confirmed == 2)
+    assert guest.resyncs == 0
+
+    guest.restart()
+    _wait([host, guest], lambda: host.game == 1 and guest.game == 1 and not guest.match.state.moves)
+    assert not host.match.state.moves
+
+
+def test_sync_long_game_on_connect(pair):
+    rules = engine.Rules(15, 5)
+    moves = _quiet_moves(rules, random.Random(0))
+    assert len(moves) > 150
+    host, guest = pair(rules, moves)
+    _wait([host, guest], lambda: guest.match.state.moves == moves)
+    assert guest.confirmed == len(moves)
@@ -0,0 +1,120 @@
+"""MCTS: учёт посещений, переиспользование дерева между ходами и процессы-помощники."""
+import time
+
+import engine
+import mcts
+import search
+
+RULES = engine.Rules(9, 5)
+CENTER = RULES.cells // 2
+
+
+def _bits(*cells):
+    return sum(RULES.cell_bits[c] for c in cells)
+
+
+def test_iterate_keeps_position_and_counts_visits():
+    tree = mcts.Tree(RULES, seed=1)
+    x, o = _bits(CENTER), _bits(CENTER + 1)
+    tree.set_position(x, o)
+    tree.iterate(200)
+    assert (tree.state.x, tree.state.o) == (x, o)   # все ходы итераций отменены
+    assert tree.root.visits == 200
+    assert sum(ch.visits for ch in tree.root.children) == 200
+    for move in tree.root_stats():
+        assert not (x | o) >> move & 1
+
+
+def test_tree_is_reused_after_moves():
+    tree = mcts.Tree(RULES, seed=1)
+    x, o = _bits(CENTER), 0
+    tree.set_position(x, o)
+    tree.iterate(500)
+    child = max(tree.root.children, key=lambda ch: ch.visits)
+    grandchild = max(child.children, key=lambda ch: ch.visits)
+    visits = grandchild.visits
+
+    # соперник и мы сходили так, как уже есть в дереве - поиск продолжается с узла
+    tree.set_position(x | _bits(grandchild.move), o | _bits(child.move))
+    assert tree.root is grandchild and tree.root.parent is None
+    assert tree.root.visits == visits
+    tree.iterate(10)
+    assert tree.root.visits == visits + 10
+
+    # позиция не из дерева - новое дерево
+    tree.set_position(_bits(0), _bits(80))
+    assert tree.root.visits == 0 and tree.root.move is None
+
+
+def test_takes_immediate_win():
+    x = _bits(*(CENTER - 2 + i for i in range(4)))             # четыре X в ряд
+    o = _bits(CENTER - 3, CENTER + 9, CENTER + 10, CENTER - 9)  # один конец закрыт
+    player = mcts.MCTSPlayer(RULES, iterations=2000, seed=3)
+    assert player.best_move(x, o) == RULES.cell_coords[CENTER + 2]
+
+
+def test_workers_share_the_search():
+    player = mcts.MCTSPlayer(RULES, workers=2, iterations=400)
+    try:
+        x, o = _bits(CENTER), _bits(CENTER + 1)
+        row, col = player.best_move(x, o, time_limit_ms=5000)
+        assert not (x | o) & RULES.cell_bit(row, col)
+        assert player.nodes >= 400
+        assert sum(v for v, _ in player.last_stats.values()) == player.nodes
+        # второй ход - деревья процессов продолжают работу с новой позиции
+        x |= RULES.cell_bit(row, col)
+        assert player.best_move(o, x, time_limit_ms=5000) is not None
+    finally:
+        player.close()
+
+
+def test_search_stops_when_interrupted():
+    tree = mcts.Tree(RULES, seed=1)
+    assert tree.search(60.0, None, interrupted=lambda: True) == 0
+
+
+def test_cancel_stops_workers():
+    player = mcts.MCTSPlayer(RULES, workers=2)
+    try:
+        x, o = _bits(CENTER), 0
+        task = search.SearchTask(player.iter_best_move(o, x, time_limit_ms=10000))
+        task.step(50)
+        task.cancel()  # Esc / рестарт
+        start = time.perf_counter()
+        # процессы бросили отменённый поиск - следующий ход не ждёт 10 с
+        assert player.best_move(o, x | _bits(CENTER + 1), time_limit_ms=300) is not None
+        assert time.perf_counter() - start < 3
+    finally:
+        player.close()
+
+
+def test_single_process_yields_after_each_iteration():
+    # на 15x15 пачка итераций заняла бы десятки мс - больше порции кадра
+    rules = engine.Rules(15, 5)
+    player = mcts.MCTSPlayer(rules, iterations=100)
+    steps = player.iter_best_move(rules.cell_bits[rules.cells // 2], 0, time_limit_ms=10000)
+    next(steps)
+    assert player.nodes == 1
+    next(steps)
+    assert player.nodes == 2
+    steps.close()
+
+
+def test_dead_worker_is_dropped():
+    player = mcts.MCTSPlayer(RULES, workers=2, iterations=200)
+    try:
+        x, o = _bits(CENTER), _bits(CENTER + 1)
+        player._procs[0].kill()
+        player._procs[0].join()
+        start = time.perf_counter()
+        assert player.best_move(x, o, time_limit_ms=2000) is not None
+        assert time.perf_counter() - start < 3
+        assert len(player._procs) == 1 and player.nodes >= 100
+
+        # умерли все - ищем в своём процессе
+        player._procs[0].kill()
+        player._procs[0].join()
+        assert player.best_move(x, o, time_limit_ms=300) is not None
+        assert not player._procs and player.nodes > 0
+    finally:
+        player.close()
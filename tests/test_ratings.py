@@ -0,0 +1,62 @@
+"""Рейтинги Глико и профили игроков в SQLite."""
+import pytest
+
+import ratings
+
+
+def test_glicko_reference_values():
+    # пример из статьи Глико (M. Glickman, "The Glicko system"): игрок 1500, RD 200
+    assert ratings._g(30) == pytest.approx(0.9955, abs=1e-4)
+    assert ratings._g(100) == pytest.approx(0.9531, abs=1e-4)
+    assert ratings._g(300) == pytest.approx(0.7242, abs=1e-4)
+    assert ratings.expected_score(1500, 1400, 30) == pytest.approx(0.639, abs=1e-3)
+    assert ratings.expected_score(1500, 1550, 100) == pytest.approx(0.432, abs=1e-3)
+    assert ratings.expected_score(1500, 1700, 300) == pytest.approx(0.303, abs=1e-3)
+    # одна партия из примера - победа над 1400 (RD 30)
+    rating, rd = ratings.glicko_update(1500, 200, 1400, 30, 1)
+    assert rating == pytest.approx(1563.4, abs=0.1)
+    assert rd == pytest.approx(175.2, abs=0.1)
+
+
+def test_glicko_properties():
+    # ничья равных не двигает рейтинг, но уменьшает неопределённость
+    rating, rd = ratings.glicko_update(1500, 350, 1500, 350, 0.5)
+    assert rating == pytest.approx(1500)
+    assert rd < 350
+    # победа над сильным даёт больше, чем над слабым; поражение - симметрично
+    assert ratings.glicko_update(1500, 100, 1700, 100, 1)[0] > ratings.glicko_update(1500, 100, 1300, 100, 1)[0]
+    assert ratings.glicko_update(1500, 100, 1500, 100, 0)[0] == pytest.approx(
+        3000 - ratings.glicko_update(1500, 100, 1500, 100, 1)[0])
+    # RD не опускается ниже MIN_RD и растёт без партий до START_RD
+    assert ratings.glicko_update(1500, ratings.MIN_RD, 1500, ratings.MIN_RD, 1)[1] == ratings.MIN_RD
+    assert ratings.inflate_rd(50, 0) == 50
+    assert ratings.inflate_rd(50, 10000) == ratings.START_RD
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = ratings.RatingsDB(str(tmp_path / "ratings.db"))
+    yield db
+    db.close()
+
+
+def test_record_updates_both_players(db):
+    dx, do = db.record("Аня", "Borya", 1, now=0)
+    assert dx > 0 and do == pytest.approx(-dx)
+    a, b = db.player("Аня"), db.player("Borya")
+    assert (a["games"], a["wins"], a["current_streak"]) == (1, 1, 1)
+    assert (b["games"], b["losses"], b["current_streak"]) == (1, 1, 0)
+    db.record("Аня", "Borya", 'draw', now=0)
+    assert db.head_to_head("Borya", "Аня") == (0, 1, 1)
+    assert db.totals() == {"two_players": (2, 1, 0, 1)}
+    assert db.player("Аня")["current_streak"] == 0
+
+
+def test_names_ignore_case(db):
+    # NOCASE в SQLite сравнивает без регистра только латиницу - ключ casefold()
+    first = db.ensure_player("Аня")
+    assert db.ensure_player("аня") == first
+    assert db.ensure_player("АНЯ") == first
+    assert db.player("аНя")["name"] == "Аня"
+    with pytest.raises(ValueError):
+        db.record("Аня", "аня", 1)
@@ -0,0 +1,83 @@
+"""Счёт: журнал поверх снимка, оборванная запись и повторный учёт после сбоя."""
+import copy
+import json
+
+import scorejournal
+
+
+def _expected(results):
+    data = copy.deepcopy(scorejournal.SCOREBOARD_TEMPLATE)
+    for mode, winner in results:
+        scorejournal.apply_result(data, mode, winner)
+    return data
+
+
+def _write_journal(path, records, tail=b""):
+    with open(path + ".journal", "wb") as f:
+        for seq, (mode, winner) in records:
+            f.write(json.dumps({"seq": seq, "mode": mode, "winner": winner}).encode() + b"\n")
+        f.write(tail)
+
+
+RESULTS = [("two_players", 1), ("vs_ai", "computer"), ("two_players", "draw"), ("vs_ai", "human")]
+
+
+def test_record_and_reload(tmp_path):
+    path = str(tmp_path / "scoreboard.json")
+    store = scorejournal.ScoreboardStore(path, compact_every=3)
+    for mode, winner in RESULTS:
+        store.record(mode, winner)
+    store.close()
+    store = scorejournal.ScoreboardStore(path)
+    assert store.data == _expected(RESULTS)
+    assert store.seq == len(RESULTS)
+    store.close()
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "scoreboard.json")
+    _write_journal(path, enumerate(RESULTS[:3], 1), tail=b'{"seq": 4, "mode": "vs_a')
+    store = scorejournal.ScoreboardStore(path, compact_every=100)
+    assert store.data == _expected(RESULTS[:3])
+    assert store.seq == 3
+    # хвост отрезан - новая запись не склеивается с ним
+    store.record(*RESULTS[3])
+    store.flush()
+    with open(path + ".journal", "rb") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["seq"] for line in lines] == [1, 2, 3, 4]
+    store.close()
+    assert scorejournal.ScoreboardStore(path).data == _expected(RESULTS)
+
+
+def test_journal_unterminated_last_line(tmp_path):
+    # полная по содержимому строка без "\n" - тоже оборванная запись
+    path = str(tmp_path / "scoreboard.json")
+    _write_journal(path, enumerate(RESULTS[:1], 1), tail=b'{"seq": 2, "mode": "vs_ai", "winner": "human"}')
+    store = scorejournal.ScoreboardStore(path)
+    assert store.data == _expected(RESULTS[:1])
+    store.close()
+
+
+def test_snapshot_and_journal_not_counted_twice(tmp_path):
+    # сбой между заменой снимка и очисткой журнала: записи 1-3 есть и там, и там
+    path = str(tmp_path / "scoreboard.json")
+    snapshot = _expected(RESULTS[:3])
+    snapshot[scorejournal.SEQ_KEY] = 3
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    _write_journal(path, enumerate(RESULTS, 1))
+    store = scorejournal.ScoreboardStore(path)
+    assert store.data == _expected(RESULTS)
+    assert store.seq == 4
+    store.close()
+
+
+def test_corrupt_snapshot_is_moved_aside(tmp_path):
+    path = str(tmp_path / "scoreboard.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{не json")
+    store = scorejournal.ScoreboardStore(path)
+    assert store.data == scorejournal.SCOREBOARD_TEMPLATE
+    assert (tmp_path / "scoreboard.json.corrupt").exists()
+    store.close()
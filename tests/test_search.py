@@ -0,0 +1,71 @@
+"""Alpha-beta с итеративным углублением против полного перебора на 4x4."""
+import functools
+import random
+
+import pytest
+
+import engine
+import search
+
+
+def _brute_force(rules):
+    @functools.lru_cache(maxsize=None)
+    def value(me, opp):
+        """Результат (-1 / 0 / +1) для ходящего с камнями me."""
+        if rules.is_win(opp):
+            return -1
+        occupied = me | opp
+        if occupied == rules.full_mask:
+            return 0
+        return max(-value(opp, me | bit) for bit in rules.cell_bits if not occupied & bit)
+    return value
+
+
+def _positions(rules, max_empty, count, seed):
+    """Случайные позиции (me, opp) без победителя, где свободно не больше max_empty клеток."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        me, opp = 0, 0
+        cells = list(range(rules.cells))
+        rng.shuffle(cells)
+        for cell in cells[:rules.cells - max_empty]:
+            me, opp = opp, me | rules.cell_bits[cell]
+            if rules.is_win(opp):
+                break
+        else:
+            positions.append((me, opp))
+    return positions
+
+
+@pytest.mark.parametrize("win_length", [3, 4])
+def test_matches_brute_force(win_length):
+    rules = engine.Rules(4, win_length)
+    brute_force = _brute_force(rules)
+    searcher = search.AlphaBetaSearch(rules)  # таблица транспозиций - общая на все позиции
+    for me, opp in _positions(rules, 8, 60, seed=win_length):
+        expected = brute_force(me, opp)
+        row, col = searcher.best_move(me, opp, time_limit_ms=60000)
+        score = searcher.last_score
+        got = 1 if score > search.MATE_BOUND else -1 if score < -search.MATE_BOUND else 0
+        assert got == expected, (me, opp)
+        # выбранный ход даёт этот результат
+        bit = rules.cell_bit(row, col)
+        assert not (me | opp) & bit
+        assert (1 if rules.is_win(me | bit) else -brute_force(opp, me | bit)) == expected
+
+
+def test_takes_immediate_win():
+    rules = engine.Rules(4, 4)
+    searcher = search.AlphaBetaSearch(rules)
+    me = rules.cell_bit(0, 0) | rules.cell_bit(0, 1) | rules.cell_bit(0, 2)
+    opp = rules.cell_bit(1, 0) | rules.cell_bit(1, 1) | rules.cell_bit(2, 2)
+    assert searcher.best_move(me, opp) == (0, 3)
+    assert searcher.last_score == search.WIN_SCORE - 1
+
+
+def test_full_board():
+    rules = engine.Rules(3, 3)
+    x = sum(rules.cell_bits[i] for i in (0, 2, 3, 7, 8))
+    o = sum(rules.cell_bits[i] for i in (1, 4, 5, 6))
+    assert search.AlphaBetaSearch(rules).best_move(o, x) is None
@@ -0,0 +1,141 @@
+"""Сервер партий: JSON-строки по TCP, партия против компьютера и партия двоих."""
+import asyncio
+import json
+
+import ratings
+import server
+
+
+async def _start(ratings_db=None):
+    game_server = server.GameServer(workers=1, ratings_db=ratings_db)
+    tcp = await asyncio.start_server(game_server.client, "127.0.0.1", 0, limit=server.MAX_LINE)
+    return game_server, tcp, tcp.sockets[0].getsockname()[1]
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def request(self, **msg):
+        self.writer.write((json.dumps(msg) + "\n").encode("utf-8"))
+        await self.writer.drain()
+        return await self.receive()
+
+    async def receive(self):
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def _run(scenario, ratings_db=None):
+    async def main():
+        game_server, tcp, port = await _start(ratings_db)
+        try:
+            await scenario(game_server, port)
+        finally:
+            tcp.close()
+            await tcp.wait_closed()
+    asyncio.run(main())
+
+
+def test_vs_ai_game():
+    async def scenario(game_server, port):
+        client = await Client.connect(port)
+        reply = await client.request(op="new", mode="vs_ai", side=2, difficulty="impossible")
+        assert reply["ok"]
+        state = reply["state"]
+        assert len(state["moves"]) == 1 and state["current_player"] == 2  # компьютер сходил первым
+        while not state["game_over"]:
+            cell = next(c for c in range(9) if c not in state["moves"])
+            reply = await client.request(op="move", row=cell // 3, col=cell % 3)
+            assert reply["ok"], reply
+            state = reply["state"]
+        assert state["winner"] in (1, 'draw')  # идеальный компьютер (X) не проигрывает
+        reply = await client.request(op="move", row=0, col=0)
+        assert not reply["ok"] and reply["error"] == "партия окончена"
+        client.writer.write(b'{"op": "quit"}\n')
+        assert await client.reader.readline() == b""  # сервер закрывает соединение без ответа
+        await client.close()
+    _run(scenario)
+
+
+def test_two_players_and_notifications():
+    async def scenario(game_server, port):
+        a = await Client.connect(port)
+        b = await Client.connect(port)
+        session = (await a.request(op="new", mode="two_players"))["session"]
+        assert (await b.request(op="join", session=session))["ok"]
+
+        assert (await a.request(op="move", row=1, col=1))["ok"]
+        event = await b.receive()
+        assert event["event"] == "state" and event["state"]["moves"] == [4]
+
+        reply = await a.request(op="move", row=0, col=0)
+        assert not reply["ok"] and reply["error"] == "сейчас не ваш ход"
+        reply = await b.request(op="move", row=1, col=1)
+        assert not reply["ok"] and reply["error"] == "клетка занята"
+        assert (await b.request(op="move", row=0, col=0))["ok"]
+        assert (await a.receive())["state"]["moves"] == [4, 0]
+        assert game_server.moves == 2
+        await a.close()
+        await b.close()
+    _run(scenario)
+
+
+def test_bad_requests():
+    async def scenario(game_server, port):
+        client = await Client.connect(port)
+        assert not (await client.request(op="move", row=0, col=0))["ok"]   # партии ещё нет
+        assert not (await client.request(op="new", mode="chess"))["ok"]
+        assert not (await client.request(op="join", session=12345))["ok"]
+        client.writer.write(b"not json\n")
+        assert not (await client.receive())["ok"]
+        assert (await client.request(op="new", mode="two_players"))["ok"]  # соединение живо
+        await client.close()
+    _run(scenario)
+
+
+def test_too_long_line_closes_connection():
+    async def scenario(game_server, port):
+        client = await Client.connect(port)
+        client.writer.write(b"x" * (server.MAX_LINE + 10) + b"\n")
+        reply = await client.receive()
+        assert not reply["ok"]
+        assert await asyncio.wait_for(client.reader.readline(), 5) == b""  # сервер закрыл соединение
+        await client.close()
+        client = await Client.connect(port)   # сервер жив
+        assert (await client.request(op="new", mode="two_players"))["ok"]
+        await client.close()
+    _run(scenario)
+
+
+def test_finished_game_goes_to_ratings(tmp_path):
+    db = ratings.RatingsDB(str(tmp_path / "ratings.db"))
+
+    async def scenario(game_server, port):
+        client = await Client.connect(port)
+        reply = await client.request(op="new", mode="two_players", name="Аня")
+        other = await Client.connect(port)
+        assert (await other.request(op="join", session=reply["session"], name="Боря"))["ok"]
+        for cell in (0, 3, 1, 4):
+            player = client if cell in (0, 1) else other
+            assert (await player.request(op="move", row=cell // 3, col=cell % 3))["ok"]
+            await (other if player is client else client).receive()   # уведомление сопернику
+        reply = await client.request(op="move", row=0, col=2)
+        assert reply["state"]["winner"] == 1
+        await client.close()
+        await other.close()
+
+    try:
+        _run(scenario, db)
+        games = db.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        assert games == 1
+    finally:
+        db.close()
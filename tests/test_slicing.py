@@ -0,0 +1,45 @@
+"""Поиск порциями (search.SearchTask): кадр не блокируется, результат - как у best_move."""
+import time
+
+import engine
+import search
+
+RULES = engine.Rules(7, 5)
+ME = RULES.cell_bit(3, 3) | RULES.cell_bit(3, 4)
+OPP = RULES.cell_bit(2, 3) | RULES.cell_bit(4, 4)
+
+
+def test_slices_give_same_result_as_best_move():
+    expected = search.AlphaBetaSearch(RULES).best_move(ME, OPP, 60000, max_depth=3)
+    searcher = search.AlphaBetaSearch(RULES)
+    task = search.SearchTask(searcher.iter_best_move(ME, OPP, 60000, max_depth=3))
+    steps = 1
+    while not task.step(2):
+        steps += 1
+    assert task.result == expected
+    assert steps > 1  # поиск действительно шёл несколькими порциями
+    assert task.step(2) and task.result == expected
+
+
+def test_step_respects_slice():
+    searcher = search.AlphaBetaSearch(RULES)
+    task = search.SearchTask(searcher.iter_best_move(ME, OPP, time_limit_ms=300))
+    slowest = 0.0
+    while True:
+        start = time.perf_counter()
+        done = task.step(5)
+        slowest = max(slowest, time.perf_counter() - start)
+        if done:
+            break
+    assert task.result is not None
+    # порция заканчивается на ближайшем yield после slice_ms - с запасом на медленную машину
+    assert slowest < 0.05
+
+
+def test_cancel():
+    searcher = search.AlphaBetaSearch(RULES)
+    task = search.SearchTask(searcher.iter_best_move(ME, OPP, time_limit_ms=60000))
+    assert not task.step(1)
+    task.cancel()
+    assert task.done and task.result is None
+    assert task.step(1)
@@ -0,0 +1,92 @@
+"""Решённая таблица 3x3 против прямого перебора по engine.check_winner."""
+import functools
+
+import pytest
+
+import engine
+import solver
+
+
+@functools.lru_cache(maxsize=None)
+def brute_force(x_bits, o_bits):
+    """(результат для ходящего, полуходов, маска лучших ходов) - минимакс без таблицы."""
+    winner, _ = engine.check_winner(x_bits, o_bits)
+    if winner == 'draw':
+        return 0, 0, 0
+    if winner is not None:
+        return -1, 0, 0  # линию собрал только что ходивший
+    x_turn = solver.x_to_move(x_bits, o_bits)
+    children = {}
+    for idx, bit in enumerate(engine.CELL_BITS):
+        if (x_bits | o_bits) & bit:
+            continue
+        value, plies, _ = brute_force(x_bits | bit, o_bits) if x_turn else brute_force(x_bits, o_bits | bit)
+        children[idx] = (-value, plies + 1)
+    best = max(value for value, _ in children.values())
+    best_plies = [plies for value, plies in children.values() if value == best]
+    # выигрывающий спешит, остальные тянут время
+    plies = min(best_plies) if best > 0 else max(best_plies)
+    mask = sum(1 << idx for idx, (value, _) in children.items() if value == best)
+    return best, plies, mask
+
+
+def reachable(x_bits=0, o_bits=0, seen=None):
+    """Все позиции (x_bits, o_bits), достижимые из пустого поля."""
+    if seen is None:
+        seen = set()
+    if (x_bits, o_bits) in seen:
+        return seen
+    seen.add((x_bits, o_bits))
+    if engine.check_winner(x_bits, o_bits)[0] is None:
+        x_turn = solver.x_to_move(x_bits, o_bits)
+        for bit in engine.CELL_BITS:
+            if not (x_bits | o_bits) & bit:
+                if x_turn:
+                    reachable(x_bits | bit, o_bits, seen)
+                else:
+                    reachable(x_bits, o_bits | bit, seen)
+    return seen
+
+
+@pytest.fixture(scope="module")
+def table():
+    return solver.build()
+
+
+def test_table_matches_brute_force(table):
+    positions = reachable()
+    assert len(positions) == 5478
+    for x_bits, o_bits in positions:
+        assert table.lookup(x_bits, o_bits) == brute_force(x_bits, o_bits), (x_bits, o_bits)
+
+
+def test_unreachable_positions(table):
+    assert table.lookup(0b11, 0) is None          # два X без O
+    assert table.lookup(0, 0b1) is None           # O ходит первым
+    assert table.best_moves(0b11, 0) == []
+
+
+def test_empty_board_is_a_draw(table):
+    value, plies, mask = table.lookup(0, 0)
+    assert (value, plies) == (0, 9)
+    assert mask == engine.FULL_MASK  # при идеальной игре любой первый ход ведёт к ничьей
+
+
+def test_best_move_is_first_best(table):
+    # X: 0, 1; O: 3, 4 - X выигрывает ходом в 2 (O в ответ выиграл бы в 5)
+    x_bits, o_bits = 0b11, 0b11000
+    assert table.best_move(x_bits, o_bits) == (0, 2)
+    assert table.lookup(x_bits, o_bits)[:2] == (1, 1)
+
+
+def test_save_and_load(table, tmp_path):
+    path = str(tmp_path / "solved.bin")
+    table.save(path)
+    loaded = solver.SolvedTable.load(path)
+    assert loaded.values == table.values
+    assert loaded.plies == table.plies
+    assert loaded.moves == table.moves
+    with open(path, "r+b") as f:
+        f.truncate(100)
+    with pytest.raises(ValueError):
+        solver.SolvedTable.load(path)
@@ -0,0 +1,61 @@
+"""Симметрии поля и таблица транспозиций."""
+import random
+
+import pytest
+
+import engine
+import transposition
+
+
+def _inverse(t):
+    """Обратное преобразование: поворот - в другую сторону, отражение - само себе."""
+    return (4 - t) % 4 if t < 4 else t
+
+
+@pytest.mark.parametrize("size", [3, 4, 5, 7])
+def test_transform_round_trip(size):
+    symmetry = transposition.BoardSymmetry(size)
+    cells = size * size
+    rng = random.Random(size)
+    for _ in range(200):
+        mask = rng.getrandbits(2 * cells)
+        images = {symmetry.transform(t, mask) for t in range(8)}
+        for t in range(8):
+            image = symmetry.transform(t, mask)
+            assert bin(image).count("1") == bin(mask).count("1")
+            assert symmetry.transform(_inverse(t), image) == mask
+            # камни второй стороны остаются в старших битах
+            assert image >> cells == symmetry.transform(t, mask >> cells << cells) >> cells
+        assert symmetry.transform(0, mask) == mask
+        # канонический ключ - одинаковый для всех симметричных позиций
+        key = symmetry.canonical(mask & ((1 << cells) - 1), mask >> cells)
+        assert key == min(images)
+        for image in images:
+            assert symmetry.canonical(image & ((1 << cells) - 1), image >> cells) == key
+
+
+def test_symmetries_keep_win_lines():
+    symmetry = transposition.BoardSymmetry(3)
+    for t in range(8):
+        assert {symmetry.transform(t, m) for m in engine.WIN_MASKS} == set(engine.WIN_MASKS)
+
+
+def test_eight_distinct_symmetries():
+    symmetry = transposition.BoardSymmetry(3)
+    corner_and_edge = 0b000000011  # клетки 0 и 1 - у этой позиции нет своих симметрий
+    assert len({symmetry.transform(t, corner_and_edge) for t in range(8)}) == 8
+
+
+def test_table_depth_and_lru():
+    tt = transposition.TranspositionTable(max_entries=2)
+    tt.store(1, 5, transposition.EXACT, 3)
+    assert tt.probe(1, 3) == (5, transposition.EXACT)
+    assert tt.probe(1, 4) is None                  # просчитано мельче, чем нужно
+    tt.store(1, 7, transposition.LOWER, 2)         # мельче - не затирает
+    assert tt.probe(1, 1) == (5, transposition.EXACT)
+    tt.store(2, 0, transposition.UPPER, 1)
+    tt.probe(1, 0)                                 # 1 - недавняя, вытесняется 2
+    tt.store(3, 1, transposition.EXACT, 1)
+    assert tt.probe(2, 0) is None
+    assert tt.probe(1, 0) is not None and tt.probe(3, 0) is not None
+    assert tt.evictions == 1